@@ -0,0 +1,135 @@
+"""Measure the memory and lookup time of the compiled configuration of a large site.
+
+The compiled records are compared with the nested dicts the configuration used to be
+compiled to, with a dict per area, channel and preset. The same site is also
+configured with one area range and one channel range, whose records are only created
+when they are looked up.
+
+Run from the repository root: python -m benchmarks.bench_config
+"""
+
+import random
+import time
+import tracemalloc
+
+from dynalite_devices_lib.config import DynaliteConfig
+import dynalite_devices_lib.const as dyn_const
+
+NUM_AREAS = 255
+NUM_CHANNELS = 64
+NUM_LOOKUPS = 1000000
+
+
+def site_config():
+    """Create the config of a site with all the areas and channels."""
+    return {
+        dyn_const.CONF_AREA: {
+            str(area): {
+                dyn_const.CONF_CHANNEL: {
+                    str(channel): {} for channel in range(1, NUM_CHANNELS + 1)
+                }
+            }
+            for area in range(1, NUM_AREAS + 1)
+        },
+    }
+
+
+def ranged_site_config():
+    """Create the config of the same site with an area range and a channel range."""
+    return {
+        dyn_const.CONF_AREA: {
+            f"1-{NUM_AREAS}": {dyn_const.CONF_CHANNEL: {f"1-{NUM_CHANNELS}": {}}}
+        },
+    }
+
+
+def parse_time(raw_config):
+    """Return the best time to compile a config in seconds."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        DynaliteConfig(raw_config)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def materialize_all(config):
+    """Look up every channel of a config."""
+    for area_config in config.area.values():
+        for channel in area_config.channels:
+            _ = area_config.channels[channel]
+
+
+def legacy_config(config):
+    """Convert the compiled areas to the nested dicts of the old model."""
+    return {
+        area: {
+            dyn_const.CONF_NAME: area_config.name,
+            dyn_const.CONF_FADE: area_config.fade,
+            dyn_const.CONF_QUERY_CHANNEL: area_config.query_channel,
+            dyn_const.CONF_CHANNEL: {
+                channel: {
+                    dyn_const.CONF_NAME: channel_config.name,
+                    dyn_const.CONF_FADE: channel_config.fade,
+                    dyn_const.CONF_CHANNEL_TYPE: channel_config.channel_type,
+                    dyn_const.CONF_HIDDEN_ENTITY: channel_config.hidden,
+                }
+                for channel, channel_config in area_config.channels.items()
+            },
+            dyn_const.CONF_PRESET: {
+                preset: {
+                    dyn_const.CONF_NAME: preset_config.name,
+                    dyn_const.CONF_FADE: preset_config.fade,
+                    dyn_const.CONF_LEVEL: preset_config.level,
+                    dyn_const.CONF_HIDDEN_ENTITY: preset_config.hidden,
+                }
+                for preset, preset_config in area_config.presets.items()
+            },
+        }
+        for area, area_config in config.area.items()
+    }
+
+
+def measure(build):
+    """Return the result of build and the bytes it allocated."""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    """Run the benchmark."""
+    raw_config = site_config()
+    config, compiled_size = measure(lambda: DynaliteConfig(raw_config))
+    legacy, legacy_size = measure(lambda: legacy_config(config))
+    rand = random.Random(0)
+    keys = [
+        (rand.randint(1, NUM_AREAS), rand.randint(1, NUM_CHANNELS))
+        for _ in range(NUM_LOOKUPS)
+    ]
+    ranged, ranged_size = measure(lambda: DynaliteConfig(ranged_site_config()))
+    _, materialized_size = measure(lambda: materialize_all(ranged))
+    areas = config.area
+    start = time.perf_counter()
+    for area, channel in keys:
+        _ = areas[area].channels[channel].fade
+    compiled_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for area, channel in keys:
+        _ = legacy[area][dyn_const.CONF_CHANNEL][channel][dyn_const.CONF_FADE]
+    legacy_time = time.perf_counter() - start
+    print(f"areas: {NUM_AREAS}, channels per area: {NUM_CHANNELS}")
+    print(f"compiled records: {compiled_size / 1024:.0f} KiB")
+    print(f"nested dicts: {legacy_size / 1024:.0f} KiB")
+    print(f"ranged before lookups: {ranged_size / 1024:.0f} KiB")
+    print(f"ranged records created on lookup: {materialized_size / 1024:.0f} KiB")
+    print(f"compile explicit: {parse_time(raw_config) * 1e3:.1f} ms")
+    print(f"compile ranged: {parse_time(ranged_site_config()) * 1e3:.1f} ms")
+    print(f"compiled lookup: {compiled_time / NUM_LOOKUPS * 1e9:.0f} ns")
+    print(f"nested dict lookup: {legacy_time / NUM_LOOKUPS * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
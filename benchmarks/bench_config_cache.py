@@ -0,0 +1,63 @@
+"""Measure the startup time with and without the cache of the compiled config.
+
+Run from the repository root: python -m benchmarks.bench_config_cache
+"""
+
+import os
+import tempfile
+import time
+
+from benchmarks.bench_config import NUM_AREAS, NUM_CHANNELS, site_config
+from dynalite_devices_lib.config import DynaliteConfig
+from dynalite_devices_lib.config_cache import DynaliteConfigCache
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynalite_devices import DynaliteDevices
+
+RUNS = 5
+
+
+def best_time(func):
+    """Return the best time of a few runs of func in seconds."""
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def configure(config):
+    """Configure a new bridge, as on startup."""
+    bridge = DynaliteDevices(
+        new_device_func=lambda devices: None,
+        update_device_func=lambda device: None,
+        notification_func=lambda notification: None,
+    )
+    bridge.configure(config)
+
+
+def main():
+    """Run the benchmark."""
+    config = site_config()
+    config[dyn_const.CONF_ACTIVE] = False
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "config.cache")
+        cache = DynaliteConfigCache(path)
+        cache.compile(config)
+        compile_time = best_time(lambda: DynaliteConfig(config))
+        cached_time = best_time(lambda: cache.compile(config))
+        cached_config = dict(config, **{dyn_const.CONF_CONFIG_CACHE: path})
+        configure(cached_config)
+        startup_time = best_time(lambda: configure(config))
+        cached_startup_time = best_time(lambda: configure(cached_config))
+        size = os.path.getsize(path)
+    print(f"areas: {NUM_AREAS}, channels per area: {NUM_CHANNELS}")
+    print(f"cache file: {size / 1024:.0f} KiB")
+    print(f"compile: {compile_time * 1e3:.1f} ms")
+    print(f"load from cache: {cached_time * 1e3:.1f} ms")
+    print(f"configure the bridge: {startup_time * 1e3:.1f} ms")
+    print(f"configure the bridge with the cache: {cached_startup_time * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
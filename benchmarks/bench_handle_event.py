@@ -0,0 +1,89 @@
+"""Measure DynaliteDevices.handle_event throughput on a large synthetic site.
+
+Run from the repository root: python -m benchmarks.bench_handle_event
+"""
+
+import random
+import time
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynalite_devices import DynaliteDevices
+from dynalite_devices_lib.event import DynetEvent
+
+NUM_AREAS = 255
+NUM_CHANNELS = 64
+NUM_EVENTS = 200000
+
+
+def site_config():
+    """Create the config of a site with NUM_AREAS x NUM_CHANNELS channels."""
+    return {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AREA: {
+            str(area): {
+                dyn_const.CONF_CHANNEL: {
+                    str(channel): {} for channel in range(1, NUM_CHANNELS + 1)
+                }
+            }
+            for area in range(1, NUM_AREAS + 1)
+        },
+    }
+
+
+def create_events(count):
+    """Create a random mix of channel and preset events."""
+    rand = random.Random(0)
+    events = []
+    for _ in range(count):
+        area = rand.randint(1, NUM_AREAS)
+        if rand.random() < 0.8:
+            events.append(
+                DynetEvent(
+                    event_type=dyn_const.EVENT_CHANNEL,
+                    data={
+                        dyn_const.CONF_AREA: area,
+                        dyn_const.CONF_CHANNEL: rand.randint(1, NUM_CHANNELS),
+                        dyn_const.CONF_ACTION: dyn_const.CONF_ACTION_CMD,
+                        dyn_const.CONF_TRGT_LEVEL: rand.randint(1, 255),
+                    },
+                )
+            )
+        else:
+            events.append(
+                DynetEvent(
+                    event_type=dyn_const.EVENT_PRESET,
+                    data={
+                        dyn_const.CONF_AREA: area,
+                        dyn_const.CONF_PRESET: rand.choice([1, 4]),
+                    },
+                )
+            )
+    return events
+
+
+def main():
+    """Run the benchmark."""
+    bridge = DynaliteDevices(
+        new_device_func=lambda devices: None,
+        update_device_func=lambda device: None,
+        notification_func=lambda notification: None,
+    )
+    start = time.perf_counter()
+    bridge.configure(site_config())
+    configure_time = time.perf_counter() - start
+    bridge.connected = True
+    events = create_events(NUM_EVENTS)
+    start = time.perf_counter()
+    for event in events:
+        bridge.handle_event(event)
+    elapsed = time.perf_counter() - start
+    print(f"site: {NUM_AREAS} areas x {NUM_CHANNELS} channels")
+    print(f"configure: {configure_time * 1000:.1f} ms")
+    print(
+        f"handle_event: {NUM_EVENTS / elapsed:,.0f} events/s "
+        f"({elapsed / NUM_EVENTS * 1e6:.2f} us/event)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure the cost of raw packet notifications in the receive path.
+
+Run from the repository root: python -m benchmarks.bench_packet_notifications
+"""
+
+import asyncio
+import random
+import time
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynalite import Dynalite
+from dynalite_devices_lib.dynalite_devices import DynaliteDevices
+from dynalite_devices_lib.dynet import DynetPacket
+
+NUM_AREAS = 32
+NUM_CHANNELS = 8
+NUM_FRAMES = 50000
+CHUNK = 1000
+
+
+def site_config(packet_notify):
+    """Create the config of a site with the given packet notifications."""
+    return {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_PACKET_NOTIFY: packet_notify,
+        dyn_const.CONF_AREA: {
+            str(area): {
+                dyn_const.CONF_CHANNEL: {
+                    str(channel): {} for channel in range(1, NUM_CHANNELS + 1)
+                }
+            }
+            for area in range(1, NUM_AREAS + 1)
+        },
+    }
+
+
+def create_frames(count):
+    """Create the raw bytes of a random mix of channel reports."""
+    rand = random.Random(0)
+    return [
+        bytes(
+            DynetPacket.report_channel_level_packet(
+                rand.randint(1, NUM_AREAS),
+                rand.randint(1, NUM_CHANNELS),
+                rand.random(),
+                rand.random(),
+            ).msg
+        )
+        for _ in range(count)
+    ]
+
+
+async def run(packet_notify, frames):
+    """Feed the frames through the receive path and return the seconds it took."""
+    notifications = []
+    bridge = DynaliteDevices(
+        new_device_func=lambda devices: None,
+        update_device_func=lambda device: None,
+        notification_func=notifications.append,
+    )
+    bridge.configure(site_config(packet_notify))
+    bridge.connected = True
+    dynalite = Dynalite(broadcast_func=bridge.handle_event)
+    dynalite.set_packet_filter(bool(packet_notify))
+    dynalite._loop = asyncio.get_running_loop()  # pylint: disable=protected-access
+    start = time.perf_counter()
+    for index in range(0, len(frames), CHUNK):
+        for frame in frames[index : index + CHUNK]:
+            dynalite.receive(frame)
+        await asyncio.sleep(0)  # run the queued broadcasts
+    elapsed = time.perf_counter() - start
+    assert len(notifications) == (len(frames) if packet_notify else 0)
+    return elapsed
+
+
+def main():
+    """Run the benchmark."""
+    frames = create_frames(NUM_FRAMES)
+    with_notify = asyncio.run(run(True, frames))
+    without_notify = asyncio.run(run(False, frames))
+    print(f"frames: {NUM_FRAMES}")
+    for name, elapsed in [("notifications on", with_notify), ("off", without_notify)]:
+        print(f"{name}: {elapsed / NUM_FRAMES * 1e6:.2f} us/frame")
+    print(f"saving: {(with_notify - without_notify) / NUM_FRAMES * 1e6:.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure the initial sync of a large site against the simulated Dynet bus.
+
+The simulated bus runs at the speed of a 9600 baud line, with background traffic from
+panels and some line noise. The bridge paces its own frames at the frame time of the
+bus instead of its default delay, so the bus is the limit.
+
+Run from the repository root: python -m benchmarks.bench_simulator
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynalite_devices import DynaliteDevices
+
+from tests.simulator import FRAME_TIME, DynetSimulator
+
+NUM_AREAS = 32
+NUM_CHANNELS = 8
+TRAFFIC_RATE = 10.0  # frames per second
+NOISE_RATE = 0.001
+
+
+def site_config(port):
+    """Create the config of the simulated site."""
+    return {
+        dyn_const.CONF_HOST: "127.0.0.1",
+        dyn_const.CONF_PORT: port,
+        dyn_const.CONF_ACTIVE: dyn_const.ACTIVE_INIT,
+        dyn_const.CONF_AREA: {
+            str(area): {
+                dyn_const.CONF_CHANNEL: {
+                    str(channel): {} for channel in range(1, NUM_CHANNELS + 1)
+                }
+            }
+            for area in range(1, NUM_AREAS + 1)
+        },
+    }
+
+
+async def run():
+    """Run the sync and print the results."""
+    simulator = DynetSimulator(
+        areas=NUM_AREAS,
+        channels=NUM_CHANNELS,
+        traffic_rate=TRAFFIC_RATE,
+        noise_rate=NOISE_RATE,
+    )
+    port = await simulator.start()
+    updates = []
+    with patch("dynalite_devices_lib.dynalite.MESSAGE_DELAY", FRAME_TIME):
+        bridge = DynaliteDevices(
+            new_device_func=lambda devices: None,
+            update_device_func=updates.append,
+            notification_func=lambda notification: None,
+        )
+    bridge.configure(site_config(port))
+    start = time.perf_counter()
+    await bridge.async_setup()
+    max_lag = 0.0
+    while not bridge.sync_progress.complete:
+        before = time.perf_counter()
+        await asyncio.sleep(0.01)
+        max_lag = max(max_lag, time.perf_counter() - before - 0.01)
+    elapsed = time.perf_counter() - start
+    progress = bridge.sync_progress
+    # the reset waits for the connection to close, so it starts before the gateway
+    # stops, and the bridge does not try to reconnect
+    reset = asyncio.create_task(bridge.async_reset())
+    await asyncio.sleep(0)
+    await simulator.stop()
+    await reset
+    print(f"areas: {NUM_AREAS}, channels per area: {NUM_CHANNELS}")
+    print(f"queries: {progress.total}, answered: {simulator.requests_answered}")
+    print(f"sync time: {elapsed:.2f} s ({progress.total / elapsed:.0f} queries/s)")
+    print(f"frames on the bus: {simulator.frames_sent}")
+    print(f"damaged frames: {simulator.noise_frames}")
+    print(f"device updates: {len(updates)}")
+    print(f"max loop lag: {max_lag * 1e3:.1f} ms")
+
+
+def main():
+    """Run the benchmark."""
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
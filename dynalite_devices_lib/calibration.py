@@ -0,0 +1,45 @@
+"""Travel times of the time covers, fitted from the moves that were observed."""
+
+from typing import Any, Dict, Optional, Tuple
+
+from .storage import DynaliteJsonStore
+
+# the average is over at most this many moves, so newer moves keep counting
+MAX_CALIBRATION_SAMPLES = 10
+
+
+class DynaliteCalibrationStore(DynaliteJsonStore):
+    """Running averages of the full travel duration of covers, by area."""
+
+    description = "cover calibration"
+
+    def __init__(self, path: str = "") -> None:
+        """Initialize the store. Without a path nothing is persisted."""
+        super().__init__(path)
+        self._durations: Dict[int, Tuple[float, int]] = {}
+
+    def clear(self) -> None:
+        """Forget all the durations."""
+        self._durations = {}
+
+    def restore(self, data: Any) -> None:
+        """Set the durations from the decoded JSON of the file."""
+        for area, (duration, samples) in data.items():
+            self._durations[int(area)] = (float(duration), int(samples))
+
+    def to_json(self) -> Any:
+        """Return the durations as a value to encode to JSON."""
+        return {str(area): list(value) for area, value in self._durations.items()}
+
+    def get_duration(self, area: int) -> Optional[float]:
+        """Return the fitted duration of an area or None if none was observed."""
+        value = self._durations.get(area)
+        return value[0] if value else None
+
+    def add_sample(self, area: int, duration: float) -> float:
+        """Add the duration observed in one move and return the new average."""
+        average, samples = self._durations.get(area, (0.0, 0))
+        samples = min(samples + 1, MAX_CALIBRATION_SAMPLES)
+        average += (duration - average) / samples
+        self._durations[area] = (average, samples)
+        return average
@@ -1,7 +1,18 @@
 """Configure the areas, presets, and channels."""
 
-from typing import Any, Dict, Union
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
 
+from .config_records import (
+    AreaConfig,
+    ChannelConfig,
+    EntityRange,
+    LazyEntities,
+    PresetConfig,
+    format_name,
+    materialize,
+    shared_channel_config,
+    shared_preset_config,
+)
 from .const import (
     ACTIVE_INIT,
     ACTIVE_OFF,
@@ -10,39 +21,61 @@ from .const import (
     CONF_AREA,
     CONF_AREA_OVERRIDE,
     CONF_AUTO_DISCOVER,
+    CONF_BATCH_WINDOW,
+    CONF_CALIBRATION_FILE,
     CONF_CHANNEL,
     CONF_CHANNEL_COVER,
     CONF_CHANNEL_TYPE,
     CONF_CLOSE_PRESET,
+    CONF_DEDUP_WINDOW,
     CONF_DEFAULT,
     CONF_DEVICE_CLASS,
+    CONF_DISCOVER_IDLE,
+    CONF_DISCOVER_RATE,
     CONF_DURATION,
     CONF_FADE,
-    CONF_HIDDEN_ENTITY,
     CONF_HOST,
+    CONF_HYSTERESIS,
     CONF_LEVEL,
+    CONF_MAX_DISCOVERED,
     CONF_NAME,
     CONF_NO_DEFAULT,
+    CONF_OPCODE,
     CONF_OPEN_PRESET,
+    CONF_PACKET_NOTIFY,
     CONF_POLL_TIMER,
     CONF_PORT,
     CONF_PRESET,
     CONF_QUERY_CHANNEL,
+    CONF_REGISTER_CHUNK,
     CONF_ROOM,
     CONF_ROOM_OFF,
     CONF_ROOM_ON,
+    CONF_STATE_FILE,
+    CONF_STATE_INTERVAL,
+    CONF_STATE_MAX_AGE,
     CONF_STOP_PRESET,
+    CONF_SYNC_IN_FLIGHT,
+    CONF_SYNC_TIMEOUT,
+    CONF_SYNC_TYPE,
     CONF_TEMPLATE,
     CONF_TILT_TIME,
     CONF_TIME_COVER,
     CONF_TRIGGER,
     DEFAULT_CHANNEL_TYPE,
+    DEFAULT_DISCOVER_IDLE,
     DEFAULT_NAME,
     DEFAULT_PORT,
     DEFAULT_PRESETS,
     DEFAULT_QUERY_CHANNEL,
+    DEFAULT_STATE_INTERVAL,
+    DEFAULT_STATE_MAX_AGE,
+    DEFAULT_SYNC_IN_FLIGHT,
+    DEFAULT_SYNC_TIMEOUT,
     DEFAULT_TEMPLATES,
+    LOGGER,
 )
+from .opcodes import OpcodeType, SyncType
 
 PRESET_CONFS = {
     CONF_ROOM: [CONF_ROOM_ON, CONF_ROOM_OFF],
@@ -52,6 +85,41 @@ PRESET_CONFS = {
 
 TIME_COVER_VALUE_CONFS = [CONF_DEVICE_CLASS, CONF_DURATION, CONF_TILT_TIME]
 
+# the fields of AreaConfig that hold the template values
+AREA_FIELDS = {
+    CONF_ROOM_ON: "room_on",
+    CONF_ROOM_OFF: "room_off",
+    CONF_TRIGGER: "trigger",
+    CONF_OPEN_PRESET: "open_preset",
+    CONF_CLOSE_PRESET: "close_preset",
+    CONF_STOP_PRESET: "stop_preset",
+    CONF_DEVICE_CLASS: "device_class",
+    CONF_DURATION: "duration",
+    CONF_TILT_TIME: "tilt_time",
+}
+
+
+def parse_range(key: Union[int, str]) -> Optional[Tuple[int, int]]:
+    """Return the first and last number of a range key such as '1-64', else None.
+
+    Raises ValueError if the key is a range but not a valid one, e.g. '1-' or '64-1'.
+    """
+    if not isinstance(key, str) or "-" not in key:
+        return None
+    first, last = key.split("-", 1)
+    if not first.strip().isdigit() or not last.strip().isdigit():
+        raise ValueError(f"Invalid range {key}")
+    if int(first) > int(last):
+        raise ValueError(f"Reversed range {key}")
+    return int(first), int(last)
+
+
+def in_ranges(item: int, ranges: List[EntityRange]) -> bool:
+    """Return whether an item is in any of the ranges."""
+    return any(
+        entity_range.first <= item <= entity_range.last for entity_range in ranges
+    )
+
 
 class DynaliteConfig:
     """Configure the Dynalite bridge."""
@@ -63,6 +131,9 @@ class DynaliteConfig:
         self.port = config.get(CONF_PORT, DEFAULT_PORT)
         self.name = config.get(CONF_NAME, f"{DEFAULT_NAME}-{self.host}")
         self.auto_discover = config.get(CONF_AUTO_DISCOVER, False)
+        self.max_discovered = config.get(CONF_MAX_DISCOVERED, 0)
+        self.discover_rate = config.get(CONF_DISCOVER_RATE, 0.0)
+        self.discover_idle = config.get(CONF_DISCOVER_IDLE, DEFAULT_DISCOVER_IDLE)
         temp_active = config.get(CONF_ACTIVE, ACTIVE_INIT)
         if temp_active is True:
             self.active = ACTIVE_ON
@@ -71,6 +142,29 @@ class DynaliteConfig:
         else:
             self.active = temp_active
         self.poll_timer = config.get(CONF_POLL_TIMER, 1.0)
+        self.batch_window = config.get(CONF_BATCH_WINDOW, 0.0)
+        self.hysteresis = config.get(CONF_HYSTERESIS, 0.0)
+        self.dedup_window = config.get(CONF_DEDUP_WINDOW, 0.0)
+        self.calibration_file = config.get(CONF_CALIBRATION_FILE, "")
+        self.state_file = config.get(CONF_STATE_FILE, "")
+        self.state_interval = config.get(CONF_STATE_INTERVAL, DEFAULT_STATE_INTERVAL)
+        self.state_max_age = config.get(CONF_STATE_MAX_AGE, DEFAULT_STATE_MAX_AGE)
+        self.sync_in_flight = config.get(CONF_SYNC_IN_FLIGHT, DEFAULT_SYNC_IN_FLIGHT)
+        self.sync_timeout = config.get(CONF_SYNC_TIMEOUT, DEFAULT_SYNC_TIMEOUT)
+        # 0 delivers all the configured devices in one call
+        self.register_chunk = config.get(CONF_REGISTER_CHUNK, 0)
+        # raw packet notifications are off unless enabled, optionally with filters
+        packet_notify = config.get(CONF_PACKET_NOTIFY, False)
+        self.packet_notify = bool(packet_notify)
+        if not isinstance(packet_notify, dict):
+            packet_notify = {}
+        self.packet_sync_types = self.configure_filter(
+            packet_notify.get(CONF_SYNC_TYPE), SyncType
+        )
+        self.packet_areas = self.configure_filter(packet_notify.get(CONF_AREA))
+        self.packet_opcodes = self.configure_filter(
+            packet_notify.get(CONF_OPCODE), OpcodeType
+        )
         self.default_fade = config.get(CONF_DEFAULT, {}).get(CONF_FADE, 0)
         self.default_query_channel = int(
             config.get(CONF_DEFAULT, {}).get(CONF_QUERY_CHANNEL, DEFAULT_QUERY_CHANNEL)
@@ -95,55 +189,74 @@ class DynaliteConfig:
             for preset in config_presets
         }
         # create the areas with their channels and presets
-        self.area = {}
-        for area_val in config.get(CONF_AREA, {}):  # may be a string '123'
-            area = int(area_val)
+        self.area: Dict[int, AreaConfig] = {}
+        for area_val in config.get(CONF_AREA, {}):  # may be a string '123' or '1-10'
             area_config = config[CONF_AREA].get(area_val)
-            self.area[area] = self.configure_area(
-                area,
-                area_config,
-                self.default_fade,
-                self.default_query_channel,
-                templates,
-                self.default_presets,
-            )
+            try:
+                area_range = parse_range(area_val)
+            except ValueError as err:
+                LOGGER.warning("%s of areas - ignoring", err)
+                continue
+            if area_range:
+                areas = range(area_range[0], area_range[1] + 1)
+            else:
+                areas = range(int(area_val), int(area_val) + 1)
+            for area in areas:
+                self.area[area] = self.configure_area(
+                    area,
+                    area_config,
+                    self.default_fade,
+                    self.default_query_channel,
+                    templates,
+                    self.default_presets,
+                    bool(area_range),
+                )
+
+    @staticmethod
+    def configure_filter(
+        values: Optional[Iterable[Union[int, str]]],
+        names: Optional[Type[Union[OpcodeType, SyncType]]] = None,
+    ) -> Optional[Set[int]]:
+        """Return the byte values of a packet filter, or None to accept all."""
+        if values is None:
+            return None
+        result = set()
+        for value in values:
+            if names and isinstance(value, str) and not value.isdigit():
+                result.add(names[value.upper()].value)
+            else:
+                result.add(int(value))
+        return result
 
     @staticmethod
     def configure_preset(
-        preset: int,
+        preset: Union[int, str],
         preset_config: Dict[str, Union[float, str]],
         default_fade: float,
         hidden: bool = False,
-    ) -> Dict[str, Union[str, float, bool]]:
-        """Return the configuration of a preset."""
-        result = {
-            CONF_NAME: preset_config.get(CONF_NAME, f"Preset {preset}"),
-            CONF_FADE: preset_config.get(CONF_FADE, default_fade),
-        }
-        if CONF_LEVEL in preset_config:
-            result[CONF_LEVEL] = preset_config[CONF_LEVEL]
-        if hidden:
-            result[CONF_HIDDEN_ENTITY] = True
-        return result
+    ) -> PresetConfig:
+        """Return the configuration of a preset, or of a range named by a pattern."""
+        return shared_preset_config(
+            preset_config.get(CONF_NAME, f"Preset {preset}"),
+            preset_config.get(CONF_FADE, default_fade),
+            preset_config.get(CONF_LEVEL),
+            hidden,
+        )
 
     @staticmethod
     def configure_channel(
-        channel: int,
+        channel: Union[int, str],
         channel_config: Dict[str, Union[float, str]],
         default_fade: float,
         hidden: bool = False,
-    ) -> Dict[str, Union[str, float, bool]]:
-        """Return the configuration of a channel."""
-        result = {
-            CONF_NAME: channel_config.get(CONF_NAME, f"Channel {channel}"),
-            CONF_FADE: channel_config.get(CONF_FADE, default_fade),
-            CONF_CHANNEL_TYPE: channel_config.get(
-                CONF_CHANNEL_TYPE, DEFAULT_CHANNEL_TYPE
-            ),
-        }
-        if hidden:
-            result[CONF_HIDDEN_ENTITY] = True
-        return result
+    ) -> ChannelConfig:
+        """Return the configuration of a channel, or of a range named by a pattern."""
+        return shared_channel_config(
+            channel_config.get(CONF_NAME, f"Channel {channel}"),
+            channel_config.get(CONF_FADE, default_fade),
+            channel_config.get(CONF_CHANNEL_TYPE, DEFAULT_CHANNEL_TYPE),
+            hidden,
+        )
 
     @staticmethod
     def configure_area(
@@ -152,69 +265,123 @@ class DynaliteConfig:
         default_fade: float,
         default_query_channel: int,
         templates: Dict[str, Dict[str, Union[str, int]]],
-        default_presets: Dict[int, Any],
-    ) -> Dict[str, Any]:
-        """Return the configuration of an area."""
-        result = {
-            CONF_NAME: area_config.get(CONF_NAME, f"Area {area}"),
-            CONF_FADE: area_config.get(CONF_FADE, default_fade),
-            CONF_QUERY_CHANNEL: int(
-                area_config.get(CONF_QUERY_CHANNEL, default_query_channel)
-            ),
-        }
-        for conf in [CONF_TEMPLATE, CONF_AREA_OVERRIDE]:
-            if conf in area_config:
-                result[conf] = area_config[conf]
+        default_presets: Dict[int, PresetConfig],
+        pattern: bool = False,
+    ) -> AreaConfig:
+        """Return the configuration of an area.
+
+        Channels and presets with range keys such as '1-64' are kept as ranges whose
+        names may use {area}, {channel} and {preset}. If pattern is set, e.g. in an
+        area range, all the names may use them.
+        """
+        result: Dict[str, Any] = dict.fromkeys(AreaConfig.__slots__)
+        result["name"] = area_config.get(CONF_NAME, f"Area {area}")
+        if pattern:
+            result["name"] = format_name(result["name"], area=area)
+        result["fade"] = area_config.get(CONF_FADE, default_fade)
+        result["query_channel"] = int(
+            area_config.get(CONF_QUERY_CHANNEL, default_query_channel)
+        )
+        result["template"] = area_config.get(CONF_TEMPLATE)
+        result["area_override"] = area_config.get(CONF_AREA_OVERRIDE)
         # User defined presets and channels first, then template presets, then defaults
-        area_presets = {
-            int(preset): DynaliteConfig.configure_preset(
-                preset, area_config[CONF_PRESET][preset], result[CONF_FADE]
+        area_presets: Dict[int, PresetConfig] = {}
+        preset_ranges: List[EntityRange] = []
+        for preset_val, preset_config in area_config.get(CONF_PRESET, {}).items():
+            try:
+                preset_range = parse_range(preset_val)
+            except ValueError as err:
+                LOGGER.warning("%s of presets in area %s - ignoring", err, area)
+                continue
+            if preset_range:
+                preset_template = DynaliteConfig.configure_preset(
+                    "{preset}", preset_config, result["fade"]
+                )
+                preset_ranges.append(
+                    EntityRange(
+                        first=preset_range[0],
+                        last=preset_range[1],
+                        template=preset_template,
+                    )
+                )
+                continue
+            preset = int(preset_val)
+            area_presets[preset] = DynaliteConfig.configure_preset(
+                preset, preset_config, result["fade"]
             )
-            for preset in area_config.get(CONF_PRESET, {})
-        }
-        area_channels = {
-            int(channel): DynaliteConfig.configure_channel(
-                channel, area_config[CONF_CHANNEL][channel], result[CONF_FADE]
+            if pattern:
+                area_presets[preset] = materialize(area_presets[preset], area, preset)
+        area_channels: Dict[int, ChannelConfig] = {}
+        channel_ranges: List[EntityRange] = []
+        for channel_val, channel_config in area_config.get(CONF_CHANNEL, {}).items():
+            try:
+                channel_range = parse_range(channel_val)
+            except ValueError as err:
+                LOGGER.warning("%s of channels in area %s - ignoring", err, area)
+                continue
+            if channel_range:
+                channel_template = DynaliteConfig.configure_channel(
+                    "{channel}", channel_config, result["fade"]
+                )
+                channel_ranges.append(
+                    EntityRange(
+                        first=channel_range[0],
+                        last=channel_range[1],
+                        template=channel_template,
+                    )
+                )
+                continue
+            channel = int(channel_val)
+            area_channels[channel] = DynaliteConfig.configure_channel(
+                channel, channel_config, result["fade"]
             )
-            for channel in area_config.get(CONF_CHANNEL, {})
-        }
+            if pattern:
+                area_channels[channel] = materialize(
+                    area_channels[channel], area, channel
+                )
         # add the entities implicitly defined by templates
         template = area_config.get(CONF_TEMPLATE)
         if template:
             # ensure presets are there
             for conf in PRESET_CONFS[template]:
                 preset = int(area_config.get(conf, templates[template][conf]))
-                result[conf] = preset
-                if preset not in area_presets:
+                result[AREA_FIELDS[conf]] = preset
+                if preset not in area_presets and not in_ranges(preset, preset_ranges):
                     if template == CONF_TRIGGER:
                         area_presets[preset] = DynaliteConfig.configure_preset(
                             preset,
-                            {CONF_NAME: result[CONF_NAME]},
-                            result[CONF_FADE],
+                            {CONF_NAME: result["name"]},
+                            result["fade"],
                             False,
                         )
                     else:
                         area_presets[preset] = DynaliteConfig.configure_preset(
-                            preset, {}, result[CONF_FADE], True
+                            preset, {}, result["fade"], True
                         )
         if template == CONF_TIME_COVER:  # time cover also has non-preset conf
             for conf in TIME_COVER_VALUE_CONFS:
-                result[conf] = area_config.get(conf, templates[template][conf])
+                result[AREA_FIELDS[conf]] = area_config.get(
+                    conf, templates[template][conf]
+                )
             channel_cover = int(
                 area_config.get(
                     CONF_CHANNEL_COVER, templates[template][CONF_CHANNEL_COVER]
                 )
             )
-            result[CONF_CHANNEL_COVER] = channel_cover
-            if 0 < channel_cover < 255 and channel_cover not in area_channels:
+            result["channel_cover"] = channel_cover
+            if (
+                0 < channel_cover < 255
+                and channel_cover not in area_channels
+                and not in_ranges(channel_cover, channel_ranges)
+            ):
                 area_channels[channel_cover] = DynaliteConfig.configure_channel(
-                    channel_cover, {}, result[CONF_FADE], True
+                    channel_cover, {}, result["fade"], True
                 )
         # Default presets
         if not area_config.get(CONF_NO_DEFAULT, False) and not template:
             for preset in default_presets:
-                if preset not in area_presets:
+                if preset not in area_presets and not in_ranges(preset, preset_ranges):
                     area_presets[preset] = default_presets[preset]
-        result[CONF_PRESET] = area_presets
-        result[CONF_CHANNEL] = area_channels
-        return result
+        result["presets"] = LazyEntities(area, area_presets, tuple(preset_ranges))
+        result["channels"] = LazyEntities(area, area_channels, tuple(channel_ranges))
+        return AreaConfig(**result)
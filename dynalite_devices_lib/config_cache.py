@@ -0,0 +1,96 @@
+"""Cache of the compiled configuration, so later starts do not compile it again."""
+
+import hashlib
+import json
+import pickle
+from typing import Any, Dict, Optional
+
+from .__version__ import __version__
+from .config import DynaliteConfig
+from .const import LOGGER
+from .storage import atomic_write
+
+# change when the compiled classes change in a way the version does not show
+CONFIG_CACHE_FORMAT = 1
+
+
+def canonical(value: Any) -> Any:
+    """Return a JSON-able form of a config, with the keys as sorted strings."""
+    if isinstance(value, dict):
+        return sorted([str(key), canonical(item)] for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return [canonical(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+class DynaliteConfigCache:
+    """A file with a compiled configuration and the hash of the config it came from.
+
+    The file is a pickle, so it must only be written by this library.
+    """
+
+    def __init__(self, path: str = "") -> None:
+        """Initialize the cache. Without a path nothing is cached."""
+        self.path = path  # public
+
+    @staticmethod
+    def config_key(config: Dict[str, Any]) -> bytes:
+        """Return the hash of a config and of the version that compiles it."""
+        key_data = [__version__, CONFIG_CACHE_FORMAT, config]
+        try:
+            data = json.dumps(key_data, sort_keys=True, default=repr)
+        except TypeError:  # keys of mixed types cannot be sorted
+            data = json.dumps([__version__, CONFIG_CACHE_FORMAT, canonical(config)])
+        return hashlib.sha256(data.encode("utf-8")).hexdigest().encode("ascii")
+
+    def load(self, key: bytes) -> Optional[DynaliteConfig]:
+        """Return the cached compiled config if it is for the key, else None."""
+        try:
+            with open(self.path, "rb") as cache_file:
+                data = cache_file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as err:
+            LOGGER.warning("Cannot load config cache %s: %s", self.path, err)
+            return None
+        cached_key, _, payload = data.partition(b"\n")
+        if cached_key != key:
+            return None
+        try:
+            compiled = pickle.loads(payload)
+        except (
+            pickle.UnpicklingError,
+            EOFError,
+            AttributeError,
+            ImportError,
+            IndexError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ) as err:
+            LOGGER.warning("Cannot load config cache %s: %s", self.path, err)
+            return None
+        return compiled if isinstance(compiled, DynaliteConfig) else None
+
+    def write(self, key: bytes, compiled: DynaliteConfig) -> None:
+        """Atomically replace the cache with a compiled config."""
+        try:
+            atomic_write(
+                self.path, key + b"\n" + pickle.dumps(compiled, pickle.HIGHEST_PROTOCOL)
+            )
+        except (OSError, pickle.PicklingError) as err:
+            LOGGER.warning("Cannot save config cache %s: %s", self.path, err)
+
+    def compile(self, config: Dict[str, Any]) -> DynaliteConfig:
+        """Return the compiled config, from the cache if it is for this config."""
+        if not self.path:
+            return DynaliteConfig(config)
+        key = self.config_key(config)
+        compiled = self.load(key)
+        if compiled is None:
+            LOGGER.debug("config cache miss %s", self.path)
+            compiled = DynaliteConfig(config)
+            self.write(key, compiled)
+        return compiled
@@ -0,0 +1,327 @@
+"""Compiled, immutable records of the configuration of areas, channels and presets."""
+
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterator, Mapping, Optional, Tuple
+
+from .const import CONF_CHANNEL, CONF_PRESET
+
+
+class ConfigRecord:
+    """Base of the frozen configuration records, compared by value."""
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __init__(self, **values: Any) -> None:
+        """Set all the fields of the record."""
+        for field in self.__slots__:
+            object.__setattr__(self, field, values[field])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Refuse to change a field."""
+        raise AttributeError(f"{type(self).__name__} is frozen")
+
+    def __delattr__(self, name: str) -> None:
+        """Refuse to delete a field."""
+        raise AttributeError(f"{type(self).__name__} is frozen")
+
+    def values(self) -> Tuple[Any, ...]:
+        """Return the values of the fields in order."""
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare two records by their fields."""
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __hash__(self) -> int:
+        """Hash the record by its fields."""
+        return hash(self.values())
+
+    def __repr__(self) -> str:
+        """Print the record for logs."""
+        fields = ", ".join(
+            f"{field}={getattr(self, field)!r}" for field in self.__slots__
+        )
+        return f"{type(self).__name__}({fields})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Pickle the record by its fields, as it cannot be set field by field."""
+        return (restore_record, (type(self), self.values()))
+
+    def replace(self, **changes: Any) -> Any:
+        """Return a copy of the record with some fields changed."""
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+
+class ChannelConfig(ConfigRecord):
+    """Configuration of a channel."""
+
+    __slots__ = ("name", "fade", "channel_type", "hidden")
+    name: str
+    fade: float
+    channel_type: str
+    hidden: bool
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Unpickle to the shared record."""
+        return (shared_channel_config, self.values())
+
+
+class PresetConfig(ConfigRecord):
+    """Configuration of a preset. The level is None if the preset sets none."""
+
+    __slots__ = ("name", "fade", "level", "hidden")
+    name: str
+    fade: float
+    level: Optional[float]
+    hidden: bool
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Unpickle to the shared record."""
+        return (shared_preset_config, self.values())
+
+
+class AreaConfig(ConfigRecord):
+    """Configuration of an area with its channels and presets.
+
+    The template fields are None when they do not apply to the template of the area.
+    """
+
+    __slots__ = (
+        "name",
+        "fade",
+        "query_channel",
+        "template",
+        "area_override",
+        "room_on",
+        "room_off",
+        "trigger",
+        "open_preset",
+        "close_preset",
+        "stop_preset",
+        "channel_cover",
+        "device_class",
+        "duration",
+        "tilt_time",
+        "channels",
+        "presets",
+    )
+    name: str
+    fade: float
+    query_channel: int
+    template: Optional[str]
+    area_override: Optional[str]
+    room_on: Optional[int]
+    room_off: Optional[int]
+    trigger: Optional[int]
+    open_preset: Optional[int]
+    close_preset: Optional[int]
+    stop_preset: Optional[int]
+    channel_cover: Optional[int]
+    device_class: Optional[str]
+    duration: Optional[float]
+    tilt_time: Optional[float]
+    # not to be changed in place, use with_entity / without_entity
+    channels: Mapping[int, ChannelConfig]
+    presets: Mapping[int, PresetConfig]
+
+    def __hash__(self) -> int:
+        """Hash the area by its own fields, the entities are not hashable."""
+        return hash(self.area_values())
+
+    def area_values(self) -> Tuple[Any, ...]:
+        """Return the values of the fields of the area without its entities."""
+        return self.values()[:-2]
+
+    def entities(self, kind: str) -> Mapping[int, Any]:
+        """Return the channels or the presets of the area."""
+        return self.channels if kind == CONF_CHANNEL else self.presets
+
+    def with_entity(self, kind: str, item: int, config: ConfigRecord) -> "AreaConfig":
+        """Return a copy of the area with a channel or preset added or replaced."""
+        entities = self.entities(kind)
+        if isinstance(entities, LazyEntities):
+            new_entities: Mapping[int, Any] = entities.with_item(item, config)
+        else:
+            new_entities = {**entities, item: config}
+        return self.replace(**{kind_field(kind): new_entities})
+
+    def without_entity(self, kind: str, item: int) -> "AreaConfig":
+        """Return a copy of the area without a channel or preset."""
+        entities = self.entities(kind)
+        if isinstance(entities, LazyEntities):
+            new_entities: Mapping[int, Any] = entities.without_item(item)
+        else:
+            new_entities = {key: entities[key] for key in entities if key != item}
+        return self.replace(**{kind_field(kind): new_entities})
+
+
+class EntityRange(ConfigRecord):
+    """Channels or presets from first to last that share one configuration.
+
+    The name of the template is a pattern that may use {area}, {channel} and {preset}.
+    """
+
+    __slots__ = ("first", "last", "template")
+    first: int
+    last: int
+    template: ConfigRecord
+
+    def materialize(self, area: int, item: int) -> ConfigRecord:
+        """Return the record of one channel or preset of the range."""
+        return materialize(self.template, area, item)
+
+
+class LazyEntities(Mapping[int, Any]):
+    """Channels or presets of an area, kept as ranges until they are looked up.
+
+    A record of a range is only created on its first lookup, and then kept.
+    """
+
+    __slots__ = ("area", "explicit", "ranges", "removed", "_records", "_keys")
+
+    def __init__(
+        self,
+        area: int,
+        explicit: Dict[int, Any],
+        ranges: Tuple[EntityRange, ...] = (),
+        removed: FrozenSet[int] = frozenset(),
+    ) -> None:
+        """Initialize the entities. Explicit records win over the ranges."""
+        self.area = area
+        self.explicit = explicit
+        self.ranges = ranges
+        self.removed = removed
+        # only ranges add records, so without them the explicit ones are shared
+        self._records: Dict[int, Any] = dict(explicit) if ranges else explicit
+        self._keys: Optional[Tuple[int, ...]] = None
+
+    def find_range(self, item: Any) -> Optional[EntityRange]:
+        """Return the range that holds an item, if any."""
+        if isinstance(item, int) and item not in self.removed:
+            for entity_range in self.ranges:
+                if entity_range.first <= item <= entity_range.last:
+                    return entity_range
+        return None
+
+    def __getitem__(self, item: int) -> Any:
+        """Return the record of an item, creating it from its range if needed."""
+        try:
+            return self._records[item]
+        except KeyError:
+            pass
+        entity_range = self.find_range(item)
+        if entity_range is None:
+            raise KeyError(item)
+        record = entity_range.materialize(self.area, item)
+        self._records[item] = record
+        return record
+
+    def __contains__(self, item: Any) -> bool:
+        """Return whether an item is configured, without creating its record."""
+        return item in self._records or self.find_range(item) is not None
+
+    def keys_tuple(self) -> Tuple[int, ...]:
+        """Return all the items, the explicit ones first."""
+        if self._keys is None:
+            keys = dict.fromkeys(self.explicit)
+            for entity_range in self.ranges:
+                for item in range(entity_range.first, entity_range.last + 1):
+                    if item not in self.removed:
+                        keys.setdefault(item)
+            self._keys = tuple(keys)
+        return self._keys
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate over the items."""
+        return iter(self.keys_tuple())
+
+    def __len__(self) -> int:
+        """Return the number of items."""
+        return len(self.keys_tuple())
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare by the rules when possible, so nothing needs to be created."""
+        if isinstance(other, LazyEntities) and (
+            self.area,
+            self.explicit,
+            self.ranges,
+            self.removed,
+        ) == (other.area, other.explicit, other.ranges, other.removed):
+            return True
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        """Print the rules for logs."""
+        return (
+            f"LazyEntities(area={self.area}, explicit={self.explicit!r}, "
+            f"ranges={self.ranges!r}, removed={set(self.removed)!r})"
+        )
+
+    def with_item(self, item: int, config: Any) -> "LazyEntities":
+        """Return a copy with an item added or replaced."""
+        return LazyEntities(
+            self.area,
+            {**self.explicit, item: config},
+            self.ranges,
+            self.removed - {item},
+        )
+
+    def without_item(self, item: int) -> "LazyEntities":
+        """Return a copy without an item."""
+        explicit = {key: value for key, value in self.explicit.items() if key != item}
+        return LazyEntities(self.area, explicit, self.ranges, self.removed | {item})
+
+
+def restore_record(record_type: Any, values: Tuple[Any, ...]) -> Any:
+    """Create a record from the values of its fields in order."""
+    return record_type(**dict(zip(record_type.__slots__, values)))
+
+
+def kind_field(kind: str) -> str:
+    """Return the field of an area that holds the entities of a kind."""
+    assert kind in [CONF_CHANNEL, CONF_PRESET]
+    return "channels" if kind == CONF_CHANNEL else "presets"
+
+
+def format_name(pattern: str, **values: int) -> str:
+    """Return a name with the fields of its pattern filled, or as is if it has none."""
+    try:
+        return pattern.format(**values)
+    except (KeyError, ValueError, IndexError, AttributeError):
+        # a name with literal braces that are not one of the fields
+        return pattern
+
+
+def materialize(template: Any, area: int, item: int) -> Any:
+    """Return a channel or preset record with the name pattern of a template filled."""
+    name = format_name(template.name, area=area, channel=item, preset=item)
+    if isinstance(template, ChannelConfig):
+        return shared_channel_config(
+            name, template.fade, template.channel_type, template.hidden
+        )
+    assert isinstance(template, PresetConfig)
+    return shared_preset_config(name, template.fade, template.level, template.hidden)
+
+
+@lru_cache(maxsize=4096)
+def shared_channel_config(
+    name: str, fade: float, channel_type: str, hidden: bool
+) -> ChannelConfig:
+    """Return a shared channel record, so equal channels in many areas are stored once."""
+    return ChannelConfig(name=name, fade=fade, channel_type=channel_type, hidden=hidden)
+
+
+@lru_cache(maxsize=4096)
+def shared_preset_config(
+    name: str, fade: float, level: Optional[float], hidden: bool
+) -> PresetConfig:
+    """Return a shared preset record, so equal presets in many areas are stored once."""
+    return PresetConfig(name=name, fade=fade, level=level, hidden=hidden)
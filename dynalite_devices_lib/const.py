@@ -19,29 +19,46 @@ ACTIVE_ON = "on"
 CONF_AREA = "area"
 CONF_AREA_OVERRIDE = "areaoverride"
 CONF_AUTO_DISCOVER = "autodiscover"
+CONF_BATCH_WINDOW = "batchwindow"
+CONF_CALIBRATION_FILE = "calibrationfile"
 CONF_CHANNEL = "channel"
 CONF_CHANNEL_COVER = "channelcover"
 CONF_CHANNEL_TYPE = "type"
 CONF_CLOSE_PRESET = "close"
+CONF_CONFIG_CACHE = "configcache"
+CONF_DEDUP_WINDOW = "dedupwindow"
 CONF_DEFAULT = "default"
 CONF_DEVICE_CLASS = "class"
+CONF_DISCOVER_IDLE = "discoveridle"
+CONF_DISCOVER_RATE = "discoverrate"
 CONF_DURATION = "duration"
 CONF_FADE = "fade"
 CONF_HIDDEN_ENTITY = "hidden"
 CONF_HOST = "host"
+CONF_HYSTERESIS = "hysteresis"
 CONF_LEVEL = "level"
+CONF_MAX_DISCOVERED = "maxdiscovered"
 CONF_NAME = "name"
 CONF_NO_DEFAULT = "nodefault"
 CONF_NONE = "none"
+CONF_OPCODE = "opcode"
 CONF_OPEN_PRESET = "open"
+CONF_PACKET_NOTIFY = "packetnotify"
 CONF_POLL_TIMER = "polltimer"
 CONF_PORT = "port"
 CONF_PRESET = "preset"
 CONF_QUERY_CHANNEL = "query_channel"
+CONF_REGISTER_CHUNK = "registerchunk"
 CONF_ROOM = "room"
 CONF_ROOM_OFF = "room_off"
 CONF_ROOM_ON = "room_on"
+CONF_STATE_FILE = "statefile"
+CONF_STATE_INTERVAL = "stateinterval"
+CONF_STATE_MAX_AGE = "statemaxage"
 CONF_STOP_PRESET = "stop"
+CONF_SYNC_IN_FLIGHT = "syncinflight"
+CONF_SYNC_TIMEOUT = "synctimeout"
+CONF_SYNC_TYPE = "sync"
 CONF_TEMPLATE = "template"
 CONF_TILT_TIME = "tilt"
 CONF_TIME_COVER = "timecover"
@@ -54,9 +71,14 @@ ATTR_TILT_POSITION = "tilt_position"
 
 DEFAULT_CHANNEL_TYPE = "light"
 DEFAULT_COVER_CLASS = "shutter"
+DEFAULT_DISCOVER_IDLE = 3600.0  # seconds before a discovered entity can be evicted
 DEFAULT_NAME = "dynalite"
 DEFAULT_PORT = 12345
 DEFAULT_QUERY_CHANNEL = 1
+DEFAULT_STATE_INTERVAL = 60.0  # seconds between writes of the state snapshot
+DEFAULT_STATE_MAX_AGE = 3600.0  # seconds before a snapshot entry is queried again
+DEFAULT_SYNC_IN_FLIGHT = 0  # queries sent on startup and not answered yet, 0 is all
+DEFAULT_SYNC_TIMEOUT = 5.0  # seconds before an unanswered query counts as done
 DEFAULT_TEMPLATES: Dict[str, Dict[str, Union[str, int]]] = {
     CONF_ROOM: {CONF_ROOM_ON: "1", CONF_ROOM_OFF: "4"},
     CONF_TRIGGER: {CONF_TRIGGER: "1"},
@@ -87,3 +109,4 @@ NOTIFICATION_PRESET = "PRESET"
 
 CONNECTION_RETRY_DELAY = 1  # seconds to reconnect
 MESSAGE_DELAY = 0.2  # seconds between sending
+ECHO_TIMEOUT = 0.5  # seconds to recognize our own frames coming back from the bus
@@ -1,6 +1,5 @@
 """Support for the Dynalite channels as covers."""
-import asyncio
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from .const import ATTR_POSITION, ATTR_TILT_POSITION, CONF_TEMPLATE, CONF_TIME_COVER
 from .dynalitebase import DynaliteBaseDevice, DynaliteMultiDevice
@@ -8,7 +7,12 @@ from .light import DynaliteChannelLightDevice
 from .switch import DynalitePresetSwitchDevice
 
 if TYPE_CHECKING:  # pragma: no cover
+    from .cover_group import DynaliteTimeCoverGroup
     from .dynalite_devices import DynaliteDevices
+    from .scheduler import ScheduledCall
+
+# shorter moves of the channel are too noisy to fit the duration from
+MIN_CALIBRATION_TRAVEL = 0.1
 
 
 class DynaliteTimeCoverDevice(DynaliteMultiDevice):
@@ -18,16 +22,43 @@ class DynaliteTimeCoverDevice(DynaliteMultiDevice):
         self, area: int, bridge: "DynaliteDevices", poll_timer: float, hidden: bool
     ) -> None:
         """Initialize the cover."""
-        self._current_position = 0.0
+        # the motion is kept as a start time and position, the current position
+        # is computed from them when needed
+        self._start_position = 0.0
+        self._start_time = bridge.time()
         self._initialized = False
         self._direction = "stop"
+        self._stop_handle: Optional["ScheduledCall"] = None
+        # a single timer for the progress updates and the end of the travel
+        self._motion_call: Optional["ScheduledCall"] = None
+        self._motion_when = 0.0
+        self._next_tick = 0.0
+        self._stop_confirmed = True
+        self._group: Optional["DynaliteTimeCoverGroup"] = None
+        # direction, time and level of the channel when the current move started
+        self._observed_move: Optional[Tuple[str, float, float]] = None
+        self._reported_state: Tuple[str, ...] = ()
         self._poll_timer = poll_timer
+        self._device_class = ""
+        self._duration = 0.0
+        self._tilt_duration = 0.0
         super().__init__(4, area, bridge, hidden)
+        self._reported_state = self.motion_state()
+
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        super().refresh_config()
+        self._configured = self._bridge.is_configured(
+            CONF_TEMPLATE, self._area, CONF_TIME_COVER
+        )
+        self._device_class = self._bridge.get_device_class(self._area)
+        self._duration = self._bridge.get_cover_duration(self._area)
+        self._tilt_duration = self._bridge.get_cover_tilt_duration(self._area)
 
     @property
     def available(self) -> bool:
         """Return if device is available."""
-        return self._bridge.available(CONF_TEMPLATE, self._area, CONF_TIME_COVER)
+        return self._bridge.connected and self._configured
 
     @property
     def category(self) -> str:
@@ -47,55 +78,131 @@ class DynaliteTimeCoverDevice(DynaliteMultiDevice):
     @property
     def device_class(self) -> str:
         """Return the class of the cover."""
-        return self._bridge.get_device_class(self._area)
+        return self._device_class
+
+    def elapsed_fraction(self, now: float, duration: float) -> float:
+        """Return the signed part of a full travel done since the motion started."""
+        if self._direction == "stop":
+            return 0.0
+        fraction = (now - self._start_time) / duration
+        return fraction if self._direction == "open" else -fraction
+
+    def position_at(self, now: float) -> float:
+        """Return the position between 0 and 1 at a given time of the bridge."""
+        position = self._start_position + self.elapsed_fraction(now, self._duration)
+        return max(0.0, min(1.0, position))
+
+    @property
+    def _current_position(self) -> float:
+        """Return the current position between 0 and 1."""
+        return self.position_at(self._bridge.time())
+
+    def restart_motion(self, now: float) -> None:
+        """Fix the current position as the start of a new motion."""
+        self._start_position = self.position_at(now)
+        self._start_time = now
+
+    def motion_state(self) -> Tuple[str, ...]:
+        """Return the state as seen by the consumers of the device."""
+        return (self._direction, str(self.current_cover_position))
+
+    def report_if_changed(self) -> None:
+        """Update the device if the state the consumers see has changed."""
+        state = self.motion_state()
+        self._bridge.update_if_changed(self, state != self._reported_state)
+        self._reported_state = state
 
     def update_level(self, actual_level: float, target_level: float) -> None:
         """Update the current level."""
+        self.restart_motion(self._bridge.time())
+        old_direction = self._direction
         if actual_level == target_level:
             if not self._initialized:
-                self._current_position = target_level
+                self._start_position = target_level
                 self._initialized = True
             self._direction = "stop"
-            self._bridge.remove_timer_listener(self.timer_callback)
+            self.cancel_motion()
         elif target_level > actual_level:
             if not self._initialized:
-                self._current_position = 1.0
+                self._start_position = 1.0
                 self._initialized = True
             self._direction = "open"
-            self._bridge.add_timer_listener(self.timer_callback)
+            self.track_motion()
         else:  # target_level < actual_level
             if not self._initialized:
-                self._current_position = 0.0
+                self._start_position = 0.0
                 self._initialized = True
             self._direction = "close"
-            self._bridge.add_timer_listener(self.timer_callback)
-        self._bridge.update_device(self)
-
-    def timer_callback(self) -> None:
-        """Update the progress of open and close."""
-        duration = self._bridge.get_cover_duration(self._area)
+            self.track_motion()
+        if self._direction != old_direction:
+            self.cancel_stop()
+        self.report_if_changed()
+
+    def track_motion(self) -> None:
+        """Get timer callbacks while moving, from the group if in one."""
+        if self._group:
+            self._group.track_motion()
+            return
+        if not self._motion_call:
+            self._next_tick = self._bridge.time() + self._poll_timer
+        # the end of the travel moves with every change of the motion
+        self.schedule_motion()
+
+    def travel_end_time(self) -> float:
+        """Return the time when the current motion reaches the end of the travel."""
+        return self.time_at_position(1.0 if self._direction == "open" else 0.0)
+
+    def schedule_motion(self) -> None:
+        """Set the timer to the next progress update or the end of the travel."""
+        self.cancel_motion()
+        when = min(self._next_tick, self.travel_end_time())
+        self._motion_call = self._bridge.call_at(when, self.motion_callback)
+        self._motion_when = when
+
+    def cancel_motion(self) -> None:
+        """Cancel the timer of the motion."""
+        if self._motion_call:
+            self._motion_call.cancel()
+            self._motion_call = None
+
+    def motion_callback(self) -> None:
+        """Update the progress, and keep the timer while the cover moves."""
+        self._motion_call = None
+        # the loop may run the timer slightly before its time
+        now = max(self._bridge.time(), self._motion_when)
+        if now >= self._next_tick:
+            self._next_tick = now + self._poll_timer
+        self.timer_callback(now)
+        if self._direction != "stop":
+            self.schedule_motion()
+
+    def join_group(self, group: "DynaliteTimeCoverGroup") -> None:
+        """Let a group send the commands and track the motion of the cover."""
+        self.cancel_stop()
+        self.cancel_motion()
+        self._group = group
+
+    def leave_group(self) -> None:
+        """Track the motion of the cover on its own again."""
+        self._group = None
+        if self._direction != "stop":
+            self.track_motion()
+
+    def timer_callback(self, now: Optional[float] = None) -> None:
+        """Update the progress of open and close, and stop at the end of the travel."""
         assert self._direction in ["open", "close"]
-        if self._direction == "open":
-            self._current_position += self._poll_timer / duration
-            getattr(self, "update_tilt", int)(self._poll_timer)
-            if self._current_position >= 1.0:
-                self._current_position = 1.0
-                self._direction = "stop"
-                self._bridge.remove_timer_listener(self.timer_callback)
-        else:
-            assert self._direction == "close"
-            self._current_position -= self._poll_timer / duration
-            getattr(self, "update_tilt", int)(self._poll_timer)
-            if self._current_position <= 0.0:
-                self._current_position = 0.0
-                self._direction = "stop"
-                self._bridge.remove_timer_listener(self.timer_callback)
-        self._bridge.update_device(self)
+        if now is None:
+            now = self._bridge.time()
+        if now >= self.travel_end_time():
+            self.restart_motion(now)
+            self._direction = "stop"
+            self.cancel_motion()
+        self.report_if_changed()
 
     @property
     def current_cover_position(self) -> int:
         """Return the position of the cover from 0 to 100."""
-        return int(self._current_position * 100)
+        return round(self._current_position * 100)
 
     @property
     def is_opening(self) -> bool:
@@ -112,56 +219,101 @@ class DynaliteTimeCoverDevice(DynaliteMultiDevice):
         """Return whether cover is closed."""
         return self._current_position == 0
 
-    async def async_open_cover(self, **kwargs) -> None:
-        """Open the cover."""
-        # pylint: disable=unused-argument
+    def cancel_stop(self) -> None:
+        """Cancel a scheduled stop."""
+        if self._stop_handle:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+        if self._group:
+            self._group.cancel_stop(self)
+
+    def cleanup(self) -> None:
+        """Cancel the timers of the cover when it is removed."""
+        super().cleanup()
+        self.cancel_stop()
+        self.cancel_motion()
+
+    def time_at_position(self, target_position: float) -> float:
+        """Return the time when the current motion reaches a position."""
+        travel = abs(target_position - self._start_position)
+        return self._start_time + travel * self._duration
+
+    def schedule_stop(self, target_position: float) -> None:
+        """Schedule the stop for when the current motion reaches a position."""
+        self.cancel_stop()
+        self._stop_handle = self._bridge.call_at(
+            self.time_at_position(target_position), self.stop_at_target
+        )
+
+    def stop_at_target(self) -> None:
+        """Stop the cover when it reaches the target position."""
+        self.send_target_stop()
+        self._stop_handle = self._bridge.call_later(self._poll_timer, self.confirm_stop)
+
+    def send_target_stop(self) -> None:
+        """Stop at the target, the channel may then confirm the stop."""
+        self._stop_confirmed = False
+        self.stop()
+
+    def confirm_stop(self) -> None:
+        """Send the stop again, unless the channel reported that the cover stopped."""
+        # without a channel, this is always done twice for safety
+        if not self._stop_confirmed:
+            self.stop()
+
+    def stop(self) -> None:
+        """Send the stop preset and stop the motion."""
+        device = self.get_device(3)
+        assert isinstance(device, DynalitePresetSwitchDevice)
+        device.select()
+        position = self._current_position
+        self.update_level(position, position)
+
+    def open(self) -> None:
+        """Send the open preset and start opening."""
+        self.cancel_stop()
         device = self.get_device(1)
         assert isinstance(device, DynalitePresetSwitchDevice)
-        await device.async_turn_on()
+        device.select()
         self.update_level(self._current_position, 1.0)
 
-    async def async_close_cover(self, **kwargs) -> None:
-        """Close the cover."""
-        # pylint: disable=unused-argument
+    def close(self) -> None:
+        """Send the close preset and start closing."""
+        self.cancel_stop()
         device = self.get_device(2)
         assert isinstance(device, DynalitePresetSwitchDevice)
-        await device.async_turn_on()
+        device.select()
         self.update_level(self._current_position, 0.0)
 
+    async def async_open_cover(self, **kwargs) -> None:
+        """Open the cover."""
+        # pylint: disable=unused-argument
+        self.open()
+
+    async def async_close_cover(self, **kwargs) -> None:
+        """Close the cover."""
+        # pylint: disable=unused-argument
+        self.close()
+
     async def async_set_cover_position(self, **kwargs) -> None:
         """Set the cover to a specific position."""
-        target_position = kwargs[ATTR_POSITION] / 100
-        position_diff = target_position - self._current_position
-        if position_diff > 0.001:
+        # compare whole percents, the positions as floats are off by rounding
+        target_percent = kwargs[ATTR_POSITION]
+        target_position = target_percent / 100
+        if target_percent > self.current_cover_position:
             await self.async_open_cover()
-            while (
-                self._current_position < target_position and self._direction == "open"
-            ):
-                await asyncio.sleep(self._poll_timer)
-            if self._direction == "open":
-                await self.async_stop_cover()
-                await asyncio.sleep(self._poll_timer)  # doing twice for safety
-                await self.async_stop_cover()
-        elif position_diff < -0.001:
+            self.schedule_stop(target_position)
+        elif target_percent < self.current_cover_position:
             await self.async_close_cover()
-            while (
-                self._current_position > target_position and self._direction == "close"
-            ):
-                await asyncio.sleep(self._poll_timer)
-            if self._direction == "close":
-                await self.async_stop_cover()
-                await asyncio.sleep(self._poll_timer)  # doing twice for safety
-                await self.async_stop_cover()
+            self.schedule_stop(target_position)
         else:
             await self.async_stop_cover()
 
     async def async_stop_cover(self, **kwargs) -> None:
         """Stop the cover."""
         # pylint: disable=unused-argument
-        device = self.get_device(3)
-        assert isinstance(device, DynalitePresetSwitchDevice)
-        await device.async_turn_on()
-        self.update_level(self._current_position, self._current_position)
+        self.cancel_stop()
+        self.stop()
 
     def listener(self, device: DynaliteBaseDevice, stop_fade: bool) -> None:
         """Update according to updates in underlying devices."""
@@ -176,24 +328,50 @@ class DynaliteTimeCoverDevice(DynaliteMultiDevice):
         elif device == self.get_device(3):
             assert isinstance(device, DynalitePresetSwitchDevice)
             if device.is_on:
-                self.update_level(self._current_position, self._current_position)
+                position = self._current_position
+                self.update_level(position, position)
         else:
             assert device == self.get_device(4)
             assert isinstance(device, DynaliteChannelLightDevice)
             if stop_fade or device.direction == "stop":
                 self.update_level(device.level, device.level)
+                self._stop_confirmed = True
+                self.observe_channel("stop", device.level)
             elif device.direction == "open":
                 self.update_level(self._current_position, 1.0)
+                self.observe_channel("open", device.level)
             else:
                 self.update_level(self._current_position, 0.0)
-        super().listener(device, stop_fade)
+                self.observe_channel("close", device.level)
+
+    def observe_channel(self, direction: str, level: float) -> None:
+        """Fit the travel duration from the channel levels at the start and end of a move."""
+        now = self._bridge.time()
+        move = self._observed_move
+        if move and move[0] != direction:  # the move stopped or reversed
+            travel = level - move[2] if move[0] == "open" else move[2] - level
+            # a reversed move doesn't report where the previous one ended
+            if direction == "stop" and travel >= MIN_CALIBRATION_TRAVEL:
+                self._bridge.add_cover_calibration(self._area, (now - move[1]) / travel)
+                self.refresh_config()
+            move = None
+        if direction != "stop" and not move:
+            move = (direction, now, level)
+        self._observed_move = move
+
+    @property
+    def state_level(self) -> Optional[float]:
+        """Return the position to keep in the state snapshot, between 0..100."""
+        return self._current_position * 100
 
     def init_level(self, level):
         """Initialize to a given position."""
         if level < 0 or level > 100:
             raise ValueError
-        self._current_position = level / 100.0
+        self._start_position = level / 100.0
+        self._start_time = self._bridge.time()
         self._initialized = True
+        self._reported_state = self.motion_state()
 
 
 class DynaliteTimeCoverWithTiltDevice(DynaliteTimeCoverDevice):
@@ -203,7 +381,7 @@ class DynaliteTimeCoverWithTiltDevice(DynaliteTimeCoverDevice):
         self, area: int, bridge: "DynaliteDevices", poll_timer: float, hidden: bool
     ) -> None:
         """Initialize the cover."""
-        self._current_tilt = 0.0
+        self._start_tilt = 0.0
         super().__init__(area, bridge, poll_timer, hidden)
 
     @property
@@ -211,17 +389,24 @@ class DynaliteTimeCoverWithTiltDevice(DynaliteTimeCoverDevice):
         """Return whether cover supports tilt."""
         return True
 
-    def update_tilt(self, poll_timer: float) -> None:
-        """Update the current tilt based on diff and tilt_percentage."""
-        assert self._direction in ["open", "close"]
-        if self._direction == "open":
-            mult = poll_timer
-        else:
-            assert self._direction == "close"
-            mult = -poll_timer
-        tilt_duration = self._bridge.get_cover_tilt_duration(self._area)
-        tilt_diff = mult / tilt_duration
-        self._current_tilt = max(0, min(1, self._current_tilt + tilt_diff))
+    def tilt_at(self, now: float) -> float:
+        """Return the tilt between 0 and 1 at a given time of the bridge."""
+        tilt = self._start_tilt + self.elapsed_fraction(now, self._tilt_duration)
+        return max(0.0, min(1.0, tilt))
+
+    @property
+    def _current_tilt(self) -> float:
+        """Return the current tilt between 0 and 1."""
+        return self.tilt_at(self._bridge.time())
+
+    def restart_motion(self, now: float) -> None:
+        """Fix the current position and tilt as the start of a new motion."""
+        self._start_tilt = self.tilt_at(now)
+        super().restart_motion(now)
+
+    def motion_state(self) -> Tuple[str, ...]:
+        """Return the state as seen by the consumers of the device."""
+        return super().motion_state() + (str(self.current_cover_tilt_position),)
 
     @property
     def current_cover_tilt_position(self) -> int:
@@ -230,9 +415,7 @@ class DynaliteTimeCoverWithTiltDevice(DynaliteTimeCoverDevice):
 
     async def apply_tilt_diff(self, tilt_diff: float) -> None:
         """Move the cover up or down based on a diff."""
-        duration = self._bridge.get_cover_duration(self._area)
-        tilt_duration = self._bridge.get_cover_tilt_duration(self._area)
-        factor = tilt_duration / duration
+        factor = self._tilt_duration / self._duration
         position_diff = tilt_diff * factor
         target_position = int(
             100 * max(0, min(1, self._current_position + position_diff))
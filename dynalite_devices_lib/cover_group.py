@@ -0,0 +1,209 @@
+"""Control of several time covers as one."""
+
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from .const import ATTR_POSITION
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cover import DynaliteTimeCoverDevice
+    from .dynalite_devices import DynaliteDevices
+    from .scheduler import ScheduledCall
+
+
+class DynaliteTimeCoverGroup:
+    """Time covers in different areas that are tracked with a single timer.
+
+    Dynet area links are not modelled in this tree, so the group still sends one
+    preset per area for each command and one stop per area at its target. That is
+    the same bus traffic as commanding the covers one by one. What the group saves
+    is the timer of each cover, and it reports the progress of the covers together.
+    """
+
+    def __init__(
+        self,
+        bridge: "DynaliteDevices",
+        covers: List["DynaliteTimeCoverDevice"],
+        poll_timer: float,
+        update_func: Optional[Callable[["DynaliteTimeCoverGroup"], None]] = None,
+    ) -> None:
+        """Initialize the group."""
+        self._bridge = bridge
+        self._covers = covers
+        self._poll_timer = poll_timer
+        self._update_func = update_func
+        self._active = False
+        self._call: Optional["ScheduledCall"] = None
+        self._call_when = 0.0
+        self._next_tick = 0.0
+        # deadlines of the stops at the target, and of the stops sent again
+        self._stops: Dict["DynaliteTimeCoverDevice", float] = {}
+        self._confirms: Dict["DynaliteTimeCoverDevice", float] = {}
+        # positions at the start of the last command and its targets, for progress
+        self._start_positions: Dict["DynaliteTimeCoverDevice", float] = {}
+        self._targets: Dict["DynaliteTimeCoverDevice", float] = {}
+
+    @property
+    def covers(self) -> List["DynaliteTimeCoverDevice"]:
+        """Return the covers in the group."""
+        return self._covers
+
+    @property
+    def current_cover_position(self) -> int:
+        """Return the average position of the covers from 0 to 100."""
+        if not self._covers:
+            return 0
+        total = sum(cover.current_cover_position for cover in self._covers)
+        return round(total / len(self._covers))
+
+    @property
+    def is_opening(self) -> bool:
+        """Return whether any cover is opening."""
+        return any(cover.is_opening for cover in self._covers)
+
+    @property
+    def is_closing(self) -> bool:
+        """Return whether any cover is closing."""
+        return any(cover.is_closing for cover in self._covers)
+
+    @property
+    def is_closed(self) -> bool:
+        """Return whether all the covers are closed."""
+        return all(cover.is_closed for cover in self._covers)
+
+    @property
+    def progress(self) -> float:
+        """Return the part of the travel of the last command that was done."""
+        total = 0.0
+        done = 0.0
+        for cover, target in self._targets.items():
+            start = self._start_positions[cover]
+            travel = abs(target - start)
+            position = cover.current_cover_position / 100
+            total += travel
+            done += min(abs(position - start), travel)
+        return done / total if total else 1.0
+
+    async def async_open_cover(self, **kwargs) -> None:
+        """Open all the covers."""
+        # pylint: disable=unused-argument
+        self.move_to(1.0)
+
+    async def async_close_cover(self, **kwargs) -> None:
+        """Close all the covers."""
+        # pylint: disable=unused-argument
+        self.move_to(0.0)
+
+    async def async_set_cover_position(self, **kwargs) -> None:
+        """Set all the covers to a specific position."""
+        self.move_to(kwargs[ATTR_POSITION] / 100)
+
+    async def async_stop_cover(self, **kwargs) -> None:
+        """Stop all the covers."""
+        # pylint: disable=unused-argument
+        self.join()
+        self._stops = {}
+        self._confirms = {}
+        for cover in self._covers:
+            cover.stop()
+        self._targets = {}
+        self.schedule()
+
+    def move_to(self, target_position: float) -> None:
+        """Start moving all the covers to a position, stopping each one on time.
+
+        Each cover that has to move gets its own open or close preset.
+        """
+        self.join()
+        # compare whole percents, the positions as floats are off by rounding
+        target_percent = round(target_position * 100)
+        self._stops = {}
+        self._confirms = {}
+        self._start_positions = {}
+        self._targets = {}
+        for cover in self._covers:
+            position = cover.current_cover_position / 100
+            if target_percent > cover.current_cover_position:
+                cover.open()
+            elif target_percent < cover.current_cover_position:
+                cover.close()
+            else:
+                continue
+            self._start_positions[cover] = position
+            self._targets[cover] = target_position
+            if 0 < target_position < 1:
+                self._stops[cover] = cover.time_at_position(target_position)
+        self._next_tick = self._bridge.time() + self._poll_timer
+        self.schedule()
+
+    def join(self) -> None:
+        """Take over the tracking of the covers."""
+        if not self._active:
+            self._active = True
+            for cover in self._covers:
+                cover.join_group(self)
+
+    def track_motion(self) -> None:
+        """Make sure the timer runs while a cover of the group moves."""
+        if self._active and not self._call:
+            self._next_tick = self._bridge.time() + self._poll_timer
+            self.schedule()
+
+    def cancel_stop(self, cover: "DynaliteTimeCoverDevice") -> None:
+        """Cancel the stops of one cover, e.g. when it got another command."""
+        self._stops.pop(cover, None)
+        self._confirms.pop(cover, None)
+
+    def schedule(self) -> None:
+        """Set the single timer of the group to the next tick or stop."""
+        if self._call:
+            self._call.cancel()
+            self._call = None
+        moving = self.is_opening or self.is_closing
+        if not (moving or self._stops or self._confirms):
+            self.finish()
+            return
+        ends = [
+            cover.travel_end_time()
+            for cover in self._covers
+            if cover.is_opening or cover.is_closing
+        ]
+        when = min(
+            [self._next_tick, *self._stops.values(), *self._confirms.values(), *ends]
+        )
+        self._call = self._bridge.call_at(when, self.timer_callback)
+        self._call_when = when
+
+    def timer_callback(self) -> None:
+        """Send the stops that are due and update the progress of the covers."""
+        self._call = None
+        # the loop may run the timer slightly before its time
+        now = max(self._bridge.time(), self._call_when)
+        for cover, when in list(self._stops.items()):
+            if when <= now:
+                del self._stops[cover]
+                cover.send_target_stop()
+                self._confirms[cover] = now + self._poll_timer
+        for cover, when in list(self._confirms.items()):
+            if when <= now:
+                del self._confirms[cover]
+                cover.confirm_stop()
+        tick = now >= self._next_tick
+        if tick:
+            self._next_tick = now + self._poll_timer
+        for cover in self._covers:
+            if (cover.is_opening or cover.is_closing) and (
+                tick or cover.travel_end_time() <= now
+            ):
+                cover.timer_callback(now)
+        if tick and self._update_func:
+            self._update_func(self)
+        self.schedule()
+
+    def finish(self) -> None:
+        """Hand the covers back when they all stopped."""
+        if self._active:
+            self._active = False
+            for cover in self._covers:
+                cover.leave_group()
+            if self._update_func:
+                self._update_func(self)
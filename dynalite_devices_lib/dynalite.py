@@ -10,16 +10,18 @@ Manage a Dynalite connection.
 
 import asyncio
 import time
-from typing import Awaitable, Callable, List, Optional
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
 
 from .const import (
     CONF_ACTION,
     CONF_ACTION_CMD,
     CONF_AREA,
     CONF_CHANNEL,
+    CONF_FADE,
     CONF_PRESET,
     CONF_TRGT_LEVEL,
     CONNECTION_RETRY_DELAY,
+    ECHO_TIMEOUT,
     EVENT_CHANNEL,
     EVENT_CONNECTED,
     EVENT_DISCONNECTED,
@@ -31,7 +33,31 @@ from .const import (
 from .dynet import DynetPacket, PacketError
 from .event import DynetEvent
 from .inbound import DynetInbound
-from .opcodes import SyncType
+from .opcodes import OpcodeType, SyncType
+
+# bit masks of the areas and opcodes of the logical frames that are decoded
+ALL_AREAS_MASK = (1 << 256) - 1
+HANDLED_OPCODES_MASK = sum(
+    1 << opcode.value
+    for opcode in OpcodeType
+    if hasattr(DynetInbound, opcode.name.lower())
+)
+# preset selections are decoded in all areas, for the preset notifications
+PRESET_OPCODES_MASK = sum(
+    1 << opcode.value
+    for opcode in (
+        OpcodeType.PRESET_1,
+        OpcodeType.PRESET_2,
+        OpcodeType.PRESET_3,
+        OpcodeType.PRESET_4,
+        OpcodeType.PRESET_5,
+        OpcodeType.PRESET_6,
+        OpcodeType.PRESET_7,
+        OpcodeType.PRESET_8,
+        OpcodeType.REPORT_PRESET,
+        OpcodeType.LINEAR_PRESET,
+    )
+)
 
 
 class Dynalite:
@@ -49,6 +75,20 @@ class Dynalite:
         self._writer: Optional[asyncio.StreamWriter] = None
         self._resetting = False
         self._reader_future: Optional[Awaitable[None]] = None
+        # times at which recent frames were sent, to recognize their echoes
+        self._sent_frames: Dict[bytes, List[float]] = {}
+        # frames that were passed on recently, in the order they were first seen
+        self.dedup_window = 0.0  # public
+        self.dedup_stats: Dict[int, int] = {}  # public
+        self._recent_frames: Dict[bytes, float] = {}
+        # frames of other areas or opcodes are dropped before they are decoded
+        self._area_mask = ALL_AREAS_MASK
+        self.filtered_frames = 0  # public
+        # raw packet notifications, None in a filter accepts all values
+        self._packet_notify = False
+        self._packet_sync_types: Optional[Set[int]] = None
+        self._packet_areas: Optional[Set[int]] = None
+        self._packet_opcodes: Optional[Set[int]] = None
 
     async def connect_internal(self, host: str, port: int) -> bool:
         """Create the actual connection to Dynet."""
@@ -103,6 +143,54 @@ class Dynalite:
         assert self._loop
         self._loop.call_soon(self._broadcast_func, event)
 
+    def set_areas(self, areas: Optional[Iterable[int]]) -> None:
+        """Set the areas whose frames are decoded, or None for all areas.
+
+        Preset selections are decoded in all areas, for the preset notifications.
+        """
+        if areas is None:
+            self._area_mask = ALL_AREAS_MASK
+        else:
+            self._area_mask = sum(1 << area for area in set(areas))
+
+    def add_area(self, area: int) -> None:
+        """Start decoding the frames of an area."""
+        self._area_mask |= 1 << area
+
+    def set_packet_filter(
+        self,
+        notify: bool,
+        sync_types: Optional[Set[int]] = None,
+        areas: Optional[Set[int]] = None,
+        opcodes: Optional[Set[int]] = None,
+    ) -> None:
+        """Set which raw frames are broadcast as packet events."""
+        self._packet_notify = notify
+        self._packet_sync_types = sync_types
+        self._packet_areas = areas
+        self._packet_opcodes = opcodes
+
+    def broadcast_packet(self) -> None:
+        """Broadcast the frame at the start of the buffer if it passes the packet filter."""
+        if not self._packet_notify:
+            return
+        buffer = self._in_buffer
+        if self._packet_sync_types is not None:
+            if buffer[0] not in self._packet_sync_types:
+                return
+        # areas and opcodes only apply to logical frames
+        if buffer[0] == SyncType.LOGICAL.value:
+            if self._packet_areas is not None and buffer[1] not in self._packet_areas:
+                return
+            if (
+                self._packet_opcodes is not None
+                and buffer[3] not in self._packet_opcodes
+            ):
+                return
+        self.broadcast(
+            DynetEvent(event_type=EVENT_PACKET, data={EVENT_PACKET: buffer[:8]})
+        )
+
     def set_channel_level(
         self, area: int, channel: int, level: float, fade: float
     ) -> None:
@@ -114,6 +202,7 @@ class Dynalite:
             CONF_CHANNEL: channel,
             CONF_TRGT_LEVEL: int(255 - 254.0 * level),
             CONF_ACTION: CONF_ACTION_CMD,
+            CONF_FADE: packet.data[2] * 0.02,
         }
         self.broadcast(DynetEvent(event_type=EVENT_CHANNEL, data=broadcast_data))
 
@@ -146,27 +235,36 @@ class Dynalite:
                 if first_byte == SyncType.DEBUG_MSG.value:
                     bytemsg = "".join(chr(c) for c in self._in_buffer[1:7])
                     LOGGER.debug("Dynet DEBUG message %s", bytemsg)
-                    self.broadcast(
-                        DynetEvent(
-                            event_type=EVENT_PACKET,
-                            data={EVENT_PACKET: self._in_buffer[:8]},
-                        )
-                    )
+                    self.broadcast_packet()
                     self._in_buffer = self._in_buffer[8:]
                     continue
                 if first_byte == SyncType.DEVICE.value:
                     LOGGER.debug(
                         "Not handling Dynet DEVICE message %s", self._in_buffer[:8]
                     )
-                    self.broadcast(
-                        DynetEvent(
-                            event_type=EVENT_PACKET,
-                            data={EVENT_PACKET: self._in_buffer[:8]},
-                        )
-                    )
+                    self.broadcast_packet()
                     self._in_buffer = self._in_buffer[8:]
                     continue
                 assert first_byte == SyncType.LOGICAL.value
+                buffer = self._in_buffer
+                # the area is decoded, or the opcode selects a preset
+                wanted = (self._area_mask >> buffer[1]) | (
+                    PRESET_OPCODES_MASK >> buffer[3]
+                )
+                if (
+                    not (wanted & (HANDLED_OPCODES_MASK >> buffer[3]) & 1)
+                    and DynetPacket.calc_sum(buffer) == buffer[7]
+                ):
+                    # a valid frame that we don't care about, skip it whole
+                    self.filtered_frames += 1
+                    self.broadcast_packet()
+                    self._in_buffer = buffer[8:]
+                    continue
+                if self.is_repeated_frame(bytes(self._in_buffer[:8])):
+                    opcode = self._in_buffer[3]
+                    self.dedup_stats[opcode] = self.dedup_stats.get(opcode, 0) + 1
+                    self._in_buffer = self._in_buffer[8:]
+                    continue
                 try:
                     packet = DynetPacket(msg=self._in_buffer[:8])
                 except PacketError as err:
@@ -179,14 +277,26 @@ class Dynalite:
                 )
                 del self._in_buffer[0]
                 continue
-            self.broadcast(
-                DynetEvent(
-                    event_type=EVENT_PACKET, data={EVENT_PACKET: self._in_buffer[:8]}
-                )
-            )
+            if self.dedup_window > 0:
+                self._recent_frames[bytes(self._in_buffer[:8])] = time.monotonic()
+            self.broadcast_packet()
             self._in_buffer = self._in_buffer[8:]
         return packet
 
+    def is_repeated_frame(self, frame: bytes) -> bool:
+        """Return whether a frame is a copy of one passed on within the dedup window."""
+        if self.dedup_window <= 0:
+            return False
+        now = time.monotonic()
+        recent_frames = self._recent_frames
+        # the oldest frames are first, drop the ones that are out of the window
+        while recent_frames:
+            old_frame = next(iter(recent_frames))
+            if now - recent_frames[old_frame] <= self.dedup_window:
+                break
+            del recent_frames[old_frame]
+        return frame in recent_frames
+
     @staticmethod
     def event_from_packet(packet: DynetPacket) -> Optional[DynetEvent]:
         """Create an event from a valid packet."""
@@ -217,6 +327,7 @@ class Dynalite:
         LOGGER.debug("Have packet: %s", packet)
         event = self.event_from_packet(packet)
         if event:
+            event.echo_rtt = self.match_echo(bytes(packet.msg))
             self.broadcast(event)
         # If there is still buffer to process - start again
         if len(self._in_buffer) >= 8:
@@ -247,11 +358,30 @@ class Dynalite:
         self._writer.write(msg)
         LOGGER.debug("Dynet Sent: %s", [int(byte) for byte in msg])
         self._last_sent = time.time()
+        self._sent_frames.setdefault(bytes(msg), []).append(time.monotonic())
         del self._out_buffer[0]
         if len(self._out_buffer) > 0:
             assert self._loop
             self._loop.call_later(self._message_delay, self.write)
 
+    def match_echo(self, frame: bytes) -> Optional[float]:
+        """Return the round trip time if a frame is an echo of one we sent, otherwise None."""
+        now = time.monotonic()
+        sent_frames = self._sent_frames
+        # drop the frames that were sent too long ago to come back
+        for old_frame, old_times in list(sent_frames.items()):
+            while old_times and now - old_times[0] > ECHO_TIMEOUT:
+                del old_times[0]
+            if not old_times:
+                del sent_frames[old_frame]
+        times = sent_frames.get(frame)
+        if not times:
+            return None
+        sent_time = times.pop(0)
+        if not times:
+            del sent_frames[frame]
+        return now - sent_time
+
     async def async_reset(self) -> None:
         """Close sockets and timers."""
         self._resetting = True
@@ -1,9 +1,24 @@
 """Class to create devices from a Dynalite hub."""
 
 import asyncio
-from typing import Any, Callable, Dict, List, Optional, Set, Union
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Type,
+    Union,
+)
 
+from .calibration import DynaliteCalibrationStore
 from .config import DynaliteConfig
+from .config_cache import DynaliteConfigCache
+from .config_records import AreaConfig, PresetConfig, shared_preset_config
 from .const import (
     ACTIVE_INIT,
     ACTIVE_ON,
@@ -14,30 +29,15 @@ from .const import (
     CONF_ACTION_REPORT,
     CONF_ACTION_STOP,
     CONF_AREA,
-    CONF_AREA_OVERRIDE,
     CONF_CHANNEL,
-    CONF_CHANNEL_COVER,
-    CONF_CHANNEL_TYPE,
-    CONF_CLOSE_PRESET,
-    CONF_DEVICE_CLASS,
-    CONF_DURATION,
+    CONF_CONFIG_CACHE,
     CONF_FADE,
-    CONF_HIDDEN_ENTITY,
-    CONF_LEVEL,
-    CONF_NAME,
     CONF_NONE,
-    CONF_OPEN_PRESET,
     CONF_PRESET,
-    CONF_QUERY_CHANNEL,
     CONF_ROOM,
-    CONF_ROOM_OFF,
-    CONF_ROOM_ON,
-    CONF_STOP_PRESET,
     CONF_TEMPLATE,
-    CONF_TILT_TIME,
     CONF_TIME_COVER,
     CONF_TRGT_LEVEL,
-    DEFAULT_CHANNEL_TYPE,
     DEFAULT_COVER_CLASS,
     EVENT_CHANNEL,
     EVENT_CONNECTED,
@@ -49,15 +49,51 @@ from .const import (
     NOTIFICATION_PRESET,
 )
 from .cover import DynaliteTimeCoverDevice, DynaliteTimeCoverWithTiltDevice
+from .cover_group import DynaliteTimeCoverGroup
 from .dynalite import Dynalite
-from .dynalitebase import DynaliteBaseDevice
+from .dynalitebase import (
+    DynaliteBaseDevice,
+    DynaliteChannelBaseDevice,
+    DynaliteMultiDevice,
+)
 from .event import DynetEvent
 from .light import DynaliteChannelLightDevice
+from .registry import DeviceKey, DynaliteDeviceRegistry
+from .scheduler import DynaliteScheduler, ScheduledCall
+from .state import DynaliteStateStore, state_key
 from .switch import (
     DynaliteChannelSwitchDevice,
     DynaliteDualPresetSwitchDevice,
     DynalitePresetSwitchDevice,
 )
+from .sync import DynaliteSyncPlanner, DynaliteSyncProgress
+
+# changes to these in an area replace all of its devices
+AREA_REBUILD_FIELDS = [
+    "template",
+    "room_on",
+    "room_off",
+    "trigger",
+    "open_preset",
+    "close_preset",
+    "stop_preset",
+    "channel_cover",
+    "tilt_time",
+]
+# changes to these in a channel or preset replace its device
+ENTITY_REBUILD_FIELDS = ["channel_type", "hidden"]
+
+
+def register_priority(device: DynaliteBaseDevice) -> int:
+    """Return the order of a device when the configured ones are sent in chunks.
+
+    The rooms and covers come first, then the channels, and the presets last.
+    """
+    if isinstance(device, DynaliteMultiDevice):
+        return 0
+    if isinstance(device, DynaliteChannelBaseDevice):
+        return 1
+    return 2
 
 
 class DynaliteNotification:
@@ -91,40 +127,85 @@ class DynaliteDevices:
         new_device_func: Callable[[List[DynaliteBaseDevice]], None],
         update_device_func: Callable[[Optional[DynaliteBaseDevice]], None],
         notification_func: Callable[[DynaliteNotification], None],
+        update_batch_func: Optional[Callable[[List[DynaliteBaseDevice]], None]] = None,
+        remove_device_func: Optional[Callable[[List[DynaliteBaseDevice]], None]] = None,
+        sync_progress_func: Optional[Callable[[DynaliteSyncProgress], None]] = None,
     ) -> None:
         """Initialize the system."""
         self._host = ""
         self._port = 0
         self.name = None  # public
         self._poll_timer = 0.0
+        self._batch_window = 0.0
+        self._hysteresis = 0.0
         self._default_fade = 0.0
         self._default_query_channel = 0
         self._active = ""
         self._auto_discover = None
+        self._max_discovered = 0
+        self._discover_rate = 0.0
+        self._discover_idle = 0.0
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._new_device_func = new_device_func
         self._update_device_func = update_device_func
         self._notification_func = notification_func
+        self._update_batch_func = update_batch_func
+        self._remove_device_func = remove_device_func
+        self._dirty_devices: Dict[DynaliteBaseDevice, None] = {}
+        self._batch_handle: Optional[ScheduledCall] = None
         self._configured = False
         self.connected = False  # public
-        self._added_presets: Dict[int, Any] = {}
-        self._added_channels: Dict[int, Any] = {}
-        self._added_room_switches: Dict[int, Any] = {}
-        self._added_time_covers: Dict[int, Any] = {}
+        self.suppressed_updates = 0  # public
+        # echoes of our own frames from the bus, with the round trip times
+        self.echo_count = 0  # public
+        self.echo_rtt = 0.0  # public
+        self.echo_rtt_average = 0.0  # public
+        self._devices = DynaliteDeviceRegistry()
+        self._current_preset: Dict[int, int] = {}
         self._waiting_devices: List[DynaliteBaseDevice] = []
-        self._timer_active = False
-        self._timer_callbacks: Set[Callable[[], None]] = set()
-        self._area: Dict[int, Any] = {}
+        self._register_chunk = 0
+        self._register_call: Optional[ScheduledCall] = None
+        self._scheduler = DynaliteScheduler()
+        self._calibration = DynaliteCalibrationStore()
+        self._config_cache = DynaliteConfigCache()
+        # snapshot of the state, so a restart only queries what may be outdated
+        self._state = DynaliteStateStore()
+        self._state_max_age = 0.0
+        self._state_call: Optional[ScheduledCall] = None
+        self._state_written = ""
+        # the queries of the initial state, sent by priority
+        self._sync = DynaliteSyncPlanner(self, sync_progress_func)
+        self._timer_calls: Dict[Callable[[], None], ScheduledCall] = {}
+        self._area: Dict[int, AreaConfig] = {}
         self._dynalite = Dynalite(broadcast_func=self.handle_event)
-        self._resetting = False
-        self._default_presets: Dict[int, Any] = {}
+        self._default_presets: Dict[int, PresetConfig] = {}
+        # entities found on the bus, least recently seen first, and their areas
+        self._discovered: "OrderedDict[DeviceKey, float]" = OrderedDict()
+        self._discovered_areas: Set[int] = set()
+        self._discover_tokens = 0.0
+        self._discover_time = 0.0
+
+    @property
+    def sync_progress(self) -> DynaliteSyncProgress:
+        """Return the progress of the queries of the initial state."""
+        return self._sync.progress
+
+    @property
+    def dedup_stats(self) -> Dict[int, int]:
+        """Return the number of repeated frames that were dropped, by opcode."""
+        return self._dynalite.dedup_stats
+
+    @property
+    def filtered_frames(self) -> int:
+        """Return the number of frames of other areas or opcodes that were dropped."""
+        return self._dynalite.filtered_frames
 
     async def async_setup(self) -> bool:
         """Set up a Dynalite bridge based on host parameter in the config."""
         LOGGER.debug("bridge async_setup")
         self._loop = asyncio.get_running_loop()
+        self._scheduler.start(self._loop)
         # Run the dynalite object. Assumes self.configure() has been called
-        self._resetting = False
         self.connected = await self._dynalite.connect(self._host, self._port)
         return self.connected
 
@@ -132,67 +213,217 @@ class DynaliteDevices:
         """Configure a Dynalite bridge."""
         LOGGER.debug("bridge async_configure - %s", config)
         self._configured = False
-        configurator = DynaliteConfig(config)
+        old_globals = (self._hysteresis, self._default_fade, self._calibration.path)
+        # the path of the cache has to be known before the config is compiled
+        self._config_cache.path = config.get(CONF_CONFIG_CACHE, "")
+        configurator = self._config_cache.compile(config)
         # insert the global values
         self._host = configurator.host
         self._port = configurator.port
         self.name = configurator.name
         self._auto_discover = configurator.auto_discover
+        self._max_discovered = configurator.max_discovered
+        self._discover_rate = configurator.discover_rate
+        self._discover_idle = configurator.discover_idle
         self._active = configurator.active
         self._poll_timer = configurator.poll_timer
+        self._batch_window = configurator.batch_window
+        self._hysteresis = configurator.hysteresis
+        self._dynalite.dedup_window = configurator.dedup_window
+        self._dynalite.set_packet_filter(
+            configurator.packet_notify,
+            configurator.packet_sync_types,
+            configurator.packet_areas,
+            configurator.packet_opcodes,
+        )
+        if configurator.calibration_file != self._calibration.path:
+            self._calibration.path = configurator.calibration_file
+            self._calibration.load()
+        if configurator.state_file != self._state.path:
+            self._state.path = configurator.state_file
+            self._state.load()
+            self._state_written = ""
+        self._state_max_age = configurator.state_max_age
+        self._sync.max_in_flight = configurator.sync_in_flight
+        self._sync.timeout = configurator.sync_timeout
+        self._register_chunk = configurator.register_chunk
+        if self._state_call:
+            self._state_call.cancel()
+            self._state_call = None
+        if self._state.path and configurator.state_interval > 0:
+            self._state_call = self._scheduler.call_every(
+                configurator.state_interval, self.save_state
+            )
         self._default_fade = configurator.default_fade
         self._default_query_channel = configurator.default_query_channel
-        # keep the old values in case of a reconfigure, for auto discovery
+        # the devices cache values of the bridge, e.g. the hysteresis of the lights
+        refresh_all = old_globals != (
+            self._hysteresis,
+            self._default_fade,
+            self._calibration.path,
+        )
+        # keep the areas and entities that were discovered in case of a reconfigure
         old_area = self._area
         self._area = configurator.area
+        self._discovered_areas.difference_update(self._area)
+        for key in list(self._discovered):
+            kind, area, item = key
+            area_config = self._area.get(area)
+            if area_config is None:
+                continue
+            if item in area_config.entities(kind):
+                del self._discovered[key]
+            else:
+                self._area[area] = area_config.with_entity(
+                    kind, item, old_area[area].entities(kind)[item]
+                )
         for area in old_area:
-            if area not in self._area:
+            if area in self._area:
+                continue
+            if area in self._discovered_areas:
                 self._area[area] = old_area[area]
+            else:
+                self.remove_area(area)
         self._default_presets = configurator.default_presets
-        # now register the channels and presets and ask for initial status if needed
-        for area in self._area:
-            if self._active in [ACTIVE_INIT, ACTIVE_ON]:
-                self.request_area_preset(area, self._area[area][CONF_QUERY_CHANNEL])
-            for channel in self._area[area][CONF_CHANNEL]:
-                self.create_channel_if_new(area, channel)
-                if self._active in [ACTIVE_INIT, ACTIVE_ON]:
-                    self.request_channel_level(area, channel)
-            for preset in self._area[area][CONF_PRESET]:
-                self.create_preset_if_new(area, preset)
+        # without auto discovery, only the presets of other areas are decoded
+        self._dynalite.set_areas(None if self._auto_discover else self._area)
+        # apply only what changed since the last configure, and query only new entities
+        query = self._active in [ACTIVE_INIT, ACTIVE_ON]
+        new_areas = []
+        for area, area_config in self._area.items():
+            old_config = old_area.get(area)
+            if old_config == area_config and not refresh_all:
+                continue
+            if old_config is not None and any(
+                getattr(old_config, field) != getattr(area_config, field)
+                for field in AREA_REBUILD_FIELDS
+            ):
+                # the template devices depend on these, so start the area over
+                self.remove_area(area)
+                old_config = None
+            if old_config is None:
+                new_areas.append(area)
+                if query and not self.is_state_fresh(CONF_PRESET, area):
+                    # an area with only hidden presets is queried after the others
+                    hidden = area_config.template != CONF_ROOM and all(
+                        preset.hidden for preset in area_config.presets.values()
+                    )
+                    self._sync.add(CONF_PRESET, area, 0, hidden)
+            self.apply_area_diff(area, old_config, area_config, query, refresh_all)
+            if old_config is None:
+                self.restore_state(CONF_PRESET, area)
         # register the rooms (switches on presets 1/4)
         # all the devices should be created for channels and presets
-        self.register_rooms()
+        self.register_rooms(new_areas)
         # register the time covers
-        self.register_time_covers()
-        # callback for all devices
-        if self._new_device_func and self._waiting_devices:
-            self._new_device_func(self._waiting_devices)
-            self._waiting_devices = []
-        self._configured = True
-
-    def register_rooms(self) -> None:
+        self.register_time_covers(new_areas)
+        # callback for all devices, in chunks if configured
+        if self._register_call:
+            self._register_call.cancel()
+        if self._register_chunk > 0:
+            self._waiting_devices.sort(key=register_priority)
+        self.register_waiting()
+        if self.connected:
+            self._sync.start()
+
+    def apply_area_diff(
+        self,
+        area: int,
+        old_config: Optional[AreaConfig],
+        area_config: AreaConfig,
+        query: bool,
+        refresh_all: bool = False,
+    ) -> None:
+        """Add, remove and refresh the channels and presets of an area that changed."""
+        changed: List[DynaliteBaseDevice] = []
+        for kind in [CONF_CHANNEL, CONF_PRESET]:
+            old_items = old_config.entities(kind) if old_config else {}
+            items = area_config.entities(kind)
+            for item in old_items:
+                if item not in items:
+                    device = self._devices.remove(kind, area, item)
+                    if kind == CONF_PRESET and self._current_preset.get(area) == item:
+                        del self._current_preset[area]
+                    if device:
+                        self.remove_devices([device])
+            for item, item_config in items.items():
+                old_item = old_items.get(item)
+                if old_item == item_config:
+                    continue
+                old_device = None
+                if old_item is not None:
+                    if all(
+                        getattr(old_item, field, None)
+                        == getattr(item_config, field, None)
+                        for field in ENTITY_REBUILD_FIELDS
+                    ):
+                        device = self._devices.get(kind, area, item)
+                        if device:
+                            changed.append(device)
+                        continue
+                    # the device is of another type or only kept as state now
+                    old_device = self._devices.remove(kind, area, item)
+                    if old_device:
+                        self.remove_devices([old_device])
+                if kind == CONF_CHANNEL:
+                    self.create_channel_if_new(area, item)
+                    fresh = self.restore_state(CONF_CHANNEL, area, item)
+                    if query and not fresh:
+                        self._sync.add(CONF_CHANNEL, area, item, item_config.hidden)
+                else:
+                    self.create_preset_if_new(area, item)
+                if old_device:
+                    self.replace_template_device(kind, area, item, old_device)
+        if old_config and (
+            refresh_all or old_config.area_values() != area_config.area_values()
+        ):
+            # the name or another value of the whole area or the bridge changed
+            changed = list(self._devices.devices(area=area))
+        for device in changed:
+            device.refresh_config()
+            self.update_device(device)
+
+    def replace_template_device(
+        self, kind: str, area: int, item: int, old_device: DynaliteBaseDevice
+    ) -> None:
+        """Attach the new device of an entity to the room or cover that had the old one."""
+        for template in [CONF_ROOM, CONF_TIME_COVER]:
+            multi_device = self._devices.get(template, area)
+            if not isinstance(multi_device, DynaliteMultiDevice):
+                continue
+            devnums = multi_device.device_numbers(old_device)
+            if devnums:
+                device = self.get_device(kind, area, item)
+                assert device
+                for devnum in devnums:
+                    multi_device.set_device(devnum, device)
+                self.update_device(multi_device)
+
+    def register_rooms(self, areas: Iterable[int]) -> None:
         """Register the room switches from two normal presets each."""
-        for area, area_config in self._area.items():
-            if area_config.get(CONF_TEMPLATE, "") == CONF_ROOM:
-                if area in self._added_room_switches:
+        for area in areas:
+            area_config = self._area[area]
+            if area_config.template == CONF_ROOM:
+                if (CONF_ROOM, area, 0) in self._devices:
                     continue
                 new_device = DynaliteDualPresetSwitchDevice(area, self, False)
-                self._added_room_switches[area] = new_device
+                self._devices.add(CONF_ROOM, area, 0, new_device)
                 new_device.set_device(
-                    1, self._added_presets[area][area_config[CONF_ROOM_ON]]
+                    1, self.template_preset(area, area_config.room_on)
                 )
                 new_device.set_device(
-                    2, self._added_presets[area][area_config[CONF_ROOM_OFF]]
+                    2, self.template_preset(area, area_config.room_off)
                 )
                 self.register_new_device(new_device)
 
-    def register_time_covers(self) -> None:
+    def register_time_covers(self, areas: Iterable[int]) -> None:
         """Register the time covers from three presets and a channel each."""
-        for area, area_config in self._area.items():
-            if area_config.get(CONF_TEMPLATE, "") == CONF_TIME_COVER:
-                if area in self._added_time_covers:
+        for area in areas:
+            area_config = self._area[area]
+            if area_config.template == CONF_TIME_COVER:
+                if (CONF_TIME_COVER, area, 0) in self._devices:
                     continue
-                if area_config[CONF_TILT_TIME] == 0:
+                if area_config.tilt_time == 0:
                     new_device = DynaliteTimeCoverDevice(
                         area, self, self._poll_timer, False
                     )
@@ -200,23 +431,48 @@ class DynaliteDevices:
                     new_device = DynaliteTimeCoverWithTiltDevice(
                         area, self, self._poll_timer, False
                     )
-                self._added_time_covers[area] = new_device
-                new_device.set_device(
-                    1, self._added_presets[area][area_config[CONF_OPEN_PRESET]]
-                )
-                new_device.set_device(
-                    2, self._added_presets[area][area_config[CONF_CLOSE_PRESET]]
-                )
-                new_device.set_device(
-                    3, self._added_presets[area][area_config[CONF_STOP_PRESET]]
-                )
-                if area_config[CONF_CHANNEL_COVER] != 0:
-                    channel_device = self._added_channels[area][
-                        area_config[CONF_CHANNEL_COVER]
-                    ]
-                    new_device.set_device(4, channel_device)
+                self._devices.add(CONF_TIME_COVER, area, 0, new_device)
+                for devnum, preset in enumerate(
+                    [
+                        area_config.open_preset,
+                        area_config.close_preset,
+                        area_config.stop_preset,
+                    ],
+                    1,
+                ):
+                    new_device.set_device(devnum, self.template_preset(area, preset))
+                if area_config.channel_cover:
+                    channel_device = self.get_device(
+                        CONF_CHANNEL, area, area_config.channel_cover
+                    )
+                    # a channel of an unknown type has no device
+                    if channel_device:
+                        new_device.set_device(4, channel_device)
+                self.restore_state(CONF_TIME_COVER, area)
                 self.register_new_device(new_device)
 
+    def template_preset(self, area: int, preset: Optional[int]) -> DynaliteBaseDevice:
+        """Return the device of a preset that the template of an area uses."""
+        assert preset is not None  # set for the template of the area
+        device = self.get_device(CONF_PRESET, area, preset)
+        assert device
+        return device
+
+    def create_cover_group(
+        self,
+        areas: Iterable[int],
+        update_func: Optional[Callable[[DynaliteTimeCoverGroup], None]] = None,
+    ) -> DynaliteTimeCoverGroup:
+        """Create a group of the time covers in several areas with one timer."""
+        covers = []
+        for area in dict.fromkeys(areas):  # one cover per distinct area
+            cover = self._devices.get(CONF_TIME_COVER, area)
+            if not cover:
+                raise ValueError(f"No time cover in area {area}")
+            assert isinstance(cover, DynaliteTimeCoverDevice)
+            covers.append(cover)
+        return DynaliteTimeCoverGroup(self, covers, self._poll_timer, update_func)
+
     def register_new_device(self, device: DynaliteBaseDevice) -> None:
         """Register a new device and group all the ones prior to CONFIGURED event together."""
         # after initial configuration, every new device gets sent on its own. The initial ones are bunched together
@@ -226,21 +482,83 @@ class DynaliteDevices:
             else:  # send all the devices together when configured
                 self._waiting_devices.append(device)
 
+    def register_waiting(self) -> None:
+        """Send the next chunk of the devices that wait for the configuration.
+
+        The rest are sent on the next iterations of the loop, so a large site does not
+        block the application. The configuration is done after the last chunk.
+        """
+        self._register_call = None
+        chunk = self._register_chunk
+        if chunk <= 0:
+            chunk = len(self._waiting_devices)
+        devices = self._waiting_devices[:chunk]
+        del self._waiting_devices[:chunk]
+        if devices:
+            self._new_device_func(devices)
+        if self._waiting_devices:
+            self._register_call = self._scheduler.call_later(0, self.register_waiting)
+        else:
+            self._configured = True
+
     def available(self, conf: str, area: int, item_num: Union[int, str]) -> bool:
         """Return whether a device on the bridge is available."""
-        if not self.connected:
-            return False
+        return self.connected and self.is_configured(conf, area, item_num)
+
+    def is_configured(self, conf: str, area: int, item_num: Union[int, str]) -> bool:
+        """Return whether a device is in the current configuration."""
         if conf in [CONF_CHANNEL, CONF_PRESET]:
-            return bool(self._area.get(area, {}).get(conf, {}).get(item_num, False))
+            return item_num in self.area_entities(area, conf)
         assert conf == CONF_TEMPLATE
-        return self._area.get(area, {}).get(CONF_TEMPLATE, "") == item_num
+        area_config = self._area.get(area)
+        return area_config is not None and area_config.template == item_num
+
+    def area_entities(self, area: int, kind: str) -> Mapping[int, Any]:
+        """Return the configured channels or presets of an area."""
+        area_config = self._area.get(area)
+        return area_config.entities(kind) if area_config else {}
 
     def update_device(self, device: Optional[DynaliteBaseDevice] = None) -> None:
         """Update one or more devices."""
         if device and device.hidden:
             return
+        if self._update_batch_func and self._loop:
+            if device is None:
+                # an update of all devices supersedes the pending batch
+                self.cancel_batch()
+            else:
+                self._dirty_devices[device] = None
+                if not self._batch_handle:
+                    self._batch_handle = self._scheduler.call_later(
+                        self._batch_window, self.flush_updates
+                    )
+                return
         self._update_device_func(device)
 
+    def update_if_changed(self, device: DynaliteBaseDevice, changed: bool) -> None:
+        """Update a device only if its state changed, count the suppressed ones."""
+        if changed:
+            self.update_device(device)
+        else:
+            self.suppressed_updates += 1
+
+    def flush_updates(self) -> None:
+        """Deliver all the devices that changed since the last batch together."""
+        self._batch_handle = None
+        if not self._dirty_devices:
+            return
+        devices = list(self._dirty_devices)
+        self._dirty_devices = {}
+        assert self._update_batch_func
+        self._update_batch_func(devices)
+
+    def cancel_batch(self) -> None:
+        """Drop the pending batch of device updates."""
+        if self._batch_handle:
+            self._batch_handle.cancel()
+            self._batch_handle = None
+        self._dirty_devices = {}
+
     def send_notification(self, notification: DynaliteNotification) -> None:
         """Update one or more devices."""
         self._notification_func(notification)
@@ -248,10 +566,19 @@ class DynaliteDevices:
     def handle_event(self, event: DynetEvent) -> None:
         """Handle all events."""
         LOGGER.debug("handle_event - type=%s event=%s", event.event_type, event.data)
+        if event.echo_rtt is not None:
+            # our own command, it was already handled when it was sent
+            self.echo_count += 1
+            self.echo_rtt = event.echo_rtt
+            self.echo_rtt_average += (
+                event.echo_rtt - self.echo_rtt_average
+            ) / self.echo_count
+            return
         if event.event_type == EVENT_CONNECTED:
             LOGGER.debug("Received CONNECTED message")
             self.connected = True
             self.update_device()
+            self._sync.start()
         elif event.event_type == EVENT_DISCONNECTED:
             LOGGER.debug("Received DISCONNECTED message")
             self.connected = False
@@ -290,32 +617,50 @@ class DynaliteDevices:
             self._area[area] = DynaliteConfig.configure_area(
                 area, {}, self._default_fade, self._default_query_channel, {}, {}
             )
+            self._dynalite.add_area(area)
+            self._discovered_areas.add(area)
 
     def create_preset_if_new(self, area: int, preset: int) -> None:
         """Register a new preset."""
         LOGGER.debug("create_preset_if_new - area=%s preset=%s", area, preset)
         # if already configured, ignore
-        if self._added_presets.get(area, {}).get(preset, False):
+        if (CONF_PRESET, area, preset) in self._devices:
+            return
+        if area not in self._area and not self._auto_discover:
+            # without auto discovery, other areas only get their notifications
+            return
+        discovered = preset not in self.area_entities(area, CONF_PRESET)
+        if discovered and not self.allow_discovery():
+            LOGGER.debug("Not discovering area=%s preset=%s", area, preset)
             return
         self.ensure_area(area)
         area_config = self._area[area]
-        if preset not in area_config[CONF_PRESET]:
-            area_config[CONF_PRESET][preset] = DynaliteConfig.configure_preset(
-                preset,
-                self._default_presets.get(preset, {}),
-                area_config[CONF_FADE],
-                CONF_TEMPLATE in area_config or not self._auto_discover,
-            )
-            # if the area is a template is a template, new presets should be hidden
-            if area_config.get(CONF_TEMPLATE, False):
-                area_config[CONF_PRESET][preset][CONF_HIDDEN_ENTITY] = True
-        hidden = area_config[CONF_PRESET][preset].get(CONF_HIDDEN_ENTITY, False)
+        if discovered:
+            if self._auto_discover:
+                # without autodiscover the entity is hidden, and not kept for eviction
+                self._discovered[(CONF_PRESET, area, preset)] = self.time()
+            # in a template area, new presets are hidden
+            hidden = area_config.template is not None or not self._auto_discover
+            default = self._default_presets.get(preset)
+            if default:
+                preset_config = shared_preset_config(
+                    default.name, default.fade, default.level, hidden
+                )
+            else:
+                preset_config = DynaliteConfig.configure_preset(
+                    preset, {}, area_config.fade, hidden
+                )
+            area_config = area_config.with_entity(CONF_PRESET, preset, preset_config)
+            self._area[area] = area_config
+        hidden = area_config.presets[preset].hidden
+        if hidden:
+            # only the state is kept until something needs a device, see get_device
+            self._devices.add_lazy(CONF_PRESET, area, preset)
+            return
         new_device = DynalitePresetSwitchDevice(area, preset, self, hidden)
-        new_device.set_level(0)
+        new_device.set_level(1 if self._current_preset.get(area) == preset else 0)
         self.register_new_device(new_device)
-        if area not in self._added_presets:
-            self._added_presets[area] = {}
-        self._added_presets[area][preset] = new_device
+        self._devices.add(CONF_PRESET, area, preset, new_device)
         LOGGER.debug(
             "Creating Dynalite preset area=%s preset=%s hidden=%s", area, preset, hidden
         )
@@ -326,128 +671,314 @@ class DynaliteDevices:
         LOGGER.debug("handle_preset_selection - event=%s", event.data)
         area = event.data[CONF_AREA]
         preset = event.data[CONF_PRESET]
-        self.create_preset_if_new(area, preset)
-        # Update all the preset devices
-        for cur_preset_in_area in self._added_presets[area]:
-            device = self._added_presets[area][cur_preset_in_area]
-            if cur_preset_in_area == preset:
-                device.set_level(1)
-            else:
-                device.set_level(0)
-            self.update_device(device)
+        self._sync.answered(CONF_PRESET, area, 0)
+        key = (CONF_PRESET, area, preset)
+        if key not in self._devices:
+            self.create_preset_if_new(area, preset)
+            if key not in self._devices:
+                return
+        if key in self._discovered:
+            self.touch_discovered(key)
+        # Only the previously selected preset and the new one change
+        old_preset = self._current_preset.get(area)
+        self._current_preset[area] = preset
+        # hidden presets without a device only follow the current preset
+        presets = self._devices.area_devices(area, CONF_PRESET)
+        if old_preset is not None and old_preset != preset:
+            device = presets.get(old_preset)
+            if device:
+                assert isinstance(device, DynalitePresetSwitchDevice)
+                self.update_if_changed(device, device.set_level(0))
+        device = presets.get(preset)
+        if device:
+            assert isinstance(device, DynalitePresetSwitchDevice)
+            self.update_if_changed(device, device.set_level(1))
+        if self._state.path:
+            self._state.seen(state_key(CONF_PRESET, area), preset)
         # If active is set to full, query all channels in the area
         if self._active == ACTIVE_ON:
-            for channel in self._area[area].get(CONF_CHANNEL, {}):
+            for channel in self._area[area].channels:
                 self.request_channel_level(area, channel)
 
+    def allow_discovery(self) -> bool:
+        """Return whether a new entity can be discovered, evicting an idle one if needed."""
+        if self._discover_rate:
+            # token bucket that allows a burst of up to one second of discoveries
+            now = self.time()
+            self._discover_tokens = min(
+                max(self._discover_rate, 1.0),
+                self._discover_tokens
+                + (now - self._discover_time) * self._discover_rate,
+            )
+            self._discover_time = now
+            if self._discover_tokens < 1:
+                return False
+        if self._max_discovered and len(self._discovered) >= self._max_discovered:
+            key, last_seen = next(iter(self._discovered.items()))
+            if self.time() - last_seen < self._discover_idle:
+                return False
+            self.remove_discovered(key)
+        if self._discover_rate:
+            self._discover_tokens -= 1
+        return True
+
+    def touch_discovered(self, key: DeviceKey) -> None:
+        """Mark a discovered entity as the most recently seen."""
+        self._discovered[key] = self.time()
+        self._discovered.move_to_end(key)
+
+    def remove_discovered(self, key: DeviceKey) -> None:
+        """Remove a discovered entity, and its area if nothing is left in it."""
+        del self._discovered[key]
+        kind, area, item = key
+        LOGGER.debug("Removing discovered %s area=%s item=%s", kind, area, item)
+        device = self._devices.remove(kind, area, item)
+        if device:
+            self.remove_devices([device])
+        area_config = self._area.get(area)
+        if area_config:
+            area_config = area_config.without_entity(kind, item)
+            self._area[area] = area_config
+            if (
+                area in self._discovered_areas
+                and not area_config.channels
+                and not area_config.presets
+            ):
+                del self._area[area]
+                self._discovered_areas.discard(area)
+        if kind == CONF_PRESET and self._current_preset.get(area) == item:
+            del self._current_preset[area]
+
+    def remove_area(self, area: int) -> None:
+        """Remove the devices of an area that is no longer configured."""
+        LOGGER.debug("Removing area %s", area)
+        for key in list(self._discovered):
+            if key[1] == area:
+                del self._discovered[key]
+        self._current_preset.pop(area, None)
+        self.remove_devices(self._devices.remove_area(area))
+
+    def remove_devices(self, devices: List[DynaliteBaseDevice]) -> None:
+        """Release removed devices and tell the application about the visible ones."""
+        for device in devices:
+            device.cleanup()
+            self._dirty_devices.pop(device, None)
+        unsent = set(self._waiting_devices).intersection(devices)
+        if unsent:
+            # the application never got these, so it is not told they are gone
+            self._waiting_devices = [
+                device for device in self._waiting_devices if device not in unsent
+            ]
+            devices = [device for device in devices if device not in unsent]
+        visible = [device for device in devices if not device.hidden]
+        if visible and self._remove_device_func:
+            self._remove_device_func(visible)
+
+    def get_current_preset(self, area: int) -> Optional[int]:
+        """Return the preset that was last selected in an area, if known."""
+        return self._current_preset.get(area)
+
+    def init_current_preset(self, area: int, preset: int) -> None:
+        """Set the selected preset of an area when a preset is initialized to on."""
+        old_preset = self._current_preset.get(area)
+        self._current_preset[area] = preset
+        if old_preset is not None and old_preset != preset:
+            device = self._devices.get(CONF_PRESET, area, old_preset)
+            if device:
+                device.init_level(0)
+
     def create_channel_if_new(self, area: int, channel: int) -> None:
         """Register a new channel."""
         LOGGER.debug("create_channel_if_new - area=%s, channel=%s", area, channel)
         # if already configured, ignore
-        if self._added_channels.get(area, {}).get(channel, False):
+        if (CONF_CHANNEL, area, channel) in self._devices:
+            return
+        if area not in self._area and not self._auto_discover:
+            # without auto discovery, other areas only get their notifications
+            return
+        discovered = channel not in self.area_entities(area, CONF_CHANNEL)
+        if discovered and not self.allow_discovery():
+            LOGGER.debug("Not discovering area=%s channel=%s", area, channel)
             return
         self.ensure_area(area)
         area_config = self._area[area]
-        if channel not in area_config[CONF_CHANNEL]:
-            area_config[CONF_CHANNEL][channel] = DynaliteConfig.configure_channel(
+        if discovered:
+            if self._auto_discover:
+                # without autodiscover the entity is hidden, and not kept for eviction
+                self._discovered[(CONF_CHANNEL, area, channel)] = self.time()
+            channel_config = DynaliteConfig.configure_channel(
                 channel,
                 {},
-                area_config[CONF_FADE],
-                CONF_TEMPLATE in area_config or not self._auto_discover,
+                area_config.fade,
+                area_config.template is not None or not self._auto_discover,
             )
-        channel_config = area_config[CONF_CHANNEL][channel]
+            area_config = area_config.with_entity(CONF_CHANNEL, channel, channel_config)
+            self._area[area] = area_config
+        channel_config = area_config.channels[channel]
         LOGGER.debug("create_channel_if_new - channel_config=%s", channel_config)
-        channel_type = channel_config.get(
-            CONF_CHANNEL_TYPE, DEFAULT_CHANNEL_TYPE
-        ).lower()
-        hidden = channel_config.get(CONF_HIDDEN_ENTITY, False)
-        if channel_type == "light":
-            new_device: DynaliteBaseDevice = DynaliteChannelLightDevice(
-                area, channel, self, hidden
-            )
-            self.register_new_device(new_device)
-        elif channel_type == "switch":
-            new_device = DynaliteChannelSwitchDevice(area, channel, self, hidden)
-            self.register_new_device(new_device)
-        else:
+        channel_type = channel_config.channel_type.lower()
+        if channel_type not in ["light", "switch"]:
             LOGGER.info("unknown chnanel type %s - ignoring", channel_type)
             return
-        if area not in self._added_channels:
-            self._added_channels[area] = {}
-        self._added_channels[area][channel] = new_device
+        if channel_config.hidden:
+            # only the level is kept until something needs a device, see get_device
+            self._devices.add_lazy(CONF_CHANNEL, area, channel)
+            return
+        new_device = self.new_channel_device(area, channel)
+        self.register_new_device(new_device)
+        self._devices.add(CONF_CHANNEL, area, channel, new_device)
         LOGGER.debug("Creating Dynalite channel area=%s channel=%s", area, channel)
 
+    def channel_class(self, area: int, channel: int) -> Type[DynaliteChannelBaseDevice]:
+        """Return the device class of a channel by its type."""
+        channel_config = self._area[area].channels[channel]
+        if channel_config.channel_type.lower() == "light":
+            return DynaliteChannelLightDevice
+        return DynaliteChannelSwitchDevice
+
+    def new_channel_device(self, area: int, channel: int) -> DynaliteChannelBaseDevice:
+        """Create the device of a channel by its type."""
+        channel_class = self.channel_class(area, channel)
+        hidden = self._area[area].channels[channel].hidden
+        return channel_class(area, channel, self, hidden)
+
+    def get_device(
+        self, kind: str, area: int, item: int = 0
+    ) -> Optional[DynaliteBaseDevice]:
+        """Return the device of an entity, creating it for a hidden entity if needed."""
+        device = self._devices.get(kind, area, item)
+        if device is None and self._devices.is_lazy(kind, area, item):
+            level = self._devices.pop_lazy(kind, area, item)
+            LOGGER.debug("Creating hidden %s area=%s item=%s", kind, area, item)
+            if kind == CONF_PRESET:
+                device = DynalitePresetSwitchDevice(area, item, self, True)
+                device.set_level(1 if self._current_preset.get(area) == item else 0)
+            else:
+                assert kind == CONF_CHANNEL
+                device = self.new_channel_device(area, item)
+                device.update_level(level, level)
+            self._devices.add(kind, area, item, device)
+        return device
+
+    def lazy_channel_level(self, area: int, event: DynetEvent) -> Optional[float]:
+        """Return the level a channel event leaves a channel at, if it sets one."""
+        assert event.data
+        action = event.data[CONF_ACTION]
+        if action == CONF_ACTION_REPORT:
+            return (255 - event.data[CONF_ACT_LEVEL]) / 254
+        if action == CONF_ACTION_CMD:
+            return (255 - event.data[CONF_TRGT_LEVEL]) / 254
+        if action == CONF_ACTION_PRESET:
+            preset_config = self._area[area].presets.get(event.data[CONF_PRESET])
+            return preset_config.level if preset_config else None
+        return None
+
     def handle_channel_change(self, event: DynetEvent) -> None:
         """Change the level of a channel."""
         assert event.data
         LOGGER.debug("handle_channel_change - data=%s", event.data)
         area = event.data[CONF_AREA]
-        channel = event.data.get(CONF_CHANNEL, None)
+        channel: Optional[int] = event.data.get(CONF_CHANNEL, None)
         if channel:
-            self.create_channel_if_new(area, channel)
+            key = (CONF_CHANNEL, area, channel)
+            if key not in self._devices:
+                self.create_channel_if_new(area, channel)
+                if key not in self._devices:
+                    return
+            if key in self._discovered:
+                self.touch_discovered(key)
         action = event.data[CONF_ACTION]
+        if channel and self._devices.is_lazy(CONF_CHANNEL, area, channel):
+            # a hidden channel without a device only keeps its level
+            level = self.lazy_channel_level(area, event)
+            if level is not None:
+                self._devices.set_lazy_level(CONF_CHANNEL, area, channel, level)
+                if self._state.path:
+                    self._state.seen(
+                        state_key(CONF_CHANNEL, area, channel),
+                        level * self.channel_class(area, channel).state_scale,
+                    )
+            if action == CONF_ACTION_REPORT:
+                self._sync.answered(CONF_CHANNEL, area, channel)
+            return
+        channels = self._devices.area_devices(area, CONF_CHANNEL)
         if action == CONF_ACTION_REPORT:
+            assert channel
             actual_level = (255 - event.data[CONF_ACT_LEVEL]) / 254
             target_level = (255 - event.data[CONF_TRGT_LEVEL]) / 254
-            channel_to_set = self._added_channels[area][channel]
-            channel_to_set.update_level(actual_level, target_level)
-            self.update_device(channel_to_set)
+            channel_to_set = self.channel_device(area, channel)
+            changed = channel_to_set.update_level(actual_level, target_level)
+            self.update_if_changed(channel_to_set, changed)
+            self._sync.answered(CONF_CHANNEL, area, channel)
+            level = channel_to_set.state_level
+            if self._state.path and level is not None:
+                self._state.seen(state_key(CONF_CHANNEL, area, channel), level)
         elif action == CONF_ACTION_CMD:
+            assert channel
             target_level = (255 - event.data[CONF_TRGT_LEVEL]) / 254
-            # when there is only a "set channel level" command, assume that this is both the actual and the target
-            channel_to_set = self._added_channels[area][channel]
-            channel_to_set.update_level(target_level, target_level)
-            self.update_device(channel_to_set)
+            channel_to_set = self.channel_device(area, channel)
+            if isinstance(channel_to_set, DynaliteChannelLightDevice):
+                # lights model the fade locally until it completes
+                fade = event.data.get(CONF_FADE, 0)
+                changed = channel_to_set.start_fade(target_level, fade)
+            else:
+                # when there is only a "set channel level" command, assume that this is both the actual and the target
+                changed = channel_to_set.update_level(target_level, target_level)
+            self.update_if_changed(channel_to_set, changed)
         elif action == CONF_ACTION_STOP:
             if channel:
-                channel_to_set = self._added_channels[area][channel]
-                channel_to_set.stop_fade()
-                self.update_device(channel_to_set)
+                channel_to_set = self.channel_device(area, channel)
+                self.update_if_changed(channel_to_set, channel_to_set.stop_fade())
             else:
-                for channel in self._added_channels.get(area, {}):
-                    channel_to_set = self._added_channels[area][channel]
-                    channel_to_set.stop_fade()
-                    self.update_device(channel_to_set)
+                for device in channels.values():
+                    assert isinstance(device, DynaliteChannelBaseDevice)
+                    self.update_if_changed(device, device.stop_fade())
         else:
             assert action == CONF_ACTION_PRESET
             assert channel  # XXX - not handling for all channels
             area_config = self._area[area]
-            area_preset = area_config.get(CONF_PRESET, {})
-            preset_num = event.data[CONF_PRESET]
-            target_level = area_preset.get(preset_num, {}).get(CONF_LEVEL, -1)
-            if target_level != -1:
-                channel_to_set = self._added_channels[area][channel]
-                channel_to_set.update_level(target_level, target_level)
-                self.update_device(channel_to_set)
+            preset_config = area_config.presets.get(event.data[CONF_PRESET])
+            target_level = preset_config.level if preset_config else None
+            if target_level is not None:
+                channel_to_set = self.channel_device(area, channel)
+                changed = channel_to_set.update_level(target_level, target_level)
+                self.update_if_changed(channel_to_set, changed)
+
+    def channel_device(self, area: int, channel: int) -> DynaliteChannelBaseDevice:
+        """Return the device of a channel that has one."""
+        device = self._devices.get(CONF_CHANNEL, area, channel)
+        assert isinstance(device, DynaliteChannelBaseDevice)
+        return device
 
     def add_timer_listener(self, callback_func: Callable[[], None]) -> None:
-        """Add a listener to the timer and start if needed."""
-        self._timer_callbacks.add(callback_func)
-        if not self._timer_active:
-            assert self._loop
-            self._loop.call_later(self._poll_timer, self.timer_func)
-            self._timer_active = True
+        """Call a callback every poll timer until it is removed."""
+        if callback_func not in self._timer_calls:
+            self._timer_calls[callback_func] = self._scheduler.call_every(
+                self._poll_timer, callback_func
+            )
 
     def remove_timer_listener(self, callback_func: Callable[[], None]) -> None:
         """Remove a listener from a timer."""
-        self._timer_callbacks.discard(callback_func)
-
-    def timer_func(self) -> None:
-        """Call callbacks and either schedule timer or stop."""
-        if self._timer_callbacks and not self._resetting:
-            assert self._loop
-            cur_callbacks = self._timer_callbacks.copy()
-            for callback in cur_callbacks:
-                callback()
-            self._loop.call_later(self._poll_timer, self.timer_func)
-        else:
-            self._timer_active = False
+        call = self._timer_calls.pop(callback_func, None)
+        if call:
+            call.cancel()
+
+    def time(self) -> float:
+        """Return the current time of the scheduler."""
+        return self._scheduler.time()
+
+    def call_at(self, when: float, callback: Callable[[], None]) -> ScheduledCall:
+        """Call a callback at a given time of the scheduler."""
+        return self._scheduler.call_at(when, callback)
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> ScheduledCall:
+        """Call a callback after a delay."""
+        return self._scheduler.call_later(delay, callback)
 
     def set_channel_level(
         self, area: int, channel: int, level: float, fade: float
     ) -> None:
         """Set the level for a channel."""
-        fade = self._area[area][CONF_CHANNEL][channel][CONF_FADE]
         self._dynalite.set_channel_level(area, channel, level, fade)
 
     def select_preset(self, area: int, preset: int, fade: float) -> None:
@@ -458,7 +989,7 @@ class DynaliteDevices:
         """Send a request to an area to report the preset."""
         if query_channel is None:
             if area in self._area:
-                query_channel = self._area[area][CONF_QUERY_CHANNEL]
+                query_channel = self._area[area].query_channel
             else:
                 query_channel = self._default_query_channel
         self._dynalite.request_area_preset(area, query_channel)
@@ -469,80 +1000,165 @@ class DynaliteDevices:
 
     def get_area_name(self, area: int) -> str:
         """Return the name of an area."""
-        return self._area[area][CONF_NAME]
+        return self._area[area].name
 
     def get_channel_name(self, area: int, channel: int) -> str:
         """Return the name of a channel."""
-        cur_area = self._area.get(area, {})
-        default_area_name = f"Area {area}"
-        default_channel_name = f"Channel {channel}"
-        return f"{cur_area.get(CONF_NAME, default_area_name)} {cur_area.get(CONF_CHANNEL, {}).get(channel, {}).get(CONF_NAME, default_channel_name)}"
+        area_config = self._area.get(area)
+        area_name = area_config.name if area_config else f"Area {area}"
+        channel_config = self.area_entities(area, CONF_CHANNEL).get(channel)
+        channel_name = channel_config.name if channel_config else f"Channel {channel}"
+        return f"{area_name} {channel_name}"
+
+    def get_level_hysteresis(self) -> float:
+        """Return the minimal level change to report while a channel is fading."""
+        return self._hysteresis
 
     def get_channel_fade(self, area: int, channel: int) -> float:
         """Return the fade of a channel."""
-        try:
-            return self._area[area][CONF_CHANNEL][channel][CONF_FADE]
-        except KeyError:
-            return self._default_fade
+        channel_config = self.area_entities(area, CONF_CHANNEL).get(channel)
+        return channel_config.fade if channel_config else self._default_fade
 
     def get_preset_name(self, area: int, preset: int) -> str:
         """Return the name of a preset."""
-        cur_area = self._area.get(area, {})
-        area_name = cur_area.get(CONF_NAME, f"Area {area}")
-        preset_name = (
-            cur_area.get(CONF_PRESET, {})
-            .get(preset, {})
-            .get(CONF_NAME, f"Preset {preset}")
-        )
+        area_config = self._area.get(area)
+        area_name = area_config.name if area_config else f"Area {area}"
+        preset_config = self.area_entities(area, CONF_PRESET).get(preset)
+        preset_name = preset_config.name if preset_config else f"Preset {preset}"
         if area_name == preset_name:
             return preset_name
         return f"{area_name} {preset_name}"
 
     def get_preset_fade(self, area: int, preset: int) -> float:
         """Return the fade of a preset."""
-        try:
-            return self._area[area][CONF_PRESET][preset][CONF_FADE]
-        except KeyError:
-            return self._default_fade
+        preset_config = self.area_entities(area, CONF_PRESET).get(preset)
+        return preset_config.fade if preset_config else self._default_fade
 
     def get_multi_name(self, area: int) -> str:
         """Return the name of a multi-device."""
-        return self._area[area][CONF_NAME]
+        return self._area[area].name
 
     def get_device_class(self, area: int) -> str:
         """Return the class for a blind."""
-        try:
-            return self._area[area][CONF_DEVICE_CLASS]
-        except KeyError:
+        area_config = self._area.get(area)
+        if area_config is None or area_config.device_class is None:
             return DEFAULT_COVER_CLASS
+        return area_config.device_class
 
-    def get_cover_duration(self, area: int) -> float:
-        """Return the class for a blind."""
-        try:
-            return self._area[area][CONF_DURATION]
-        except KeyError:
+    def get_configured_cover_duration(self, area: int) -> float:
+        """Return the configured travel duration of a cover."""
+        area_config = self._area.get(area)
+        if area_config is None or area_config.duration is None:
             return 60
+        return area_config.duration
+
+    def get_cover_duration(self, area: int) -> float:
+        """Return the travel duration of a cover, calibrated if it was observed."""
+        calibrated = self._calibration.get_duration(area)
+        if calibrated is None:
+            return self.get_configured_cover_duration(area)
+        return calibrated
 
     def get_cover_tilt_duration(self, area: int) -> float:
-        """Return the class for a blind."""
-        try:
-            return self._area[area][CONF_TILT_TIME]
-        except KeyError:
+        """Return the tilt duration, scaled like the travel duration."""
+        area_config = self._area.get(area)
+        if area_config is None or area_config.tilt_time is None:
             return 0
+        tilt_duration = area_config.tilt_time
+        calibrated = self._calibration.get_duration(area)
+        if calibrated is None:
+            return tilt_duration
+        # the tilt is done by the same motor, so it scales with the travel
+        return tilt_duration * calibrated / self.get_configured_cover_duration(area)
+
+    def add_cover_calibration(self, area: int, duration: float) -> None:
+        """Add an observed travel duration of a cover and persist the calibration."""
+        average = self._calibration.add_sample(area, duration)
+        LOGGER.debug(
+            "cover calibration area=%s observed=%s average=%s", area, duration, average
+        )
+        if self._calibration.path and self._loop:
+            self._calibration.save(self._loop, self._calibration.dump())
+
+    def is_state_fresh(self, kind: str, area: int, item: int = 0) -> bool:
+        """Return whether the snapshot has a recent state of an entity in the config."""
+        key = state_key(kind, area, item)
+        if not self._state.is_fresh(key, self._state_max_age):
+            return False
+        if kind == CONF_PRESET:
+            item = int(self._state.get(key) or 0)
+        return item in self.area_entities(area, kind)
+
+    def restore_state(self, kind: str, area: int, item: int = 0) -> bool:
+        """Initialize a device from the snapshot and return whether that is recent."""
+        key = state_key(kind, area, item)
+        value = self._state.get(key)
+        if value is None:
+            return False
+        if kind == CONF_PRESET:
+            if self._devices.is_lazy(CONF_PRESET, area, int(value)):
+                # a hidden preset without a device only follows the current preset
+                self.init_current_preset(area, int(value))
+                return self._state.is_fresh(key, self._state_max_age)
+            device = self._devices.get(CONF_PRESET, area, int(value))
+            value = 1
+        elif kind == CONF_CHANNEL and self._devices.is_lazy(kind, area, item):
+            # a hidden channel without a device only keeps its level
+            level = value / self.channel_class(area, item).state_scale
+            if not 0 <= level <= 1:
+                return False
+            self._devices.set_lazy_level(kind, area, item, level)
+            return self._state.is_fresh(key, self._state_max_age)
+        else:
+            device = self._devices.get(kind, area, item)
+        if device is None:
+            return False
+        try:
+            device.init_level(value)
+        except ValueError:
+            return False
+        return self._state.is_fresh(key, self._state_max_age)
+
+    def save_state(self) -> None:
+        """Write the state of the devices to the snapshot if it changed."""
+        for area in self._area:
+            for kind in [CONF_CHANNEL, CONF_TIME_COVER]:
+                for item, device in self._devices.area_devices(area, kind).items():
+                    level = device.state_level
+                    if level is not None:
+                        self._state.set(state_key(kind, area, item), level)
+        for (kind, area, item), level in self._devices.lazy_levels():
+            if kind == CONF_CHANNEL:
+                scale = self.channel_class(area, item).state_scale
+                self._state.set(state_key(kind, area, item), level * scale)
+        for area, preset in self._current_preset.items():
+            self._state.set(state_key(CONF_PRESET, area), preset)
+        data = self._state.dump()
+        if data == self._state_written:
+            return
+        self._state_written = data
+        self._state.save(self._loop, data)
 
     def get_master_area(self, area: int) -> str:
         """Get the master area when combining entities from different Dynet areas to the same area."""
         assert area in self._area
         area_config = self._area[area]
-        master_area = area_config[CONF_NAME]
-        if CONF_AREA_OVERRIDE in area_config:
-            override_area = area_config[CONF_AREA_OVERRIDE]
+        master_area = area_config.name
+        if area_config.area_override is not None:
+            override_area = area_config.area_override
             master_area = override_area if override_area.lower() != CONF_NONE else ""
         return master_area
 
     async def async_reset(self) -> None:
         """Reset the connections and timers."""
-        self._resetting = True
+        if self._state.path:
+            self.save_state()
+        self._scheduler.stop()
+        self._state_call = None
+        self._register_call = None
+        self._sync.cancel()
+        self._timer_calls = {}
+        self.cancel_batch()
+        await self._state.async_flush()
+        await self._calibration.async_flush()
         await self._dynalite.async_reset()
-        while self._timer_active:
-            await asyncio.sleep(0.1)
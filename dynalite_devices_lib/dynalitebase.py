@@ -1,6 +1,6 @@
 """Support for the Dynalite devices."""
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Callable, Dict, List
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 
 from .const import CONF_CHANNEL
 
@@ -17,16 +17,25 @@ class DynaliteBaseDevice(ABC):
         self._bridge = bridge
         self._listeners: List[Callable[[DynaliteBaseDevice, bool], None]] = []
         self._hidden = hidden
+        self._area_name = ""
+        self._master_area = ""
+        self._configured = False
+        self.refresh_config()
+
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        self._area_name = self._bridge.get_area_name(self._area)
+        self._master_area = self._bridge.get_master_area(self._area)
 
     @property
     def area_name(self) -> str:
         """Return the name of the area."""
-        return self._bridge.get_area_name(self._area)
+        return self._area_name
 
     @property
     def get_master_area(self) -> str:
         """Get the master area when combining entities from different Dynet areas to the same area."""
-        return self._bridge.get_master_area(self._area)
+        return self._master_area
 
     @property
     def hidden(self) -> bool:
@@ -44,39 +53,67 @@ class DynaliteBaseDevice(ABC):
         for listener in self._listeners:
             listener(self, stop_fade)
 
+    def cleanup(self) -> None:
+        """Release what the device holds on the bridge when it is removed."""
+        self._configured = False
+
     @abstractmethod
     def init_level(self, level: float):
         """Initialize the level."""
 
+    @property
+    def state_level(self) -> Optional[float]:
+        """Return the level to keep in the state snapshot, as init_level takes it."""
+        return None
+
 
 class DynaliteChannelBaseDevice(DynaliteBaseDevice):
     """Representation of a Dynalite Channel as a Home Assistant device."""
 
+    # the value in the state snapshot of a channel at full level
+    state_scale = 1.0
+
     def __init__(
         self, area: int, channel: int, bridge: "DynaliteDevices", hidden: bool
     ) -> None:
         """Initialize the device."""
         self._channel = channel
+        self._name = ""
+        self._fade = 0.0
         super().__init__(area, bridge, hidden)
 
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        super().refresh_config()
+        self._configured = self._bridge.is_configured(
+            CONF_CHANNEL, self._area, self._channel
+        )
+        self._name = self._bridge.get_channel_name(self._area, self._channel)
+        self._fade = self._bridge.get_channel_fade(self._area, self._channel)
+
     @property
     def available(self) -> bool:
         """Return if device is available."""
-        return self._bridge.available(CONF_CHANNEL, self._area, self._channel)
+        return self._bridge.connected and self._configured
 
     @property
     def name(self) -> str:
         """Return the name of the device."""
-        return self._bridge.get_channel_name(self._area, self._channel)
+        return self._name
 
     @property
     def unique_id(self) -> str:
         """Return the ID of this device."""
         return "dynalite_area_" + str(self._area) + "_channel_" + str(self._channel)
 
-    def stop_fade(self) -> None:
-        """Update the listeners if STOP FADE is received."""
+    @abstractmethod
+    def update_level(self, actual_level: float, target_level: float) -> bool:
+        """Update the current level and return whether it changed."""
+
+    def stop_fade(self) -> bool:
+        """Update the listeners if STOP FADE is received and return whether the state changed."""
         self.update_listeners(True)
+        return False
 
 
 class DynaliteMultiDevice(DynaliteBaseDevice):
@@ -87,12 +124,18 @@ class DynaliteMultiDevice(DynaliteBaseDevice):
     ) -> None:
         """Initialize the device."""
         self._devices: Dict[int, DynaliteBaseDevice] = {}
+        self._name = ""
         super().__init__(area, bridge, hidden)
 
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        super().refresh_config()
+        self._name = self._bridge.get_multi_name(self._area)
+
     @property
     def name(self) -> str:
         """Return the name of the device."""
-        return self._bridge.get_multi_name(self._area)
+        return self._name
 
     def get_device(self, devnum: int) -> DynaliteBaseDevice:
         """Get one of the devices."""
@@ -104,6 +147,12 @@ class DynaliteMultiDevice(DynaliteBaseDevice):
         self._devices[devnum] = device
         device.add_listener(self.listener)
 
+    def device_numbers(self, device: DynaliteBaseDevice) -> List[int]:
+        """Return the numbers a device is attached at."""
+        return [
+            devnum for devnum, attached in self._devices.items() if attached is device
+        ]
+
     def listener(self, device: DynaliteBaseDevice, stop_fade: bool) -> None:
         """Update the device since its internal devices changed."""
         # pylint: disable=unused-argument
@@ -38,9 +38,9 @@ class DynetPacket:
         if msg is None:
             # Can only have one of the two init options
             assert area != -1 and command != -1 and data
-            self.area = area
-            self.command = command
-            self.data = data
+            self.area: int = area
+            self.command: int = command
+            self.data: List[int] = data
             self._msg: List[int] = [
                 SyncType.LOGICAL.value,
                 area,
@@ -1,15 +1,21 @@
 """Class to represent an event on the Dynet network."""
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 class DynetEvent:
     """Class to represent an event on the Dynet network."""
 
-    def __init__(self, event_type: str, data: Dict[str, Any] = None) -> None:
-        """Initialize the event."""
+    def __init__(
+        self,
+        event_type: str,
+        data: Dict[str, Any] = None,
+        echo_rtt: Optional[float] = None,
+    ) -> None:
+        """Initialize the event. echo_rtt is set when it is an echo of a frame we sent."""
         self.event_type = event_type.upper() if event_type else None
         self.data = data
+        self.echo_rtt = echo_rtt
 
     def __repr__(self):
         """Print the event."""
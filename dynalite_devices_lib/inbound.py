@@ -122,6 +122,7 @@ class DynetInbound:
         """Report that a channel was set to a specific level."""
         channel = ((packet.data[1] + 1) % 256) * 4 + channel_offset
         target_level = packet.data[0]
+        fade = packet.data[2] * 0.02
         return DynetEvent(
             event_type=EVENT_CHANNEL,
             data={
@@ -129,6 +130,7 @@ class DynetInbound:
                 CONF_CHANNEL: channel,
                 CONF_ACTION: CONF_ACTION_CMD,
                 CONF_TRGT_LEVEL: target_level,
+                CONF_FADE: fade,
             },
         )
 
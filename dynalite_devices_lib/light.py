@@ -1,25 +1,40 @@
 """Support for Dynalite channels as lights."""
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from .const import ATTR_BRIGHTNESS
 from .dynalitebase import DynaliteChannelBaseDevice
 
 if TYPE_CHECKING:  # pragma: no cover
     from .dynalite_devices import DynaliteDevices
+    from .scheduler import ScheduledCall
 
 
 class DynaliteChannelLightDevice(DynaliteChannelBaseDevice):
     """Representation of a Dynalite Channel as a Home Assistant Light."""
 
+    state_scale = 255.0
+
     def __init__(
         self, area: int, channel: int, bridge: "DynaliteDevices", hidden: bool
     ) -> None:
         """Initialize the light."""
         self._level = 0.0
+        self._reported_level = 0.0
         self._direction = "stop"
+        self._hysteresis = 0.0
+        # a fade that was commanded on the network, modelled locally
+        self._fade_start_level = 0.0
+        self._fade_start_time = 0.0
+        self._fade_end_time = 0.0
+        self._fade_call: Optional["ScheduledCall"] = None
         super().__init__(area, channel, bridge, hidden)
 
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        super().refresh_config()
+        self._hysteresis = self._bridge.get_level_hysteresis()
+
     @property
     def category(self) -> str:
         """Return the category of the entity: light, switch, or cover."""
@@ -45,9 +60,74 @@ class DynaliteChannelLightDevice(DynaliteChannelBaseDevice):
         """Return true if device is on."""
         return self._level > 0
 
-    def update_level(self, actual_level: float, target_level: float) -> None:
-        """Update the current level."""
-        old_level = self._level
+    @property
+    def is_fading(self) -> bool:
+        """Return whether a fade to the level is in progress."""
+        return self._fade_call is not None
+
+    @property
+    def extrapolated_level(self) -> float:
+        """Return the level between 0..1 that the light reached in the current fade."""
+        if not self._fade_call:
+            return self._level
+        now = self._bridge.time()
+        fraction = (now - self._fade_start_time) / (
+            self._fade_end_time - self._fade_start_time
+        )
+        fraction = max(0.0, min(1.0, fraction))
+        return (
+            self._fade_start_level + (self._level - self._fade_start_level) * fraction
+        )
+
+    @property
+    def fade_eta(self) -> float:
+        """Return the seconds until the current fade completes, 0 if not fading."""
+        if not self._fade_call:
+            return 0.0
+        return max(0.0, self._fade_end_time - self._bridge.time())
+
+    def start_fade(self, target_level: float, fade: float) -> bool:
+        """Start fading from the current level to a target level and return whether it changed."""
+        if self._fade_call and target_level == self._level:
+            return False  # the same fade is already running
+        start_level = self.extrapolated_level
+        self.cancel_fade()
+        if fade <= 0 or start_level == target_level:
+            return self.update_level(target_level, target_level)
+        now = self._bridge.time()
+        self._fade_start_level = start_level
+        self._fade_start_time = now
+        self._fade_end_time = now + fade
+        self._fade_call = self._bridge.call_at(self._fade_end_time, self.fade_complete)
+        # the level is the target of the fade, the listeners see the same as before
+        self.set_level(target_level, target_level)
+        return True
+
+    def fade_complete(self) -> None:
+        """Update once when the fade reached its target."""
+        self._fade_call = None
+        self._bridge.update_device(self)
+
+    def cancel_fade(self) -> None:
+        """Forget the fade in progress."""
+        if self._fade_call:
+            self._fade_call.cancel()
+            self._fade_call = None
+
+    def cleanup(self) -> None:
+        """Cancel the fade timer when the light is removed."""
+        super().cleanup()
+        self.cancel_fade()
+
+    def update_level(self, actual_level: float, target_level: float) -> bool:
+        """Update the current level and return whether it changed."""
+        # the network reported the level, no need to guess it
+        self.cancel_fade()
+        return self.set_level(actual_level, target_level)
+
+    def set_level(self, actual_level: float, target_level: float) -> bool:
+        """Set the level and direction and return whether they changed."""
+        old_direction = self._direction
         self._level = actual_level
         if target_level > actual_level:
             self._direction = "open"
@@ -55,9 +135,25 @@ class DynaliteChannelLightDevice(DynaliteChannelBaseDevice):
             self._direction = "close"
         else:
             self._direction = "stop"
-
-        if self._level != old_level:
-            self.update_listeners()
+        if self._direction == old_direction:
+            # while fading, only report steps larger than the hysteresis
+            threshold = self._hysteresis if self._direction != "stop" else 0
+            if abs(self._level - self._reported_level) <= threshold:
+                return False
+        self._reported_level = self._level
+        self.update_listeners()
+        return True
+
+    def stop_fade(self) -> bool:
+        """Stop the fade where it is and return whether the state changed."""
+        if self._fade_call:
+            self._level = self.extrapolated_level
+            self.cancel_fade()
+        changed = self._direction != "stop" or self._level != self._reported_level
+        self._direction = "stop"
+        self._reported_level = self._level
+        self.update_listeners(True)
+        return changed
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn light on."""
@@ -66,16 +162,24 @@ class DynaliteChannelLightDevice(DynaliteChannelBaseDevice):
             brightness = kwargs[ATTR_BRIGHTNESS] / 255.0
         else:
             brightness = 1.0
-        fade = self._bridge.get_channel_fade(self._area, self._channel)
-        self._bridge.set_channel_level(self._area, self._channel, brightness, fade)
+        self._bridge.set_channel_level(
+            self._area, self._channel, brightness, self._fade
+        )
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn light off."""
         # pylint: disable=unused-argument
         await self.async_turn_on(**{ATTR_BRIGHTNESS: 0})
 
+    @property
+    def state_level(self) -> Optional[float]:
+        """Return the level to keep in the state snapshot, between 0..255."""
+        return self._level * self.state_scale
+
     def init_level(self, level):
         """Initialize to a given level."""
-        if level < 0 or level > 255:
+        if level < 0 or level > self.state_scale:
             raise ValueError
-        self._level = level / 255
+        self.cancel_fade()
+        self._level = level / self.state_scale
+        self._reported_level = self._level
@@ -0,0 +1,122 @@
+"""Index of the devices that were created for a Dynalite bridge."""
+
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .dynalitebase import DynaliteBaseDevice
+
+DeviceKey = Tuple[str, int, int]
+
+
+class DynaliteDeviceRegistry:
+    """Flat index of devices keyed by (kind, area, index) with a per-area index.
+
+    Hidden entities can be kept as lazy entries, only a level without a device
+    object, until the bridge needs a device for them.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._devices: Dict[DeviceKey, "DynaliteBaseDevice"] = {}
+        self._areas: Dict[int, Dict[str, Dict[int, "DynaliteBaseDevice"]]] = {}
+        self._lazy: Dict[DeviceKey, float] = {}
+
+    def __len__(self) -> int:
+        """Return the number of devices, without the lazy entries."""
+        return len(self._devices)
+
+    def __contains__(self, key: DeviceKey) -> bool:
+        """Return whether a device or a lazy entry exists for a key."""
+        return key in self._devices or key in self._lazy
+
+    @property
+    def lazy_count(self) -> int:
+        """Return the number of lazy entries."""
+        return len(self._lazy)
+
+    def add_lazy(self, kind: str, area: int, index: int, level: float = 0.0) -> None:
+        """Add a lazy entry for an entity without a device."""
+        self._lazy[(kind, area, index)] = level
+
+    def is_lazy(self, kind: str, area: int, index: int = 0) -> bool:
+        """Return whether an entity is a lazy entry."""
+        return (kind, area, index) in self._lazy
+
+    def set_lazy_level(self, kind: str, area: int, index: int, level: float) -> None:
+        """Set the level of a lazy entry."""
+        self._lazy[(kind, area, index)] = level
+
+    def lazy_levels(self) -> Iterator[Tuple[DeviceKey, float]]:
+        """Return the keys and levels of the lazy entries."""
+        return iter(self._lazy.items())
+
+    def pop_lazy(self, kind: str, area: int, index: int = 0) -> float:
+        """Remove a lazy entry, e.g. to replace it with a device, and return its level."""
+        return self._lazy.pop((kind, area, index))
+
+    def add(
+        self, kind: str, area: int, index: int, device: "DynaliteBaseDevice"
+    ) -> None:
+        """Add a device. Area level devices (rooms, covers) use index 0."""
+        self._devices[(kind, area, index)] = device
+        self._areas.setdefault(area, {}).setdefault(kind, {})[index] = device
+
+    def remove(
+        self, kind: str, area: int, index: int = 0
+    ) -> Optional["DynaliteBaseDevice"]:
+        """Remove a device or lazy entry and return the device, or None if there is none."""
+        self._lazy.pop((kind, area, index), None)
+        device = self._devices.pop((kind, area, index), None)
+        if device is not None:
+            area_kinds = self._areas[area]
+            del area_kinds[kind][index]
+            if not area_kinds[kind]:
+                del area_kinds[kind]
+                if not area_kinds:
+                    del self._areas[area]
+        return device
+
+    def remove_area(self, area: int) -> List["DynaliteBaseDevice"]:
+        """Remove all the devices and lazy entries of an area and return the devices."""
+        for key in [key for key in self._lazy if key[1] == area]:
+            del self._lazy[key]
+        removed = []
+        for kind, kind_devices in self._areas.pop(area, {}).items():
+            for index, device in kind_devices.items():
+                del self._devices[(kind, area, index)]
+                removed.append(device)
+        return removed
+
+    def get(
+        self, kind: str, area: int, index: int = 0
+    ) -> Optional["DynaliteBaseDevice"]:
+        """Return a device or None if it does not exist."""
+        return self._devices.get((kind, area, index))
+
+    def get_many(
+        self, keys: Iterable[DeviceKey]
+    ) -> List[Optional["DynaliteBaseDevice"]]:
+        """Return the devices for several keys, None for the missing ones."""
+        devices = self._devices
+        return [devices.get(key) for key in keys]
+
+    def area_devices(self, area: int, kind: str) -> Dict[int, "DynaliteBaseDevice"]:
+        """Return the devices of a kind in an area, keyed by their index."""
+        return self._areas.get(area, {}).get(kind, {})
+
+    def devices(
+        self, kind: Optional[str] = None, area: Optional[int] = None
+    ) -> Iterator["DynaliteBaseDevice"]:
+        """Iterate over the devices, optionally only of one kind and/or area."""
+        if area is not None:
+            area_kinds = self._areas.get(area, {})
+            if kind is not None:
+                yield from area_kinds.get(kind, {}).values()
+            else:
+                for kind_devices in area_kinds.values():
+                    yield from kind_devices.values()
+        elif kind is not None:
+            for area_kinds in self._areas.values():
+                yield from area_kinds.get(kind, {}).values()
+        else:
+            yield from self._devices.values()
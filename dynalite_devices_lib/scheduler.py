@@ -0,0 +1,121 @@
+"""Deadline scheduler shared by the timers of a Dynalite bridge."""
+
+import asyncio
+import heapq
+import time
+from typing import Callable, List, Optional
+
+
+class ScheduledCall:
+    """A call in the scheduler that can be cancelled."""
+
+    __slots__ = ("when", "interval", "callback", "cancelled", "_seq")
+
+    def __init__(
+        self, when: float, interval: float, callback: Callable[[], None], seq: int
+    ) -> None:
+        """Initialize the call."""
+        self.when = when
+        self.interval = interval
+        self.callback = callback
+        self.cancelled = False
+        self._seq = seq
+
+    def __lt__(self, other: "ScheduledCall") -> bool:
+        """Order calls by deadline, and by the order they were scheduled."""
+        return (self.when, self._seq) < (other.when, other._seq)
+
+    def cancel(self) -> None:
+        """Cancel the call. It is removed from the scheduler when it is due."""
+        self.cancelled = True
+
+
+class DynaliteScheduler:
+    """Min-heap of deadlines that keeps a single timer on the event loop."""
+
+    def __init__(self) -> None:
+        """Initialize an empty scheduler."""
+        self._heap: List[ScheduledCall] = []
+        self._seq = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_when = 0.0
+
+    def __len__(self) -> int:
+        """Return the number of pending calls."""
+        return sum(1 for call in self._heap if not call.cancelled)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start running the calls on an event loop."""
+        self._loop = loop
+        self._arm()
+
+    def stop(self) -> None:
+        """Cancel all the calls and the timer."""
+        for call in self._heap:
+            call.cancel()
+        self._heap = []
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._loop = None
+
+    def time(self) -> float:
+        """Return the current time of the event loop."""
+        return self._loop.time() if self._loop else time.monotonic()
+
+    def call_at(
+        self, when: float, callback: Callable[[], None], interval: float = 0.0
+    ) -> ScheduledCall:
+        """Call a callback at a time, and then every interval if one is given."""
+        self._seq += 1
+        call = ScheduledCall(when, interval, callback, self._seq)
+        heapq.heappush(self._heap, call)
+        if self._heap[0] is call:
+            self._arm()
+        return call
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> ScheduledCall:
+        """Call a callback after a delay."""
+        return self.call_at(self.time() + delay, callback)
+
+    def call_every(
+        self, interval: float, callback: Callable[[], None]
+    ) -> ScheduledCall:
+        """Call a callback every interval until it is cancelled."""
+        return self.call_at(self.time() + interval, callback, interval)
+
+    def _arm(self) -> None:
+        """Set the loop timer to the earliest pending deadline."""
+        heap = self._heap
+        while heap and heap[0].cancelled:
+            heapq.heappop(heap)
+        if not heap or not self._loop:
+            return
+        when = heap[0].when
+        if self._timer:
+            if self._timer_when <= when:
+                return
+            self._timer.cancel()
+        self._timer = self._loop.call_at(when, self._run)
+        self._timer_when = when
+
+    def _run(self) -> None:
+        """Run the calls that are due and set the timer for the next one."""
+        self._timer = None
+        heap = self._heap
+        # the loop may run the timer slightly before its time
+        now = max(self.time(), self._timer_when)
+        while heap and heap[0].when <= now:
+            call = heapq.heappop(heap)
+            if call.cancelled:
+                continue
+            if call.interval:
+                call.when += call.interval
+                if call.when <= now:  # don't try to catch up on missed ticks
+                    call.when = now + call.interval
+                heapq.heappush(heap, call)
+            call.callback()
+            if not self._loop:  # stopped by the callback
+                return
+        self._arm()
@@ -0,0 +1,58 @@
+"""Snapshot of the state of the devices, so a restart does not have to query it all."""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .storage import DynaliteJsonStore
+
+
+def state_key(kind: str, area: int, item: int = 0) -> str:
+    """Return the key of a device in the snapshot."""
+    return f"{kind}/{area}/{item}"
+
+
+class DynaliteStateStore(DynaliteJsonStore):
+    """Last known levels, selected presets and cover positions, with their age.
+
+    Each entry holds the value to pass to init_level (the preset number for the
+    selected preset of an area) and the wall clock time it was last seen on the bus.
+    """
+
+    description = "state snapshot"
+
+    def __init__(self, path: str = "") -> None:
+        """Initialize the store. Without a path nothing is persisted."""
+        super().__init__(path)
+        self._entries: Dict[str, Tuple[float, float]] = {}
+
+    def clear(self) -> None:
+        """Forget all the entries."""
+        self._entries = {}
+
+    def restore(self, data: Any) -> None:
+        """Set the entries from the decoded JSON of the file."""
+        for key, (value, seen) in data.items():
+            self._entries[str(key)] = (float(value), float(seen))
+
+    def to_json(self) -> Any:
+        """Return the entries as a value to encode to JSON."""
+        return {key: list(value) for key, value in self._entries.items()}
+
+    def get(self, key: str) -> Optional[float]:
+        """Return the value of an entry or None if there is none."""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def is_fresh(self, key: str, max_age: float) -> bool:
+        """Return whether an entry was seen on the bus within max_age seconds."""
+        entry = self._entries.get(key)
+        return entry is not None and time.time() - entry[1] <= max_age
+
+    def set(self, key: str, value: float) -> None:
+        """Set the value of an entry, keeping the time it was last seen."""
+        entry = self._entries.get(key)
+        self._entries[key] = (value, entry[1] if entry else 0.0)
+
+    def seen(self, key: str, value: float) -> None:
+        """Set the value of an entry that was just seen on the bus."""
+        self._entries[key] = (value, time.time())
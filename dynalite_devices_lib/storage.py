@@ -0,0 +1,115 @@
+"""Helpers for the local files the bridge keeps."""
+
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import os
+import tempfile
+from typing import Any, Optional, Union
+
+from .const import LOGGER
+
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """Replace a file with new contents, so readers never see a partial file.
+
+    Raises OSError if the file cannot be written.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        if isinstance(data, bytes):
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(data)
+        else:
+            with os.fdopen(handle, "w", encoding="utf-8") as temp_file:
+                temp_file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DynaliteJsonStore(ABC):
+    """Base of the data the bridge keeps in a JSON file.
+
+    The file is written in the executor, one write at a time. A save while a write is
+    in progress waits for it, and only the latest of the waiting saves is written, so
+    older data never replaces newer data.
+    """
+
+    description = "data"  # for the logs
+
+    def __init__(self, path: str = "") -> None:
+        """Initialize the store. Without a path nothing is persisted."""
+        self.path = path  # public
+        self._writing: Optional["asyncio.Future[None]"] = None
+        self._pending: Optional[str] = None
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget all the data."""
+
+    @abstractmethod
+    def restore(self, data: Any) -> None:
+        """Set the data from the decoded JSON of the file."""
+
+    @abstractmethod
+    def to_json(self) -> Any:
+        """Return the data as a value to encode to JSON."""
+
+    def load(self) -> None:
+        """Load the stored data, ignoring a missing or broken file."""
+        self.clear()
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as store_file:
+                self.restore(json.load(store_file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as err:
+            self.clear()
+            LOGGER.warning("Cannot load %s %s: %s", self.description, self.path, err)
+
+    def dump(self) -> str:
+        """Return the data as a JSON string."""
+        return json.dumps(self.to_json())
+
+    def write(self, data: str) -> None:
+        """Atomically replace the stored data with a JSON string."""
+        try:
+            atomic_write(self.path, data)
+        except OSError as err:
+            LOGGER.warning("Cannot save %s %s: %s", self.description, self.path, err)
+
+    def save(self, loop: Optional[asyncio.AbstractEventLoop], data: str) -> None:
+        """Write a JSON string in the executor after the write in progress, if any."""
+        if loop is None:
+            self.write(data)
+            return
+        self._pending = data
+        if self._writing is None:
+            self.write_next(loop)
+
+    def write_next(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the write of the data that waits."""
+        data = self._pending
+        assert data is not None
+        self._pending = None
+        self._writing = loop.run_in_executor(None, self.write, data)
+        self._writing.add_done_callback(lambda _: self.write_done(loop))
+
+    def write_done(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the next write when one is done."""
+        self._writing = None
+        if self._pending is not None:
+            self.write_next(loop)
+
+    async def async_flush(self) -> None:
+        """Wait until all the saves are written."""
+        while self._writing is not None:
+            await self._writing
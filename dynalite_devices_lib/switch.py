@@ -1,6 +1,6 @@
 """Support for the Dynalite channels and presets as switches."""
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from .const import CONF_PRESET, CONF_ROOM, CONF_TEMPLATE
 from .dynalitebase import (
@@ -33,22 +33,27 @@ class DynaliteChannelSwitchDevice(DynaliteChannelBaseDevice):
         """Return true if switch is on."""
         return self._level > 0
 
-    def update_level(self, actual_level: float, target_level: float) -> None:
-        """Update the current level."""
+    def update_level(self, actual_level: float, target_level: float) -> bool:
+        """Update the current level and return whether it changed."""
         # pylint: disable=unused-argument
+        old_level = self._level
         self._level = actual_level
+        return self._level != old_level
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn switch on."""
         # pylint: disable=unused-argument
-        fade = self._bridge.get_channel_fade(self._area, self._channel)
-        self._bridge.set_channel_level(self._area, self._channel, 1, fade)
+        self._bridge.set_channel_level(self._area, self._channel, 1, self._fade)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn switch off."""
         # pylint: disable=unused-argument
-        fade = self._bridge.get_channel_fade(self._area, self._channel)
-        self._bridge.set_channel_level(self._area, self._channel, 0, fade)
+        self._bridge.set_channel_level(self._area, self._channel, 0, self._fade)
+
+    @property
+    def state_level(self) -> Optional[float]:
+        """Return the level to keep in the state snapshot, 0 or 1."""
+        return self._level
 
     def init_level(self, level):
         """Initialize to on/off."""
@@ -69,17 +74,28 @@ class DynalitePresetSwitchDevice(DynaliteBaseDevice):
         """Initialize the switch."""
         self._preset = preset
         self._level = 0
+        self._name = ""
+        self._fade = 0.0
         super().__init__(area, bridge, hidden)
 
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        super().refresh_config()
+        self._configured = self._bridge.is_configured(
+            CONF_PRESET, self._area, self._preset
+        )
+        self._name = self._bridge.get_preset_name(self._area, self._preset)
+        self._fade = self._bridge.get_preset_fade(self._area, self._preset)
+
     @property
     def available(self) -> bool:
         """Return if device is available."""
-        return self._bridge.available(CONF_PRESET, self._area, self._preset)
+        return self._bridge.connected and self._configured
 
     @property
     def name(self) -> str:
         """Return the name of the device."""
-        return self._bridge.get_preset_name(self._area, self._preset)
+        return self._name
 
     @property
     def category(self) -> str:
@@ -91,23 +107,28 @@ class DynalitePresetSwitchDevice(DynaliteBaseDevice):
         """Return the ID of this cover."""
         return "dynalite_area_" + str(self._area) + "_preset_" + str(self._preset)
 
-    def set_level(self, level: int) -> None:
-        """Set the current level and potentially trigger listeners."""
+    def set_level(self, level: int) -> bool:
+        """Set the current level, trigger listeners, and return whether it changed."""
         old_level = self._level
         self._level = level
-        if old_level != self._level:
-            self.update_listeners()
+        if old_level == self._level:
+            return False
+        self.update_listeners()
+        return True
 
     @property
     def is_on(self) -> bool:
         """Return true if device is on."""
         return self._level > 0
 
+    def select(self) -> None:
+        """Select the preset on the network."""
+        self._bridge.select_preset(self._area, self._preset, self._fade)
+
     async def async_turn_on(self, **kwargs) -> None:
         """Turn switch on."""
         # pylint: disable=unused-argument
-        fade = self._bridge.get_preset_fade(self._area, self._preset)
-        self._bridge.select_preset(self._area, self._preset, fade)
+        self.select()
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn switch off - doesn't do anything for presets."""
@@ -118,6 +139,7 @@ class DynalitePresetSwitchDevice(DynaliteBaseDevice):
         """Initialize to on/off."""
         if level:
             self._level = 1.0
+            self._bridge.init_current_preset(self._area, self._preset)
         else:
             self._level = 0
 
@@ -127,12 +149,20 @@ class DynaliteDualPresetSwitchDevice(DynaliteMultiDevice):
 
     def __init__(self, area: int, bridge: "DynaliteDevices", hidden: bool) -> None:
         """Initialize the switch."""
+        self._reported_on = False
         super().__init__(2, area, bridge, hidden)
 
+    def refresh_config(self) -> None:
+        """Cache the values derived from the configuration of the bridge."""
+        super().refresh_config()
+        self._configured = self._bridge.is_configured(
+            CONF_TEMPLATE, self._area, CONF_ROOM
+        )
+
     @property
     def available(self) -> bool:
         """Return if device is available."""
-        return self._bridge.available(CONF_TEMPLATE, self._area, CONF_ROOM)
+        return self._bridge.connected and self._configured
 
     @property
     def category(self) -> str:
@@ -165,6 +195,13 @@ class DynaliteDualPresetSwitchDevice(DynaliteMultiDevice):
         assert isinstance(device, DynalitePresetSwitchDevice)
         await device.async_turn_on()
 
+    def listener(self, device: DynaliteBaseDevice, stop_fade: bool) -> None:
+        """Update the device only if the on/off state changed."""
+        # pylint: disable=unused-argument
+        is_on = self.is_on
+        self._bridge.update_if_changed(self, is_on != self._reported_on)
+        self._reported_on = is_on
+
     def init_level(self, level):
         """Initialize to on/off."""
         on_device = self.get_device(1)
@@ -175,3 +212,4 @@ class DynaliteDualPresetSwitchDevice(DynaliteMultiDevice):
         else:
             off_device.init_level(1)
             on_device.init_level(0)
+        self._reported_on = self.is_on
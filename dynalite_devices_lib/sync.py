@@ -0,0 +1,176 @@
+"""Planner of the queries that bring the state of the devices up to date."""
+
+import heapq
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .const import CONF_PRESET, LOGGER
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .dynalite_devices import DynaliteDevices
+    from .scheduler import ScheduledCall
+
+# (kind, area, item), the item of the preset query of an area is 0
+SyncKey = Tuple[str, int, int]
+
+
+class DynaliteSyncProgress:
+    """Progress of the initial sync, sent to the application."""
+
+    def __init__(self, done: int, total: int, eta: Optional[float]) -> None:
+        """Create the progress. The ETA is in seconds, None until it can be guessed."""
+        self.done = done
+        self.total = total
+        self.eta = eta
+
+    @property
+    def complete(self) -> bool:
+        """Return whether all the queries were answered or timed out."""
+        return self.done >= self.total
+
+    def __repr__(self):
+        """Print the progress for logs."""
+        return f"DynaliteSyncProgress(done={self.done}, total={self.total}, eta={self.eta})"
+
+    def __eq__(self, other):
+        """Compare two progress reports, mostly for debug."""
+        return (self.done, self.total, self.eta) == (other.done, other.total, other.eta)
+
+
+class DynaliteSyncPlanner:
+    """Sends the queries by priority, with a limit on the ones not yet answered.
+
+    The preset of an area is queried before its channels, and the visible devices
+    before the hidden ones. A query that is not answered within the timeout counts as
+    done, so one silent device does not hold the others.
+    """
+
+    def __init__(
+        self,
+        bridge: "DynaliteDevices",
+        progress_func: Optional[Callable[[DynaliteSyncProgress], None]] = None,
+    ) -> None:
+        """Initialize the planner."""
+        self._bridge = bridge
+        self._progress_func = progress_func
+        self.max_in_flight = 0  # public, 0 is no limit
+        self.timeout = 0.0  # public
+        self._running = False
+        self._queue: List[Tuple[int, int, SyncKey]] = []
+        self._queued: Dict[SyncKey, int] = {}
+        self._seq = 0
+        self._in_flight: Dict[SyncKey, float] = {}
+        self._call: Optional["ScheduledCall"] = None
+        self._call_when = 0.0
+        self._done = 0
+        self._total = 0
+        self._start_time = 0.0
+
+    @property
+    def progress(self) -> DynaliteSyncProgress:
+        """Return the progress of the current sync."""
+        eta: Optional[float] = None
+        if self._done >= self._total:
+            eta = 0.0
+        elif self._done and self._running:
+            elapsed = self._bridge.time() - self._start_time
+            eta = elapsed / self._done * (self._total - self._done)
+        return DynaliteSyncProgress(self._done, self._total, eta)
+
+    def add(self, kind: str, area: int, item: int, hidden: bool) -> None:
+        """Queue a query of an area preset (item 0) or a channel level."""
+        key = (kind, area, item)
+        if key in self._queued or key in self._in_flight:
+            return
+        if not self._queued and not self._in_flight:
+            # a new sync, e.g. after a reconfigure
+            self._done = 0
+            self._total = 0
+            self._start_time = self._bridge.time()
+        priority = (2 if hidden else 0) + (0 if kind == CONF_PRESET else 1)
+        self._seq += 1
+        heapq.heappush(self._queue, (priority, self._seq, key))
+        self._queued[key] = self._seq
+        self._total += 1
+
+    def start(self) -> None:
+        """Start sending the queries, e.g. when the bridge is connected."""
+        if not self._running:
+            self._running = True
+            if not self._done:
+                self._start_time = self._bridge.time()
+        self.send_next()
+        if self._queued or self._in_flight:
+            self.report()
+
+    def cancel(self) -> None:
+        """Stop sending, and forget the queries."""
+        self._running = False
+        self._queue = []
+        self._queued = {}
+        self._in_flight = {}
+        if self._call:
+            self._call.cancel()
+            self._call = None
+
+    def answered(self, kind: str, area: int, item: int) -> None:
+        """Count a query as done when its answer, or the same report, arrives."""
+        key = (kind, area, item)
+        if key in self._in_flight:
+            del self._in_flight[key]
+        elif key in self._queued:
+            # it was reported before it was asked for
+            del self._queued[key]
+        else:
+            return
+        self._done += 1
+        self.send_next()
+        self.report()
+
+    def send_next(self) -> None:
+        """Send the queries with the highest priority while there is room."""
+        if not self._running:
+            return
+        queue = self._queue
+        while queue and (
+            self.max_in_flight <= 0 or len(self._in_flight) < self.max_in_flight
+        ):
+            _, seq, key = heapq.heappop(queue)
+            if self._queued.get(key) != seq:
+                continue  # answered while it waited
+            del self._queued[key]
+            self._in_flight[key] = self._bridge.time() + self.timeout
+            kind, area, item = key
+            if kind == CONF_PRESET:
+                self._bridge.request_area_preset(area, None)
+            else:
+                self._bridge.request_channel_level(area, item)
+        self.schedule()
+
+    def schedule(self) -> None:
+        """Set the single timer to the first query that times out."""
+        if self._call:
+            self._call.cancel()
+            self._call = None
+        if self._in_flight:
+            when = min(self._in_flight.values())
+            self._call = self._bridge.call_at(when, self.timer_callback)
+            self._call_when = when
+
+    def timer_callback(self) -> None:
+        """Give up on the queries that were not answered in time."""
+        self._call = None
+        # the loop may run the timer slightly before its time
+        now = max(self._bridge.time(), self._call_when)
+        expired = [key for key, when in self._in_flight.items() if when <= now]
+        for key in expired:
+            LOGGER.debug("sync query %s was not answered", key)
+            del self._in_flight[key]
+        self._done += len(expired)
+        self.send_next()
+        if expired:
+            self.report()
+
+    def report(self) -> None:
+        """Send the progress to the application."""
+        if self._progress_func and self._total:
+            self._progress_func(self.progress)
@@ -22,6 +22,7 @@ class MockGateway:
         self.new_dev_func = Mock()
         self.update_dev_func = Mock()
         self.notification_func = Mock()
+        self.remove_dev_func = Mock()
         self.exceptions = []
         if message_delay_zero:
             with patch("dynalite_devices_lib.dynalite.MESSAGE_DELAY", 0):
@@ -29,12 +30,14 @@ class MockGateway:
                     new_device_func=self.new_dev_func,
                     update_device_func=self.update_dev_func,
                     notification_func=self.notification_func,
+                    remove_device_func=self.remove_dev_func,
                 )
         else:
             self.dyn_dev = DynaliteDevices(
                 new_device_func=self.new_dev_func,
                 update_device_func=self.update_dev_func,
                 notification_func=self.notification_func,
+                remove_device_func=self.remove_dev_func,
             )
 
     async def run_server(self):
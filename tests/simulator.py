@@ -0,0 +1,333 @@
+"""Simulated Dynet bus behind an RS485 to IP gateway, for load and latency tests.
+
+The simulator hosts areas of channels that answer level and preset requests, fade
+their levels over time, and share one bus with the timing of a 9600 baud line. It can
+also add background traffic from panels and line noise. It is only meant for tests and
+benchmarks, e.g.:
+
+    simulator = DynetSimulator(areas=200, channels=16, traffic_rate=20)
+    port = await simulator.start()
+    ... configure DynaliteDevices with host 127.0.0.1 and the port ...
+    await simulator.stop()
+"""
+
+import asyncio
+from collections import deque
+import random
+import time
+from typing import Deque, Dict, List, Optional
+
+from dynalite_devices_lib.const import (
+    CONF_ACTION,
+    CONF_ACTION_CMD,
+    CONF_ACTION_PRESET,
+    CONF_ACTION_STOP,
+    CONF_CHANNEL,
+    CONF_FADE,
+    CONF_PRESET,
+    CONF_TRGT_LEVEL,
+    EVENT_CHANNEL,
+    EVENT_PRESET,
+    LOGGER,
+)
+from dynalite_devices_lib.dynalite import Dynalite
+from dynalite_devices_lib.dynet import DynetPacket, PacketError
+from dynalite_devices_lib.opcodes import OpcodeType, SyncType
+
+# seconds to send a frame of 8 bytes on a 9600 baud line, with start and stop bits
+FRAME_TIME = 8 * 10 / 9600
+REPLY_DELAY = 0.02  # seconds for a device to answer a request
+DEFAULT_PRESET_LEVELS = {1: 1.0, 2: 0.75, 3: 0.5, 4: 0.0}
+REPORT_OPCODES = {OpcodeType.REPORT_CHANNEL_LEVEL.value, OpcodeType.REPORT_PRESET.value}
+
+
+class SimulatedChannel:
+    """Level of a channel, fading linearly from a start level to a target level."""
+
+    __slots__ = ("start_level", "target_level", "start_time", "fade")
+
+    def __init__(self, level: float = 0.0) -> None:
+        """Initialize the channel at a fixed level."""
+        self.start_level = level
+        self.target_level = level
+        self.start_time = 0.0
+        self.fade = 0.0
+
+    def level(self, now: float) -> float:
+        """Return the actual level at a time."""
+        if self.fade <= 0 or now >= self.start_time + self.fade:
+            return self.target_level
+        progress = max(0.0, now - self.start_time) / self.fade
+        return self.start_level + (self.target_level - self.start_level) * progress
+
+    def fade_to(self, now: float, level: float, fade: float) -> None:
+        """Start fading from the actual level to a new one."""
+        self.start_level = self.level(now)
+        self.target_level = level
+        self.start_time = now
+        self.fade = fade
+
+    def stop(self, now: float) -> None:
+        """Stop fading at the actual level."""
+        self.fade_to(now, self.level(now), 0.0)
+
+
+class DynetSimulator:
+    """Gateway to a simulated bus with areas 1..areas, each with channels 1..channels.
+
+    Every frame on the bus, including the ones the clients send, goes to all the
+    clients, so a client also gets the echo of its own frames. The frames wait for the
+    bus, so a busy bus delays the answers as a real one would.
+    """
+
+    def __init__(
+        self,
+        areas: int = 1,
+        channels: int = 1,
+        preset_levels: Optional[Dict[int, float]] = None,
+        frame_time: float = FRAME_TIME,
+        reply_delay: float = REPLY_DELAY,
+        traffic_rate: float = 0.0,
+        noise_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the simulator.
+
+        The traffic rate is in frames per second from simulated panels, and the noise
+        rate is the probability that a frame is damaged on its way to the clients.
+        """
+        self.preset_levels = (  # public
+            DEFAULT_PRESET_LEVELS if preset_levels is None else preset_levels
+        )
+        self.frame_time = frame_time  # public
+        self.reply_delay = reply_delay  # public
+        self.traffic_rate = traffic_rate  # public
+        self.noise_rate = noise_rate  # public
+        self._rand = random.Random(seed)
+        self._channels: Dict[int, Dict[int, SimulatedChannel]] = {
+            area: {channel: SimulatedChannel() for channel in range(1, channels + 1)}
+            for area in range(1, areas + 1)
+        }
+        self._presets: Dict[int, int] = {area: 4 for area in self._channels}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # the connections of the clients and the tasks that read from them
+        self._clients: Dict[asyncio.StreamWriter, "asyncio.Task[None]"] = {}
+        self._bus: Deque[bytes] = deque()
+        # created in start, in the loop that runs the simulator
+        self._bus_ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        # counters for the results of a test
+        self.frames_received = 0  # public
+        self.frames_sent = 0  # public
+        self.requests_answered = 0  # public
+        self.noise_frames = 0  # public
+
+    def time(self) -> float:
+        """Return the current time of the event loop."""
+        return self._loop.time() if self._loop else time.monotonic()
+
+    def channel_level(self, area: int, channel: int) -> float:
+        """Return the actual level of a channel."""
+        return self._channels[area][channel].level(self.time())
+
+    def set_channel_level(self, area: int, channel: int, level: float) -> None:
+        """Set the level of a channel at once, without a frame on the bus."""
+        self._channels[area][channel].fade_to(self.time(), level, 0.0)
+
+    def current_preset(self, area: int) -> int:
+        """Return the preset that was last selected in an area."""
+        return self._presets[area]
+
+    def select_preset(self, area: int, preset: int, fade: float) -> None:
+        """Select a preset and fade the channels of the area to its level."""
+        self._presets[area] = preset
+        level = self.preset_levels.get(preset)
+        if level is None:
+            return
+        now = self.time()
+        for channel in self._channels[area].values():
+            channel.fade_to(now, level, fade)
+
+    def handle_frame(self, frame: bytes) -> List[DynetPacket]:
+        """Apply a frame from the bus to the areas and return the answers to send."""
+        try:
+            packet = DynetPacket(msg=list(frame))
+        except PacketError:
+            return []
+        area_channels = self._channels.get(packet.area)
+        if area_channels is None or packet.command in REPORT_OPCODES:
+            return []  # no device in that area, or only a report for the others
+        now = self.time()
+        if packet.command == OpcodeType.REQUEST_PRESET.value:
+            return [
+                DynetPacket.report_area_preset_packet(
+                    packet.area, self._presets[packet.area]
+                )
+            ]
+        if packet.command == OpcodeType.REQUEST_CHANNEL_LEVEL.value:
+            channel = area_channels.get(packet.data[0] + 1)
+            if channel is None:
+                return []
+            return [
+                DynetPacket.report_channel_level_packet(
+                    packet.area,
+                    packet.data[0] + 1,
+                    channel.target_level,
+                    channel.level(now),
+                )
+            ]
+        event = Dynalite.event_from_packet(packet)
+        if event is None:
+            return []
+        if event.event_type == EVENT_PRESET:
+            self.select_preset(
+                packet.area, event.data[CONF_PRESET], event.data.get(CONF_FADE, 0.0)
+            )
+            return []
+        assert event.event_type == EVENT_CHANNEL
+        if CONF_CHANNEL in event.data:
+            channel = area_channels.get(event.data[CONF_CHANNEL])
+            targets = [channel] if channel else []
+        else:
+            targets = list(area_channels.values())
+        action = event.data[CONF_ACTION]
+        for channel in targets:
+            if action == CONF_ACTION_CMD:
+                level = (255 - event.data[CONF_TRGT_LEVEL]) / 254
+                channel.fade_to(now, level, event.data[CONF_FADE])
+            elif action == CONF_ACTION_STOP:
+                channel.stop(now)
+            elif action == CONF_ACTION_PRESET:
+                level = self.preset_levels.get(event.data[CONF_PRESET])
+                if level is not None:
+                    channel.fade_to(now, level, event.data[CONF_FADE])
+        return []
+
+    def damage(self, frame: bytes) -> bytes:
+        """Return a frame with one byte flipped, or with a stray byte before it."""
+        self.noise_frames += 1
+        if self._rand.random() < 0.5:
+            return bytes([self._rand.randrange(256)]) + frame
+        damaged = bytearray(frame)
+        damaged[self._rand.randrange(len(damaged))] ^= 1 << self._rand.randrange(8)
+        return bytes(damaged)
+
+    def send(self, packet: DynetPacket) -> None:
+        """Queue a frame to be sent on the bus."""
+        self._bus.append(bytes(packet.msg))
+        if self._bus_ready:
+            self._bus_ready.set()
+
+    def random_packet(self) -> DynetPacket:
+        """Return a frame a panel may send: a channel level or a preset of an area."""
+        rand = self._rand
+        area = rand.choice(list(self._channels))
+        fade = rand.choice([0.0, 0.5, 2.0])
+        if rand.random() < 0.7 and self._channels[area]:
+            channel = rand.choice(list(self._channels[area]))
+            return DynetPacket.set_channel_level_packet(
+                area, channel, rand.random(), fade
+            )
+        preset = rand.choice(list(self.preset_levels) or [1])
+        return DynetPacket.select_area_preset_packet(area, preset, fade)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start the gateway and return its port. Port 0 picks a free one."""
+        self._loop = asyncio.get_running_loop()
+        self._bus_ready = asyncio.Event()
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        self._tasks = [asyncio.create_task(self.bus_loop())]
+        if self.traffic_rate > 0:
+            self._tasks.append(asyncio.create_task(self.traffic_loop()))
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop the gateway and close the connections."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        clients = self._clients
+        self._clients = {}
+        for writer in clients:
+            writer.close()
+        # the readers end at the end of their streams, they are not cancelled
+        await asyncio.gather(*clients.values())
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._loop = None
+        self._bus_ready = None
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Put the frames of a client on the bus and answer them."""
+        task = asyncio.current_task()
+        assert task
+        self._clients[writer] = task
+        buffer = bytearray()
+        try:
+            while not reader.at_eof():
+                data = await reader.read(100)
+                buffer.extend(data)
+                for frame in self.split_frames(buffer):
+                    self.frames_received += 1
+                    self._bus.append(frame)
+                    assert self._bus_ready
+                    self._bus_ready.set()
+                    assert self._loop
+                    for answer in self.handle_frame(frame):
+                        self.requests_answered += 1
+                        self._loop.call_later(self.reply_delay, self.send, answer)
+        except ConnectionResetError:
+            pass
+        finally:
+            self._clients.pop(writer, None)
+
+    @staticmethod
+    def split_frames(buffer: bytearray) -> List[bytes]:
+        """Remove the complete logical frames from a buffer, skipping bad bytes."""
+        frames = []
+        while len(buffer) >= 8:
+            frame = bytes(buffer[:8])
+            if (
+                frame[0] == SyncType.LOGICAL.value
+                and DynetPacket.calc_sum(list(frame)) == frame[7]
+            ):
+                frames.append(frame)
+                del buffer[:8]
+            else:
+                LOGGER.debug("simulator skipping byte %s", buffer[0])
+                del buffer[0]
+        return frames
+
+    async def bus_loop(self) -> None:
+        """Send the frames on the bus one at a time, at the speed of the line."""
+        assert self._bus_ready
+        while True:
+            if not self._bus:
+                self._bus_ready.clear()
+                await self._bus_ready.wait()
+                continue
+            frame = self._bus.popleft()
+            await asyncio.sleep(self.frame_time)
+            if self.noise_rate and self._rand.random() < self.noise_rate:
+                frame = self.damage(frame)
+            self.frames_sent += 1
+            for writer in self._clients:
+                writer.write(frame)
+
+    async def traffic_loop(self) -> None:
+        """Send frames of simulated panels at random times, at the traffic rate."""
+        while True:
+            await asyncio.sleep(self._rand.expovariate(self.traffic_rate))
+            packet = self.random_packet()
+            self.handle_frame(bytes(packet.msg))
+            self.send(packet)
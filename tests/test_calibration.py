@@ -0,0 +1,25 @@
+"""Tests for the cover calibration store."""
+
+from dynalite_devices_lib.calibration import (
+    MAX_CALIBRATION_SAMPLES,
+    DynaliteCalibrationStore,
+)
+
+
+def test_calibration_average(tmp_path):
+    """Test the running average and that it is kept in the file."""
+    path = str(tmp_path / "calibration.json")
+    store = DynaliteCalibrationStore(path)
+    store.load()  # missing file
+    assert store.get_duration(1) is None
+    assert store.add_sample(1, 10) == 10
+    assert store.add_sample(1, 20) == 15
+    # older moves count less once the cap is reached
+    for _ in range(MAX_CALIBRATION_SAMPLES):
+        store.add_sample(2, 10)
+    assert store.add_sample(2, 20) == 11
+    store.write(store.dump())
+    loaded = DynaliteCalibrationStore(path)
+    loaded.load()
+    assert loaded.get_duration(1) == 15
+    assert loaded.get_duration(2) == 11
@@ -0,0 +1,56 @@
+"""Tests for the cache of the compiled configuration."""
+
+from unittest.mock import patch
+
+from dynalite_devices_lib.config import DynaliteConfig
+from dynalite_devices_lib.config_cache import DynaliteConfigCache
+import dynalite_devices_lib.const as dyn_const
+
+CONFIG = {
+    dyn_const.CONF_AREA: {
+        "1": {dyn_const.CONF_CHANNEL: {"1-8": {}, "9": {dyn_const.CONF_FADE: 2}}},
+        "2": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM},
+    },
+}
+
+
+def test_config_cache_hit_and_miss(tmp_path):
+    """Test that the cache is used only for the same config."""
+    path = tmp_path / "config.cache"
+    cache = DynaliteConfigCache(str(path))
+    compiled = cache.compile(CONFIG)
+    assert path.exists()
+    assert [path.name for path in tmp_path.iterdir()] == ["config.cache"]
+    with patch.object(DynaliteConfig, "configure_area") as mock_configure:
+        cached = cache.compile(CONFIG)
+        mock_configure.assert_not_called()
+    assert cached.area == compiled.area
+    # shared records stay shared after loading
+    assert cached.area[1].channels[9] is compiled.area[1].channels[9]
+    assert cached.area[2].presets[1] is compiled.area[2].presets[1]
+    # another config or version is compiled again
+    other = {dyn_const.CONF_AREA: {"3": {}}}
+    assert list(cache.compile(other).area) == [3]
+    assert list(cache.compile(CONFIG).area) == [1, 2]
+    with patch("dynalite_devices_lib.config_cache.__version__", "0.0.0"):
+        key = DynaliteConfigCache.config_key(CONFIG)
+    assert key != DynaliteConfigCache.config_key(CONFIG)
+    assert cache.load(key) is None
+    # keys of mixed types are hashed too
+    mixed = {dyn_const.CONF_AREA: {4: {}, "5": {dyn_const.CONF_FADE: {1.5}}}}
+    assert list(cache.compile(mixed).area) == [4, 5]
+    assert list(cache.compile(mixed).area) == [4, 5]
+
+
+def test_config_cache_broken_file(tmp_path):
+    """Test that a broken or unusable cache is ignored."""
+    path = tmp_path / "config.cache"
+    cache = DynaliteConfigCache(str(path))
+    path.write_bytes(DynaliteConfigCache.config_key(CONFIG) + b"\nnot a pickle")
+    assert list(cache.compile(CONFIG).area) == [1, 2]
+    assert cache.load(DynaliteConfigCache.config_key(CONFIG)) is not None
+    # without a path nothing is cached
+    assert list(DynaliteConfigCache().compile(CONFIG).area) == [1, 2]
+    # a directory cannot be written or read
+    cache = DynaliteConfigCache(str(tmp_path))
+    assert list(cache.compile(CONFIG).area) == [1, 2]
@@ -0,0 +1,138 @@
+"""Tests for the compiled configuration records."""
+
+import pytest
+
+from dynalite_devices_lib.config import DynaliteConfig
+from dynalite_devices_lib.config_records import ChannelConfig
+import dynalite_devices_lib.const as dyn_const
+
+
+def test_config_records_frozen():
+    """Test that records can't be changed and are compared by value."""
+    channel = ChannelConfig(name="a", fade=1.0, channel_type="light", hidden=False)
+    with pytest.raises(AttributeError):
+        channel.name = "b"
+    with pytest.raises(AttributeError):
+        del channel.fade
+    assert channel == ChannelConfig(
+        name="a", fade=1.0, channel_type="light", hidden=False
+    )
+    assert channel != channel.replace(hidden=True)
+    assert hash(channel) == hash(channel.replace())
+    assert "name='a'" in repr(channel)
+
+
+def test_config_records_shared():
+    """Test that equal channels and presets of different areas are one record."""
+    config = DynaliteConfig(
+        {
+            dyn_const.CONF_AREA: {
+                str(area): {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}}}
+                for area in range(1, 4)
+            },
+        }
+    )
+    area_1 = config.area[1]
+    area_3 = config.area[3]
+    assert area_1.channels[1] is area_3.channels[1]
+    assert area_1.channels[1] is not area_1.channels[2]
+    assert area_1.presets[1] is area_3.presets[1]
+    assert area_1.presets[1].name == "On"
+    assert area_1.name == "Area 1" and area_1.template is None
+
+
+def test_config_records_entities():
+    """Test that adding and removing entities returns new areas."""
+    config = DynaliteConfig(
+        {dyn_const.CONF_AREA: {"1": {dyn_const.CONF_NO_DEFAULT: True}}}
+    )
+    area = config.area[1]
+    channel = DynaliteConfig.configure_channel(5, {}, area.fade)
+    new_area = area.with_entity(dyn_const.CONF_CHANNEL, 5, channel)
+    assert area.channels == {}
+    assert new_area.entities(dyn_const.CONF_CHANNEL) == {5: channel}
+    assert new_area != area
+    assert new_area.area_values() == area.area_values()
+    assert new_area.without_entity(dyn_const.CONF_CHANNEL, 5) == area
+
+
+def test_config_ranges():
+    """Test channel, preset and area ranges with name patterns."""
+    config = DynaliteConfig(
+        {
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_CHANNEL: {
+                        "1-64": {dyn_const.CONF_NAME: "Light {area}.{channel}"},
+                        "3": {dyn_const.CONF_NAME: "Special"},
+                        "70-71": {dyn_const.CONF_CHANNEL_TYPE: "switch"},
+                    },
+                    dyn_const.CONF_PRESET: {"5-6": {dyn_const.CONF_LEVEL: 0.5}},
+                },
+                "10-12": {
+                    dyn_const.CONF_NAME: "Room {area}",
+                    dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM,
+                    dyn_const.CONF_CHANNEL: {"2": {dyn_const.CONF_NAME: "Ch {area}"}},
+                },
+            },
+        }
+    )
+    channels = config.area[1].channels
+    # nothing is created before it is looked up
+    assert len(channels._records) == 1  # pylint: disable=protected-access
+    assert 64 in channels and 65 not in channels and "x" not in channels
+    assert len(channels._records) == 1  # pylint: disable=protected-access
+    assert len(channels) == 66
+    assert list(channels)[:3] == [3, 1, 2]
+    assert channels[5].name == "Light 1.5"
+    assert channels[3].name == "Special"
+    assert channels[71] == ChannelConfig(
+        name="Channel 71", fade=0, channel_type="switch", hidden=False
+    )
+    assert channels[5] is channels[5]
+    presets = config.area[1].presets
+    assert sorted(presets) == [1, 4, 5, 6]
+    assert presets[6].level == 0.5 and presets[6].name == "Preset 6"
+    assert sorted(config.area) == [1, 10, 11, 12]
+    assert config.area[11].name == "Room 11"
+    assert config.area[11].channels[2].name == "Ch 11"
+    assert config.area[11].room_on == 1
+    # equal rules are equal without creating the records
+    again = DynaliteConfig(
+        {dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1-64": {}}}}}
+    )
+    same = DynaliteConfig(
+        {dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1-64": {}}}}}
+    )
+    assert again.area[1] == same.area[1]
+    removed = again.area[1].without_entity(dyn_const.CONF_CHANNEL, 7)
+    assert 7 not in removed.channels and len(removed.channels) == 63
+    assert 7 in removed.with_entity(dyn_const.CONF_CHANNEL, 7, channels[71]).channels
+
+
+def test_config_bad_ranges(caplog):
+    """Test that invalid ranges are skipped and names with braces are kept."""
+    config = DynaliteConfig(
+        {
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_CHANNEL: {
+                        "1-": {},
+                        "a-b": {},
+                        "8-5": {},
+                        "1-2": {dyn_const.CONF_NAME: "Strip {x} {0} {"},
+                    },
+                    dyn_const.CONF_PRESET: {"64-1": {}},
+                },
+                "5-3": {},
+                "20-21": {dyn_const.CONF_NAME: "Hall {area} {"},
+            },
+        }
+    )
+    assert sorted(config.area) == [1, 20, 21]
+    assert list(config.area[1].channels) == [1, 2]
+    assert config.area[1].channels[2].name == "Strip {x} {0} {"
+    assert not config.area[1].presets
+    assert config.area[20].name == "Hall {area} {"
+    assert caplog.text.count("ignoring") == 5
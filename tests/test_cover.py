@@ -4,10 +4,11 @@ import asyncio
 
 import pytest
 
+from dynalite_devices_lib.calibration import DynaliteCalibrationStore
 import dynalite_devices_lib.const as dyn_const
 from dynalite_devices_lib.dynet import DynetPacket
 
-from .common import packet_notification, preset_notification
+from .common import preset_notification
 
 
 @pytest.mark.asyncio
@@ -57,18 +58,13 @@ async def test_cover_no_tilt(mock_gateway):
     # Initialize to closed - otherwise it takes the first one as the init status
     packet_to_send = DynetPacket.report_area_preset_packet(1, 2)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 2)]
-    )
+    # the cover starts closed, so only the preset changes
+    await mock_gateway.check_single_update(close_device)
+    await mock_gateway.check_notifications([preset_notification(1, 2)])
     # It is closed. Let's open
     assert cover_device.is_closed
     await cover_device.async_open_cover()
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await mock_gateway.check_updates([open_device, close_device, cover_device], True)
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 1, 0)
     )
@@ -76,7 +72,8 @@ async def test_cover_no_tilt(mock_gateway):
     assert open_device.is_on
     assert not close_device.is_on
     assert not stop_device.is_on
-    await asyncio.sleep(0.25)
+    # the checks above already waited for 0.03 seconds
+    await asyncio.sleep(0.21)
     assert cover_device.is_opening
     assert 40 < cover_device.current_cover_position < 60
     await asyncio.sleep(0.4)
@@ -89,9 +86,7 @@ async def test_cover_no_tilt(mock_gateway):
     await mock_gateway.check_updates([cover_device], True)
     # It is open. Now let's close
     await cover_device.async_close_cover()
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await mock_gateway.check_updates([open_device, close_device, cover_device], True)
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 2, 0)
     )
@@ -99,15 +94,13 @@ async def test_cover_no_tilt(mock_gateway):
     assert close_device.is_on
     assert not open_device.is_on
     assert not stop_device.is_on
-    await asyncio.sleep(0.25)
+    await asyncio.sleep(0.21)
     await mock_gateway.check_updates([cover_device], True)
     assert cover_device.is_closing
     assert 40 < cover_device.current_cover_position < 60
     # Stop halfway
     await cover_device.async_stop_cover()
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await mock_gateway.check_updates([close_device, stop_device, cover_device], True)
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 3, 0)
     )
@@ -122,9 +115,7 @@ async def test_cover_no_tilt(mock_gateway):
     )
     # And continue to full close
     await cover_device.async_close_cover()
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await mock_gateway.check_updates([close_device, stop_device, cover_device], True)
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 2, 0)
     )
@@ -135,6 +126,8 @@ async def test_cover_no_tilt(mock_gateway):
     assert cover_device.current_cover_position == 0
     # Now open it half-way
     await cover_device.async_set_cover_position(position=50)
+    # the stop is sent when the cover reaches the position
+    await asyncio.sleep(0.35)
     await mock_gateway.check_updates(
         [open_device, close_device, stop_device, cover_device], True
     )
@@ -152,9 +145,8 @@ async def test_cover_no_tilt(mock_gateway):
     )
     assert 40 < cover_device.current_cover_position < 60
     await cover_device.async_set_cover_position(position=25)
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await asyncio.sleep(0.25)
+    await mock_gateway.check_updates([close_device, stop_device, cover_device], True)
     await mock_gateway.check_notifications(
         [
             preset_notification(1, 2),
@@ -169,18 +161,14 @@ async def test_cover_no_tilt(mock_gateway):
     )
     assert 15 < cover_device.current_cover_position < 35
     await cover_device.async_open_cover()
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await mock_gateway.check_updates([open_device, stop_device, cover_device], True)
     await mock_gateway.check_notifications([preset_notification(1, 1)])
     assert cover_device.is_opening
     mock_gateway.reset()
     await cover_device.async_set_cover_position(
         position=cover_device.current_cover_position
     )
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
+    await mock_gateway.check_updates([open_device, stop_device, cover_device], True)
     await mock_gateway.check_notifications([preset_notification(1, 3)])
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 3, 0)
@@ -193,86 +181,58 @@ async def test_cover_no_tilt(mock_gateway):
     # Now send commands
     packet_to_send = DynetPacket.report_area_preset_packet(1, 1)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 1)]
-    )
+    await mock_gateway.check_updates([open_device, stop_device, cover_device], True)
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
     assert cover_device.is_opening
     packet_to_send = DynetPacket.report_area_preset_packet(1, 2)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 2)]
-    )
+    await mock_gateway.check_updates([open_device, close_device, cover_device], True)
+    await mock_gateway.check_notifications([preset_notification(1, 2)])
     assert cover_device.is_closing
     packet_to_send = DynetPacket.report_area_preset_packet(1, 3)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 3)]
-    )
+    await mock_gateway.check_updates([close_device, stop_device, cover_device], True)
+    await mock_gateway.check_notifications([preset_notification(1, 3)])
     assert not cover_device.is_closing and not cover_device.is_opening
     packet_to_send = DynetPacket.report_area_preset_packet(1, 1)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates(
-        [open_device, close_device, stop_device, cover_device], True
-    )
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 1)]
-    )
+    await mock_gateway.check_updates([open_device, stop_device, cover_device], True)
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
     await asyncio.sleep(0.3)
     await mock_gateway.check_updates([cover_device], True)
     packet_to_send = DynetPacket.report_channel_level_packet(1, 4, 0, 1)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([cover_device, channel_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert cover_device.is_closing
     await asyncio.sleep(0.01)
     # Open and then stop with channel
     packet_to_send = DynetPacket.report_channel_level_packet(1, 4, 1, 0)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([cover_device, channel_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert cover_device.is_opening
     packet_to_send = DynetPacket.stop_channel_fade_packet(1, 4)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([cover_device, channel_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert not cover_device.is_opening
     assert not cover_device.is_closing
     # Open and then stop with area (channel=0xff)
     packet_to_send = DynetPacket.report_channel_level_packet(1, 4, 0, 1)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([cover_device, channel_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     await asyncio.sleep(0.1)
     packet_to_send = DynetPacket.report_channel_level_packet(1, 4, 1, 0)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([cover_device, channel_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert cover_device.is_opening
     packet_to_send = DynetPacket.stop_channel_fade_packet(1, 256)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([cover_device, channel_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert not cover_device.is_opening
     assert not cover_device.is_closing
     cover_device.init_level(50)
@@ -316,10 +276,8 @@ async def test_cover_with_tilt(mock_gateway):
     # Initialize to closed - otherwise it takes the first one as the init status
     packet_to_send = DynetPacket.report_area_preset_packet(1, 2)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates([cover_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 2)]
-    )
+    await mock_gateway.check_updates([])
+    await mock_gateway.check_notifications([preset_notification(1, 2)])
     # It is closed. Let's open
     assert cover_device.is_closed
     assert cover_device.current_cover_tilt_position == 0
@@ -329,7 +287,7 @@ async def test_cover_with_tilt(mock_gateway):
     )
     await mock_gateway.check_updates([cover_device], True)
     await mock_gateway.check_notifications([preset_notification(1, 1)])
-    await asyncio.sleep(0.125)
+    await asyncio.sleep(0.085)
     await mock_gateway.check_updates([cover_device], True)
     assert cover_device.is_opening
     assert 30 < cover_device.current_cover_tilt_position < 70
@@ -341,6 +299,7 @@ async def test_cover_with_tilt(mock_gateway):
     )
     await mock_gateway.check_notifications([preset_notification(1, 3)])
     await cover_device.async_open_cover_tilt()
+    await asyncio.sleep(0.25)
     await mock_gateway.check_notifications(
         [
             preset_notification(1, 1),
@@ -368,7 +327,7 @@ async def test_cover_with_tilt(mock_gateway):
         DynetPacket.select_area_preset_packet(1, 2, 0)
     )
     await mock_gateway.check_notifications([preset_notification(1, 2)])
-    await asyncio.sleep(0.125)
+    await asyncio.sleep(0.085)
     await mock_gateway.check_updates([cover_device], True)
     assert cover_device.is_closing
     assert 30 < cover_device.current_cover_tilt_position < 70
@@ -402,6 +361,7 @@ async def test_cover_with_tilt(mock_gateway):
     await mock_gateway.check_writes([])
     # Now open it half-way
     await cover_device.async_set_cover_tilt_position(tilt_position=50)
+    await asyncio.sleep(0.25)
     await mock_gateway.check_notifications(
         [
             preset_notification(1, 1),
@@ -446,10 +406,8 @@ async def test_cover_no_channel(mock_gateway):
     # Initialize to closed - otherwise it takes the first one as the init status
     packet_to_send = DynetPacket.report_area_preset_packet(1, 2)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates([cover_device], True)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 2)]
-    )
+    await mock_gateway.check_updates([])
+    await mock_gateway.check_notifications([preset_notification(1, 2)])
     # It is closed. Let's open
     assert cover_device.is_closed
     await cover_device.async_open_cover()
@@ -458,7 +416,7 @@ async def test_cover_no_channel(mock_gateway):
     )
     await mock_gateway.check_updates([cover_device], True)
     await mock_gateway.check_notifications([preset_notification(1, 1)])
-    await asyncio.sleep(0.25)
+    await asyncio.sleep(0.21)
     await mock_gateway.check_updates([cover_device], True)
     assert cover_device.is_opening
     assert 40 < cover_device.current_cover_position < 60
@@ -470,3 +428,227 @@ async def test_cover_no_channel(mock_gateway):
         and not cover_device.is_closing
     )
     assert cover_device.current_cover_position == 100
+
+
+@pytest.mark.asyncio
+async def test_cover_stop_deadline(mock_gateway, monkeypatch):
+    """Test the positioning error of the scheduled stop with a virtual clock."""
+    [cover_device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_POLL_TIMER: 0.05,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_TEMPLATE: dyn_const.CONF_TIME_COVER,
+                    dyn_const.CONF_DURATION: 10,
+                    dyn_const.CONF_OPEN_PRESET: 1,
+                    dyn_const.CONF_CLOSE_PRESET: 2,
+                    dyn_const.CONF_STOP_PRESET: 3,
+                }
+            },
+        }
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    cover_device.init_level(0)
+    loop = asyncio.get_running_loop()
+    real_time = loop.time
+    step = 0.007  # virtual time that passes in each loop iteration
+    for target, preset in [(37, 1), (81, 1), (12, 2), (50, 1)]:
+        now = real_time()
+        monkeypatch.setattr(loop, "time", lambda: now)
+        await cover_device.async_set_cover_position(position=target)
+        while cover_device.is_opening or cover_device.is_closing:
+            now += step
+            await asyncio.sleep(0)
+        # the position error is bounded by the clock step, not the poll timer
+        error = abs(cover_device.current_cover_position - target)
+        assert error <= 1 + 100 * step / 10
+        # the second stop is sent one poll interval later
+        now += 0.05
+        await asyncio.sleep(0)
+        monkeypatch.setattr(loop, "time", real_time)
+        await mock_gateway.check_notifications(
+            [
+                preset_notification(1, preset),
+                preset_notification(1, 3),
+                preset_notification(1, 3),
+            ]
+        )
+        await mock_gateway.check_updates([cover_device], True)
+
+
+def time_cover_config(duration, poll_timer):
+    """Return the config of a time cover without a channel in area 1."""
+    return {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_POLL_TIMER: poll_timer,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_TEMPLATE: dyn_const.CONF_TIME_COVER,
+                dyn_const.CONF_DURATION: duration,
+                dyn_const.CONF_OPEN_PRESET: 1,
+                dyn_const.CONF_CLOSE_PRESET: 2,
+                dyn_const.CONF_STOP_PRESET: 3,
+            }
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_cover_position_at(mock_gateway):
+    """Test that the position is computed from the start of the motion."""
+    [cover_device] = mock_gateway.configure_dyn_dev(time_cover_config(10, 100))
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    cover_device.init_level(20)
+    now = mock_gateway.dyn_dev.time()
+    assert cover_device.elapsed_fraction(now + 2, 10) == 0.0
+    assert cover_device.position_at(now + 2) == pytest.approx(0.2)
+    cover_device.update_level(0.2, 1.0)
+    start = cover_device.travel_end_time() - 8
+    assert cover_device.elapsed_fraction(start + 2, 10) == pytest.approx(0.2)
+    assert cover_device.position_at(start + 2) == pytest.approx(0.4)
+    assert cover_device.position_at(start + 100) == 1.0
+    cover_device.update_level(cover_device.position_at(start), 0.0)
+    start = cover_device.travel_end_time() - 2
+    assert cover_device.elapsed_fraction(start + 1, 10) == pytest.approx(-0.1, abs=0.01)
+    assert cover_device.position_at(start + 1) == pytest.approx(0.1, abs=0.01)
+    assert cover_device.position_at(start + 100) == 0.0
+    await mock_gateway.check_updates([cover_device], True)
+
+
+@pytest.mark.asyncio
+async def test_cover_end_of_travel(mock_gateway):
+    """Test that the cover stops at the end of the travel, not at the next poll."""
+    [cover_device] = mock_gateway.configure_dyn_dev(time_cover_config(0.2, 100))
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    cover_device.init_level(50)
+    cover_device.update_level(0.5, 1.0)
+    assert cover_device.is_opening
+    await mock_gateway.check_single_update(cover_device)
+    await asyncio.sleep(0.1)
+    assert not cover_device.is_opening
+    assert cover_device.current_cover_position == 100
+    await mock_gateway.check_single_update(cover_device)
+
+
+@pytest.mark.asyncio
+async def test_cover_one_percent_move(mock_gateway):
+    """Test that a move of one percent opens the cover instead of stopping it."""
+    [cover_device] = mock_gateway.configure_dyn_dev(time_cover_config(10, 100))
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    cover_device.init_level(8)
+    # 0.09 - 0.08 is slightly less than 0.01 as floats
+    await cover_device.async_set_cover_position(position=9)
+    assert cover_device.is_opening
+    await mock_gateway.check_single_write(
+        DynetPacket.select_area_preset_packet(1, 1, 0)
+    )
+    await cover_device.async_stop_cover()
+    await mock_gateway.check_single_write(
+        DynetPacket.select_area_preset_packet(1, 3, 0)
+    )
+    cover_device.init_level(9)
+    await cover_device.async_set_cover_position(position=8)
+    assert cover_device.is_closing
+    await mock_gateway.check_single_write(
+        DynetPacket.select_area_preset_packet(1, 2, 0)
+    )
+    await cover_device.async_stop_cover()
+    await mock_gateway.check_single_write(
+        DynetPacket.select_area_preset_packet(1, 3, 0)
+    )
+    await mock_gateway.check_updates([cover_device], True)
+    await mock_gateway.check_notifications(
+        [
+            preset_notification(1, 1),
+            preset_notification(1, 3),
+            preset_notification(1, 2),
+            preset_notification(1, 3),
+        ]
+    )
+    # the position is reported as set, so setting it again stops the cover
+    for position in [29, 57, 58]:
+        cover_device.init_level(position)
+        assert cover_device.current_cover_position == position
+        await cover_device.async_set_cover_position(position=position)
+        assert not cover_device.is_opening and not cover_device.is_closing
+        await mock_gateway.check_single_write(
+            DynetPacket.select_area_preset_packet(1, 3, 0)
+        )
+        await mock_gateway.check_notifications([preset_notification(1, 3)])
+
+
+@pytest.mark.asyncio
+async def test_cover_calibration(mock_gateway, tmp_path):
+    """Test fitting the cover duration from the channel and confirming the stop."""
+    calibration_file = tmp_path / "calibration.json"
+    [channel_device, cover_device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_POLL_TIMER: 0.2,
+            dyn_const.CONF_CALIBRATION_FILE: str(calibration_file),
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_TEMPLATE: dyn_const.CONF_TIME_COVER,
+                    dyn_const.CONF_DURATION: 1.0,
+                    dyn_const.CONF_TILT_TIME: 0.5,
+                    dyn_const.CONF_OPEN_PRESET: 1,
+                    dyn_const.CONF_CLOSE_PRESET: 2,
+                    dyn_const.CONF_STOP_PRESET: 3,
+                    dyn_const.CONF_CHANNEL_COVER: 4,
+                    dyn_const.CONF_CHANNEL: {"4": {}},
+                }
+            },
+        },
+        2,
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    dyn_dev = mock_gateway.dyn_dev
+    assert dyn_dev.get_cover_duration(1) == 1.0
+    cover_device.init_level(0)
+    # the channel moves half way in about 0.25 seconds
+    packets = [
+        DynetPacket.report_channel_level_packet(1, 4, 1, 0),
+        DynetPacket.report_channel_level_packet(1, 4, 0.5, 0.5),
+    ]
+    for packet_to_send in packets:
+        await mock_gateway.receive(packet_to_send)
+        await mock_gateway.check_updates([cover_device, channel_device], True)
+        await mock_gateway.check_notifications([])
+        await asyncio.sleep(0.2)
+    duration = dyn_dev.get_cover_duration(1)
+    assert 0.4 < duration < 0.7
+    assert dyn_dev.get_cover_tilt_duration(1) == pytest.approx(duration / 2)
+    # the calibration is persisted
+    await asyncio.sleep(0.05)
+    store = DynaliteCalibrationStore(str(calibration_file))
+    store.load()
+    assert store.get_duration(1) == pytest.approx(duration)
+    # the stop is only sent once when the channel confirms it
+    target = cover_device.current_cover_position + 30
+    await cover_device.async_set_cover_position(position=target)
+    await asyncio.sleep(0.3 * duration + 0.02)
+    await mock_gateway.check_writes(
+        [
+            DynetPacket.select_area_preset_packet(1, 1, 0),
+            DynetPacket.select_area_preset_packet(1, 3, 0),
+        ]
+    )
+    level = target / 100
+    packet_to_send = DynetPacket.report_channel_level_packet(1, 4, level, level)
+    await mock_gateway.receive(packet_to_send)
+    await asyncio.sleep(0.2)
+    await mock_gateway.check_writes([])
+    await mock_gateway.check_updates([cover_device, channel_device], True)
+    await mock_gateway.check_notifications(
+        [
+            preset_notification(1, 1),
+            preset_notification(1, 3),
+        ]
+    )
+    assert abs(cover_device.current_cover_position - target) <= 5
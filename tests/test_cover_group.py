@@ -0,0 +1,138 @@
+"""Tests for groups of Dynalite time covers."""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynet import DynetPacket
+
+from .common import preset_notification
+
+
+def group_config():
+    """Return the configuration of three time covers in areas 1-3."""
+    cover_config = {
+        dyn_const.CONF_TEMPLATE: dyn_const.CONF_TIME_COVER,
+        dyn_const.CONF_DURATION: 0.5,
+        dyn_const.CONF_OPEN_PRESET: 1,
+        dyn_const.CONF_CLOSE_PRESET: 2,
+        dyn_const.CONF_STOP_PRESET: 3,
+    }
+    return {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_POLL_TIMER: 0.05,
+        dyn_const.CONF_AREA: {str(area): dict(cover_config) for area in range(1, 4)},
+    }
+
+
+@pytest.mark.asyncio
+async def test_cover_group(mock_gateway):
+    """Test moving several covers in different areas together."""
+    covers = mock_gateway.configure_dyn_dev(group_config(), 3)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    with pytest.raises(ValueError):
+        mock_gateway.dyn_dev.create_cover_group([1, 4])
+    update_func = Mock()
+    group = mock_gateway.dyn_dev.create_cover_group([1, 2, 2, 3], update_func)
+    assert group.covers == covers
+    for cover in covers:
+        cover.init_level(0)
+    assert group.is_closed
+    # one open preset per area
+    await group.async_set_cover_position(position=50)
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 1, 0) for area in range(1, 4)]
+    )
+    await mock_gateway.check_notifications(
+        [preset_notification(area, 1) for area in range(1, 4)]
+    )
+    assert group.is_opening
+    await asyncio.sleep(0.1)
+    assert 0.1 < group.progress < 0.9
+    update_func.assert_called_with(group)
+    # each cover stops at the target, twice since there is no channel
+    await asyncio.sleep(0.3)
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 3, 0) for area in range(1, 4)] * 2
+    )
+    await mock_gateway.check_notifications(
+        [preset_notification(area, 3) for area in range(1, 4)] * 2
+    )
+    await mock_gateway.check_updates(covers, True)
+    assert not group.is_opening and not group.is_closing
+    assert group.progress > 0.9
+    assert 45 <= group.current_cover_position <= 55
+    for cover in covers:
+        assert 45 <= cover.current_cover_position <= 55
+    # a command to one cover cancels the stop of the group for it
+    await group.async_set_cover_position(position=90)
+    await covers[0].async_close_cover()
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 1, 0) for area in range(1, 4)]
+        + [DynetPacket.select_area_preset_packet(1, 2, 0)]
+    )
+    await asyncio.sleep(0.3)
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 3, 0) for area in [2, 3]] * 2
+    )
+    assert covers[0].is_closed
+    assert 85 <= covers[1].current_cover_position <= 95
+    await mock_gateway.check_notifications(
+        [preset_notification(area, 1) for area in range(1, 4)]
+        + [preset_notification(1, 2)]
+        + [preset_notification(area, 3) for area in [2, 3]] * 2
+    )
+    await mock_gateway.check_updates(covers, True)
+    # the covers track their motion on their own again
+    await covers[0].async_open_cover()
+    await mock_gateway.check_single_write(
+        DynetPacket.select_area_preset_packet(1, 1, 0)
+    )
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
+    await asyncio.sleep(0.6)
+    assert covers[0].current_cover_position == 100
+    await mock_gateway.check_updates([covers[0]], True)
+    # stop all
+    await group.async_close_cover()
+    await group.async_stop_cover()
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 2, 0) for area in range(1, 4)]
+        + [DynetPacket.select_area_preset_packet(area, 3, 0) for area in range(1, 4)]
+    )
+    await mock_gateway.check_notifications(
+        [preset_notification(area, 2) for area in range(1, 4)]
+        + [preset_notification(area, 3) for area in range(1, 4)]
+    )
+    await mock_gateway.check_updates(covers, True)
+    assert not group.is_opening and not group.is_closing
+
+
+@pytest.mark.asyncio
+async def test_cover_group_one_percent_move(mock_gateway):
+    """Test that a move of one percent opens the covers instead of stopping them."""
+    config = group_config()
+    for area_config in config[dyn_const.CONF_AREA].values():
+        area_config[dyn_const.CONF_DURATION] = 10
+    covers = mock_gateway.configure_dyn_dev(config, 3)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    group = mock_gateway.dyn_dev.create_cover_group([1, 2, 3])
+    for cover in covers:
+        cover.init_level(8)
+    await group.async_set_cover_position(position=9)
+    assert group.is_opening
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 1, 0) for area in range(1, 4)]
+    )
+    await group.async_stop_cover()
+    await mock_gateway.check_writes(
+        [DynetPacket.select_area_preset_packet(area, 3, 0) for area in range(1, 4)]
+    )
+    await mock_gateway.check_notifications(
+        [preset_notification(area, 1) for area in range(1, 4)]
+        + [preset_notification(area, 3) for area in range(1, 4)]
+    )
+    await mock_gateway.check_updates(covers, True)
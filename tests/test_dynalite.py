@@ -18,6 +18,7 @@ async def test_dynalite_disconnection(mock_gateway):
     devices = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {
                 "1": {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}}},
                 "2": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM},
@@ -53,6 +54,7 @@ async def test_dynalite_connection_reset(mock_gateway):
     devices = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: True,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {
                 "1": {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}}},
                 "2": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM},
@@ -96,6 +98,7 @@ async def test_dynalite_shutdown_with_server_down(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -116,6 +119,7 @@ async def test_dynalite_split_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -139,6 +143,7 @@ async def test_dynalite_shift_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -160,6 +165,7 @@ async def test_dynalite_debug_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -187,6 +193,7 @@ async def test_dynalite_device_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -214,6 +221,7 @@ async def test_dynalite_error_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -239,6 +247,7 @@ async def test_dynalite_unhandled_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -263,6 +272,7 @@ async def test_dynalite_unknown_message(mock_gateway):
     [device] = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -287,6 +297,7 @@ async def test_dynalite_two_messages(mock_gateway):
     devices = mock_gateway.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}}}},
             dyn_const.CONF_PRESET: {},
         },
@@ -313,6 +324,7 @@ async def test_dynalite_write_message_throttle(mock_gateway_with_delay):
     mock_gateway_with_delay.configure_dyn_dev(
         {
             dyn_const.CONF_ACTIVE: True,
+            dyn_const.CONF_PACKET_NOTIFY: True,
             dyn_const.CONF_AREA: {
                 i: {dyn_const.CONF_CHANNEL: {1: {}}} for i in range(1, 26)
             },
@@ -324,3 +336,144 @@ async def test_dynalite_write_message_throttle(mock_gateway_with_delay):
     await mock_gateway_with_delay.check_single_update(None)
     await asyncio.sleep(1)  # should be roughly 5 messages
     assert 3 * 8 <= len(mock_gateway_with_delay.in_buffer) <= 7 * 8
+
+
+@pytest.mark.asyncio
+async def test_dynalite_echo_timeout(mock_gateway):
+    """Test that only recent frames we sent are recognized as echoes, once each."""
+    [device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_CHANNEL: {"1": {}},
+                }
+            },
+        },
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    packet = DynetPacket.set_channel_level_packet(1, 1, 1.0, 0)
+    with patch("dynalite_devices_lib.dynalite.ECHO_TIMEOUT", 0.05):
+        mock_gateway.dyn_dev.set_channel_level(1, 1, 1.0, 0)
+        await mock_gateway.check_writes([packet])
+        await mock_gateway.check_single_update(device)
+        await mock_gateway.receive(packet)
+        assert mock_gateway.dyn_dev.echo_count == 1
+        # the same frame again is not an echo, it was only sent once
+        await mock_gateway.receive(packet)
+        assert mock_gateway.dyn_dev.echo_count == 1
+        mock_gateway.dyn_dev.set_channel_level(1, 1, 1.0, 0)
+        await mock_gateway.check_writes([packet])
+        await asyncio.sleep(0.1)
+        await mock_gateway.receive(packet)
+        assert mock_gateway.dyn_dev.echo_count == 1
+    await mock_gateway.check_updates([])
+    await mock_gateway.check_notifications([packet_notification(packet.raw_msg)] * 3)
+
+
+@pytest.mark.asyncio
+async def test_dynalite_dedup_window(mock_gateway):
+    """Test that copies of a frame within the dedup window are dropped."""
+    [device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
+            dyn_const.CONF_DEDUP_WINDOW: 0.05,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_CHANNEL: {"1": {}},
+                }
+            },
+        },
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    packet = DynetPacket.report_channel_level_packet(1, 1, 1.0, 1.0)
+    await mock_gateway.receive_message(packet.msg * 3)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([packet_notification(packet.raw_msg)])
+    assert mock_gateway.dyn_dev.dedup_stats == {packet.msg[3]: 2}
+    # other frames are not affected
+    other_packet = DynetPacket.report_channel_level_packet(1, 1, 0.5, 0.5)
+    await mock_gateway.receive(other_packet)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([packet_notification(other_packet.raw_msg)])
+    # after the window the same frame is passed on again
+    await asyncio.sleep(0.05)
+    await mock_gateway.receive(packet)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([packet_notification(packet.raw_msg)])
+    assert mock_gateway.dyn_dev.dedup_stats == {packet.msg[3]: 2}
+
+
+@pytest.mark.asyncio
+async def test_dynalite_packet_filter(mock_gateway):
+    """Test that only the frames that pass the filter send packet notifications."""
+    devices = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: {
+                dyn_const.CONF_SYNC_TYPE: ["logical"],
+                dyn_const.CONF_AREA: ["1"],
+                dyn_const.CONF_OPCODE: ["report_channel_level"],
+            },
+            dyn_const.CONF_AREA: {
+                "1": {dyn_const.CONF_CHANNEL: {"1": {}}},
+                "2": {dyn_const.CONF_CHANNEL: {"1": {}}},
+            },
+            dyn_const.CONF_PRESET: {},
+        },
+        2,
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    packet = DynetPacket.report_channel_level_packet(1, 1, 1.0, 1.0)
+    await mock_gateway.receive(packet)
+    await mock_gateway.check_single_update(devices[0])
+    await mock_gateway.check_notifications([packet_notification(packet.raw_msg)])
+    # other opcodes, areas and sync types are still handled, without notifications
+    for packet in [
+        DynetPacket.set_channel_level_packet(1, 1, 0.5, 0),
+        DynetPacket.report_channel_level_packet(2, 1, 1.0, 1.0),
+    ]:
+        await mock_gateway.receive(packet)
+    await mock_gateway.check_updates(devices, True)
+    await mock_gateway.receive_message(bytearray([SyncType.DEBUG_MSG.value] + [65] * 7))
+    await mock_gateway.check_notifications([])
+
+
+@pytest.mark.asyncio
+async def test_dynalite_area_prefilter(mock_gateway):
+    """Test that frames of other areas are skipped whole only when they are valid."""
+    [device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_PACKET_NOTIFY: True,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_CHANNEL: {"1": {}},
+                }
+            },
+        },
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    # the packet notification is still sent for a frame that is not decoded
+    other_packet = DynetPacket.set_channel_level_packet(5, 1, 1.0, 0.5)
+    await mock_gateway.receive(other_packet)
+    await mock_gateway.check_notifications([packet_notification(other_packet.raw_msg)])
+    assert mock_gateway.dyn_dev.filtered_frames == 1
+    # a broken frame of another area is not skipped whole, so the next frame is found
+    message = other_packet.msg
+    message[7] += 1
+    packet = DynetPacket.set_channel_level_packet(1, 1, 1.0, 0.5)
+    await mock_gateway.receive_message(message[:5] + packet.msg)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([packet_notification(packet.raw_msg)])
+    assert mock_gateway.dyn_dev.filtered_frames == 1
+    assert device.is_on
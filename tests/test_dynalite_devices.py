@@ -1,12 +1,18 @@
 """Tests for DynaliteDevices."""
 
+import asyncio
+import json
+import time
+from unittest.mock import Mock, call, patch
 
 import pytest
 
 import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynalite_devices import DynaliteDevices
 from dynalite_devices_lib.dynet import DynetPacket
+from dynalite_devices_lib.switch import DynaliteChannelSwitchDevice
 
-from .common import packet_notification, preset_notification
+from .common import preset_notification
 
 
 @pytest.mark.asyncio
@@ -51,9 +57,7 @@ async def test_dynalite_devices_active(mock_gateway, active):
     packet_to_send = DynetPacket.report_area_preset_packet(1, 1)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device_pres)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 1)]
-    )
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
     if active is True:
         await mock_gateway.check_writes(
             [
@@ -98,9 +102,7 @@ async def test_dynalite_devices_auto_discover_on(mock_gateway):
     func.reset_mock()
     packet_to_send = DynetPacket.report_area_preset_packet(1, 1)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 1)]
-    )
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
     func.assert_called_once()
     devices = func.mock_calls[0][1][0]
     assert len(devices) == 1
@@ -109,14 +111,14 @@ async def test_dynalite_devices_auto_discover_on(mock_gateway):
     func.reset_mock()
     packet_to_send = DynetPacket.set_channel_level_packet(2, 3, 0, 0)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     func.assert_called_once()
     devices = func.mock_calls[0][1][0]
     assert len(devices) == 1
     assert devices[0].unique_id == "dynalite_area_2_channel_3"
-    await mock_gateway.check_single_update(devices[0])
+    # new channel at level 0 - no change to report
+    await mock_gateway.check_updates([])
+    assert mock_gateway.dyn_dev.suppressed_updates == 1
 
 
 @pytest.mark.asyncio
@@ -134,16 +136,118 @@ async def test_dynalite_devices_auto_discover_off(mock_gateway):
     func.reset_mock()
     packet_to_send = DynetPacket.report_area_preset_packet(1, 1)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 1)]
-    )
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
     func.assert_not_called()
     packet_to_send = DynetPacket.set_channel_level_packet(2, 3, 0, 0)
     await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_notifications([])
+    func.assert_not_called()
+    # only the channel frame of the area that is not configured is not decoded
+    assert mock_gateway.dyn_dev.filtered_frames == 1
+    # a preset does not add its area, so the channels of the area are still dropped
+    for channel in range(1, 5):
+        packet_to_send = DynetPacket.set_channel_level_packet(1, channel, 0, 0)
+        await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_notifications([])
+    func.assert_not_called()
+    assert mock_gateway.dyn_dev.filtered_frames == 5
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_auto_discover_bounded(mock_gateway):
+    """Test that discovery is capped and evicts the least recently seen entity."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AUTO_DISCOVER: True,
+        dyn_const.CONF_MAX_DISCOVERED: 2,
+        dyn_const.CONF_DISCOVER_IDLE: 0.1,
+        dyn_const.CONF_AREA: {},
+    }
+    mock_gateway.configure_dyn_dev(config, 0)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    func = mock_gateway.new_dev_func
+    remove_func = mock_gateway.remove_dev_func
+    devices = []
+    for area in [1, 2]:
+        func.reset_mock()
+        await mock_gateway.receive(DynetPacket.report_area_preset_packet(area, 1))
+        await mock_gateway.check_notifications([preset_notification(area, 1)])
+        func.assert_called_once()
+        devices.append(func.mock_calls[0][1][0][0])
+        await mock_gateway.check_single_update(devices[-1])
+    # the cap is reached and nothing was idle long enough
+    func.reset_mock()
+    await mock_gateway.receive(DynetPacket.report_area_preset_packet(3, 1))
+    await mock_gateway.check_notifications([preset_notification(3, 1)])
+    func.assert_not_called()
+    await asyncio.sleep(0.1)
+    # area 1 is seen again, so area 2 is now the least recently seen
+    await mock_gateway.receive(DynetPacket.report_area_preset_packet(1, 1))
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
+    await mock_gateway.receive(DynetPacket.report_area_preset_packet(3, 1))
+    await mock_gateway.check_notifications([preset_notification(3, 1)])
+    func.assert_called_once()
+    assert func.mock_calls[0][1][0][0].unique_id == "dynalite_area_3_preset_1"
+    remove_func.assert_called_once_with([devices[1]])
+    await mock_gateway.check_updates([func.mock_calls[0][1][0][0]])
+    # a reconfigure keeps the discovered areas, but not the ones dropped from config
+    area_4 = {dyn_const.CONF_NO_DEFAULT: True, dyn_const.CONF_CHANNEL: {"1": {}}}
+    [area_4_device] = mock_gateway.configure_dyn_dev(
+        {**config, dyn_const.CONF_AREA: {"4": area_4}}
+    )
+    assert mock_gateway.dyn_dev.is_configured(dyn_const.CONF_PRESET, 3, 1)
+    assert not mock_gateway.dyn_dev.is_configured(dyn_const.CONF_PRESET, 2, 1)
+    mock_gateway.configure_dyn_dev(config, 0)
+    assert not mock_gateway.dyn_dev.is_configured(dyn_const.CONF_CHANNEL, 4, 1)
+    remove_func.assert_called_with([area_4_device])
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_auto_discover_off_untracked(mock_gateway):
+    """Test that the hidden entities found without autodiscover are not tracked."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AUTO_DISCOVER: False,
+        dyn_const.CONF_AREA: {"1": {dyn_const.CONF_NO_DEFAULT: True}},
+    }
+    mock_gateway.configure_dyn_dev(config, 0)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    func = mock_gateway.new_dev_func
+    func.reset_mock()
+    for item in range(1, 21):
+        await mock_gateway.receive(DynetPacket.report_area_preset_packet(1, item))
+        await mock_gateway.receive(DynetPacket.set_channel_level_packet(1, item, 0, 0))
     await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
+        [preset_notification(1, item) for item in range(1, 21)]
     )
     func.assert_not_called()
+    assert mock_gateway.dyn_dev.is_configured(dyn_const.CONF_PRESET, 1, 20)
+    assert mock_gateway.dyn_dev.is_configured(dyn_const.CONF_CHANNEL, 1, 20)
+    assert not mock_gateway.dyn_dev._discovered  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_auto_discover_rate(mock_gateway):
+    """Test the rate limit of discovering new entities."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AUTO_DISCOVER: True,
+        dyn_const.CONF_DISCOVER_RATE: 1,
+        dyn_const.CONF_AREA: {},
+    }
+    mock_gateway.configure_dyn_dev(config, 0)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    func = mock_gateway.new_dev_func
+    func.reset_mock()
+    for channel in [1, 2]:
+        packet_to_send = DynetPacket.set_channel_level_packet(1, channel, 0, 0)
+        await mock_gateway.receive(packet_to_send)
+    func.assert_called_once()
+    assert func.mock_calls[0][1][0][0].unique_id == "dynalite_area_1_channel_1"
+    await mock_gateway.check_updates([])
 
 
 @pytest.mark.asyncio
@@ -164,16 +268,24 @@ async def test_dynalite_devices_auto_discover_template(mock_gateway):
     func.reset_mock()
     packet_to_send = DynetPacket.report_area_preset_packet(1, 2)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 2)]
-    )
+    await mock_gateway.check_notifications([preset_notification(1, 2)])
     func.assert_not_called()
     packet_to_send = DynetPacket.set_channel_level_packet(2, 3, 0, 0)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     func.assert_not_called()
+    # the hidden entities only keep their state until a device is needed
+    dyn_dev = mock_gateway.dyn_dev
+    assert dyn_dev.get_device(dyn_const.CONF_PRESET, 1, 3) is None
+    preset_device = dyn_dev.get_device(dyn_const.CONF_PRESET, 1, 2)
+    assert preset_device.hidden and preset_device.is_on
+    assert dyn_dev.get_device(dyn_const.CONF_PRESET, 1, 2) is preset_device
+    packet_to_send = DynetPacket.report_channel_level_packet(2, 3, 0.4, 0.4)
+    await mock_gateway.receive(packet_to_send)
+    channel_device = dyn_dev.get_device(dyn_const.CONF_CHANNEL, 2, 3)
+    assert channel_device.hidden
+    assert channel_device.brightness == int(255 * 0.4)
+    await mock_gateway.check_updates([])
 
 
 @pytest.mark.asyncio
@@ -273,6 +385,11 @@ async def test_dynalite_devices_reconfig_with_missing(mock_gateway):
         },
         0,
     )
+    # the template devices were removed
+    assert mock_gateway.remove_dev_func.mock_calls == [
+        call([device_room]),
+        call([device_cover]),
+    ]
     assert not device_room.available
     assert not device_cover.available
 
@@ -324,3 +441,473 @@ async def test_dynalite_devices_request_area_preset(mock_gateway):
     await mock_gateway.check_single_write(DynetPacket.request_area_preset_packet(3, 3))
     mock_gateway.dyn_dev.request_area_preset(4, 9)
     await mock_gateway.check_single_write(DynetPacket.request_area_preset_packet(4, 9))
+
+
+def batch_dyn_dev(mock_gateway, batch_func):
+    """Replace the gateway's DynaliteDevices with one that delivers updates in batches."""
+    with patch("dynalite_devices_lib.dynalite.MESSAGE_DELAY", 0):
+        mock_gateway.dyn_dev = DynaliteDevices(
+            new_device_func=mock_gateway.new_dev_func,
+            update_device_func=mock_gateway.update_dev_func,
+            notification_func=mock_gateway.notification_func,
+            update_batch_func=batch_func,
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("window", [0, 0.1])
+async def test_dynalite_devices_batch_updates(mock_gateway, window):
+    """Test that device updates are coalesced and delivered in a single batch."""
+    batch_func = Mock()
+    batch_dyn_dev(mock_gateway, batch_func)
+    [device_chan, device_pres1, device_pres4] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_BATCH_WINDOW: window,
+            dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
+        },
+        3,
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    batch_func.assert_not_called()
+    packet_to_send = DynetPacket.report_area_preset_packet(1, 1)
+    await mock_gateway.receive(packet_to_send)
+    packet_to_send = DynetPacket.set_channel_level_packet(1, 1, 0.5, 0)
+    await mock_gateway.receive(packet_to_send)
+    packet_to_send = DynetPacket.report_area_preset_packet(1, 4)
+    await mock_gateway.receive(packet_to_send)
+    await asyncio.sleep(window + 0.05)
+    mock_gateway.notification_func.reset_mock()
+    batches = [call[1][0] for call in batch_func.mock_calls]
+    if window:
+        assert len(batches) == 1
+    for batch in batches:
+        assert len(batch) == len(set(batch))
+    received = {device for batch in batches for device in batch}
+    assert received == {device_chan, device_pres1, device_pres4}
+    mock_gateway.update_dev_func.assert_not_called()
+    assert device_pres4.is_on
+    assert not device_pres1.is_on
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_reconfig_names(mock_gateway):
+    """Test that cached names and fades are refreshed on reconfiguration."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_NAME: "aaa",
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {"1": {dyn_const.CONF_NAME: "ccc"}},
+                dyn_const.CONF_PRESET: {"1": {dyn_const.CONF_NAME: "ppp"}},
+            }
+        },
+    }
+    [channel_device, preset_device] = mock_gateway.configure_dyn_dev(config, 2)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    assert channel_device.name == "aaa ccc"
+    assert preset_device.name == "aaa ppp"
+    assert channel_device.area_name == "aaa"
+    config[dyn_const.CONF_AREA]["1"][dyn_const.CONF_NAME] = "bbb"
+    config[dyn_const.CONF_AREA]["1"][dyn_const.CONF_FADE] = 0.4
+    mock_gateway.configure_dyn_dev(config, 0)
+    await mock_gateway.check_updates([channel_device, preset_device])
+    assert channel_device.name == "bbb ccc"
+    assert preset_device.name == "bbb ppp"
+    assert channel_device.area_name == "bbb"
+    assert preset_device.get_master_area == "bbb"
+    await channel_device.async_turn_on()
+    await mock_gateway.check_single_write(
+        DynetPacket.set_channel_level_packet(1, 1, 1.0, 0.4)
+    )
+    await mock_gateway.check_single_update(channel_device)
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_reconfig_diff(mock_gateway):
+    """Test that a reconfigure only applies and queries what changed."""
+    config = {
+        dyn_const.CONF_ACTIVE: dyn_const.ACTIVE_INIT,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {"1": {}, "2": {}},
+            },
+            "2": {dyn_const.CONF_NO_DEFAULT: True, dyn_const.CONF_CHANNEL: {"1": {}}},
+        },
+    }
+    [device_1, device_2, device_3] = mock_gateway.configure_dyn_dev(config, 3)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await mock_gateway.check_writes(
+        [
+            DynetPacket.request_area_preset_packet(1, 1),
+            DynetPacket.request_channel_level_packet(1, 1),
+            DynetPacket.request_channel_level_packet(1, 2),
+            DynetPacket.request_area_preset_packet(2, 1),
+            DynetPacket.request_channel_level_packet(2, 1),
+        ]
+    )
+    area_1_channels = config[dyn_const.CONF_AREA]["1"][dyn_const.CONF_CHANNEL]
+    area_1_channels["1"] = {dyn_const.CONF_NAME: "renamed"}
+    del area_1_channels["2"]
+    area_1_channels["3"] = {}
+    [new_device] = mock_gateway.configure_dyn_dev(config)
+    assert new_device.unique_id == "dynalite_area_1_channel_3"
+    mock_gateway.remove_dev_func.assert_called_once_with([device_2])
+    await mock_gateway.check_updates([device_1])
+    assert device_1.name == "Area 1 renamed"
+    await mock_gateway.check_writes([DynetPacket.request_channel_level_packet(1, 3)])
+    # nothing changed, nothing is done
+    mock_gateway.configure_dyn_dev(config, 0)
+    await mock_gateway.check_updates([])
+    await mock_gateway.check_writes([])
+    assert device_3.available
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_ranges(mock_gateway):
+    """Test that channel and area ranges create a device for each entity."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AREA: {
+            "1-3": {
+                dyn_const.CONF_NAME: "Room {area}",
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {
+                    "1-4": {dyn_const.CONF_NAME: "Light {channel}"}
+                },
+            },
+        },
+    }
+    devices = mock_gateway.configure_dyn_dev(config, 12)
+    assert devices[5].name == "Room 2 Light 2"
+    assert devices[5].unique_id == "dynalite_area_2_channel_2"
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await mock_gateway.receive(DynetPacket.report_channel_level_packet(3, 4, 0.5, 0.5))
+    await mock_gateway.check_single_update(devices[11])
+    assert devices[11].brightness == 127
+    # a reconfigure with the same ranges does nothing
+    mock_gateway.configure_dyn_dev(config, 0)
+    await mock_gateway.check_updates([])
+    mock_gateway.remove_dev_func.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_config_cache(mock_gateway, tmp_path):
+    """Test that the bridge compiles the config through the cache."""
+    path = tmp_path / "config.cache"
+    config = {
+        dyn_const.CONF_CONFIG_CACHE: str(path),
+        dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
+    }
+    mock_gateway.configure_dyn_dev(config, 3)
+    assert path.exists()
+    mock_gateway.configure_dyn_dev(config, 0)
+    mock_gateway.remove_dev_func.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_state_snapshot(mock_gateway, tmp_path):
+    """Test that the state is written to the snapshot periodically."""
+    state_file = tmp_path / "state.json"
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_STATE_FILE: str(state_file),
+        dyn_const.CONF_STATE_INTERVAL: 0.1,
+        dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
+    }
+    [channel_device, _, preset_device] = mock_gateway.configure_dyn_dev(config, 3)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await mock_gateway.receive(DynetPacket.report_channel_level_packet(1, 1, 1, 1))
+    await mock_gateway.check_single_update(channel_device)
+    await mock_gateway.receive(DynetPacket.select_area_preset_packet(1, 4, 0))
+    await mock_gateway.check_single_update(preset_device)
+    await mock_gateway.check_notifications([preset_notification(1, 4)])
+    await asyncio.sleep(0.15)
+    data = json.loads(state_file.read_text())
+    assert data["channel/1/1"][0] == 255
+    assert data["preset/1/0"][0] == 4
+    assert data["channel/1/1"][1] == pytest.approx(time.time(), abs=5)
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_state_hidden_channels(mock_gateway, tmp_path):
+    """Test that the snapshot keeps the hidden channels without a device."""
+    state_file = tmp_path / "state.json"
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AUTO_DISCOVER: True,
+        dyn_const.CONF_STATE_FILE: str(state_file),
+        dyn_const.CONF_AREA: {"1": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM}},
+    }
+    mock_gateway.configure_dyn_dev(config)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await mock_gateway.receive(DynetPacket.report_channel_level_packet(1, 5, 0.4, 0.4))
+    registry = mock_gateway.dyn_dev._devices  # pylint: disable=protected-access
+    assert registry.is_lazy(dyn_const.CONF_CHANNEL, 1, 5)
+    # the reset waits for the last write
+    await mock_gateway.shutdown()
+    await mock_gateway.dyn_dev.async_reset()
+    data = json.loads(state_file.read_text())
+    assert data["channel/1/5"][0] == pytest.approx(0.4 * 255, abs=1)
+    assert data["channel/1/5"][1] == pytest.approx(time.time(), abs=5)
+    # a hidden channel of a cover gets its level on startup
+    config[dyn_const.CONF_ACTIVE] = dyn_const.ACTIVE_INIT
+    config[dyn_const.CONF_AREA]["1"] = {
+        dyn_const.CONF_TEMPLATE: dyn_const.CONF_TIME_COVER,
+        dyn_const.CONF_CHANNEL_COVER: "5",
+    }
+    bridge = DynaliteDevices(
+        new_device_func=Mock(), update_device_func=Mock(), notification_func=Mock()
+    )
+    bridge.connected = True
+    with patch.object(bridge, "request_channel_level") as mock_channel, patch.object(
+        bridge, "request_area_preset"
+    ):
+        bridge.configure(config)
+    mock_channel.assert_not_called()
+    assert bridge.get_device(dyn_const.CONF_CHANNEL, 1, 5).level == pytest.approx(
+        0.4, abs=0.01
+    )
+
+
+def test_dynalite_devices_state_restore(tmp_path):
+    """Test that only the stale or missing entries are queried on startup."""
+    state_file = tmp_path / "state.json"
+    now = time.time()
+    state_file.write_text(
+        json.dumps(
+            {
+                "channel/1/1": [51, now],
+                "channel/1/2": [255, now - 7200],
+                "preset/1/0": [4, now],
+                "timecover/2/0": [40, 0],
+            }
+        )
+    )
+    config = {
+        dyn_const.CONF_ACTIVE: dyn_const.ACTIVE_INIT,
+        dyn_const.CONF_STATE_FILE: str(state_file),
+        dyn_const.CONF_AREA: {
+            "1": {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}, "3": {}}},
+            "2": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_TIME_COVER},
+        },
+    }
+    new_device_func = Mock()
+    bridge = DynaliteDevices(
+        new_device_func=new_device_func,
+        update_device_func=Mock(),
+        notification_func=Mock(),
+    )
+    bridge.connected = True
+    with patch.object(bridge, "request_channel_level") as mock_channel, patch.object(
+        bridge, "request_area_preset"
+    ) as mock_preset:
+        bridge.configure(config)
+    assert mock_channel.mock_calls == [call(1, 2), call(1, 3)]
+    mock_preset.assert_called_once_with(2, None)
+    devices = {
+        device.unique_id: device for device in new_device_func.mock_calls[0][1][0]
+    }
+    assert devices["dynalite_area_1_channel_1"].brightness == 51
+    assert devices["dynalite_area_1_channel_2"].brightness == 255
+    assert not devices["dynalite_area_1_channel_3"].is_on
+    assert devices["dynalite_area_1_preset_4"].is_on
+    assert bridge.get_current_preset(1) == 4
+    assert devices["dynalite_area_2_time_cover"].current_cover_position == 40
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_sync_planner(mock_gateway):
+    """Test that the initial queries are sent one by one, the area first."""
+    config = {
+        dyn_const.CONF_ACTIVE: dyn_const.ACTIVE_INIT,
+        dyn_const.CONF_SYNC_IN_FLIGHT: 1,
+        dyn_const.CONF_SYNC_TIMEOUT: 0.05,
+        dyn_const.CONF_AREA: {"1": {dyn_const.CONF_CHANNEL: {"1": {}}}},
+    }
+    [_, device_pres, _] = mock_gateway.configure_dyn_dev(config, 3)
+    assert mock_gateway.dyn_dev.sync_progress.total == 2
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await mock_gateway.check_single_write(DynetPacket.request_area_preset_packet(1, 1))
+    await mock_gateway.receive(DynetPacket.report_area_preset_packet(1, 1))
+    await mock_gateway.check_single_update(device_pres)
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
+    await mock_gateway.check_single_write(
+        DynetPacket.request_channel_level_packet(1, 1)
+    )
+    progress = mock_gateway.dyn_dev.sync_progress
+    assert (progress.done, progress.total) == (1, 2)
+    assert progress.eta is not None
+    # the channel does not answer
+    await asyncio.sleep(0.1)
+    assert mock_gateway.dyn_dev.sync_progress.complete
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_sync_default(mock_gateway):
+    """Test that by default all the initial queries are sent at once."""
+    config = {
+        dyn_const.CONF_ACTIVE: dyn_const.ACTIVE_INIT,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {str(channel): {} for channel in range(1, 11)},
+            }
+        },
+    }
+    mock_gateway.configure_dyn_dev(config, 10)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await mock_gateway.check_writes(
+        [DynetPacket.request_area_preset_packet(1, 1)]
+        + [
+            DynetPacket.request_channel_level_packet(1, channel)
+            for channel in range(1, 11)
+        ]
+    )
+    assert mock_gateway.dyn_dev.sync_progress.total == 11
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_register_chunks(mock_gateway):
+    """Test that the configured devices are sent in chunks, the rooms first."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AUTO_DISCOVER: True,
+        dyn_const.CONF_REGISTER_CHUNK: 2,
+        dyn_const.CONF_AREA: {
+            "1": {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}}},
+            "2": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM},
+        },
+    }
+    devices = mock_gateway.configure_dyn_dev(config, 2)
+    assert [device.unique_id for device in devices] == [
+        "dynalite_area_2_room_switch",
+        "dynalite_area_1_channel_1",
+    ]
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    await asyncio.sleep(0.01)
+    func = mock_gateway.new_dev_func
+    assert [
+        [device.unique_id for device in chunk[1][0]] for chunk in func.mock_calls[1:]
+    ] == [
+        ["dynalite_area_1_channel_2", "dynalite_area_1_preset_1"],
+        ["dynalite_area_1_preset_4"],
+    ]
+    # once configured, a new device is sent on its own
+    func.reset_mock()
+    await mock_gateway.receive(DynetPacket.report_area_preset_packet(3, 1))
+    func.assert_called_once()
+    assert func.mock_calls[0][1][0][0].unique_id == "dynalite_area_3_preset_1"
+    await mock_gateway.check_single_update(func.mock_calls[0][1][0][0])
+    await mock_gateway.check_notifications([preset_notification(3, 1)])
+
+
+def test_dynalite_devices_register_chunks_removed():
+    """Test that a device removed before it was sent is not sent at all."""
+    new_device_func = Mock()
+    remove_device_func = Mock()
+    bridge = DynaliteDevices(
+        new_device_func=new_device_func,
+        update_device_func=Mock(),
+        notification_func=Mock(),
+        remove_device_func=remove_device_func,
+    )
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_REGISTER_CHUNK: 1,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {"1": {}, "2": {}},
+            }
+        },
+    }
+    bridge.configure(config)
+    new_device_func.assert_called_once()
+    new_device_func.reset_mock()
+    del config[dyn_const.CONF_AREA]["1"][dyn_const.CONF_CHANNEL]["2"]
+    bridge.configure(config)
+    remove_device_func.assert_not_called()
+    new_device_func.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_reconfig_globals(mock_gateway):
+    """Test that a change of a value of the bridge refreshes all the devices."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {"1": {}},
+            }
+        },
+    }
+    [device] = mock_gateway.configure_dyn_dev(config)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    config[dyn_const.CONF_HYSTERESIS] = 0.1
+    mock_gateway.configure_dyn_dev(config, 0)
+    await mock_gateway.check_single_update(device)
+    assert device._hysteresis == mock_gateway.dyn_dev.get_level_hysteresis() == 0.1
+    config[dyn_const.CONF_DEFAULT] = {dyn_const.CONF_FADE: 0.5}
+    mock_gateway.configure_dyn_dev(config, 0)
+    await mock_gateway.check_single_update(device)
+    mock_gateway.configure_dyn_dev(config, 0)
+    await mock_gateway.check_updates([])
+
+
+@pytest.mark.asyncio
+async def test_dynalite_devices_reconfig_type(mock_gateway):
+    """Test that a channel or preset that changes type or visibility gets a new device."""
+    config = {
+        dyn_const.CONF_ACTIVE: False,
+        dyn_const.CONF_AREA: {
+            "1": {
+                dyn_const.CONF_NO_DEFAULT: True,
+                dyn_const.CONF_CHANNEL: {"1": {}},
+            },
+            "2": {dyn_const.CONF_TEMPLATE: dyn_const.CONF_ROOM},
+        },
+    }
+    [light, room] = mock_gateway.configure_dyn_dev(config, 2)
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    hidden_preset = room.get_device(1)
+    assert hidden_preset.hidden
+    config[dyn_const.CONF_AREA]["1"][dyn_const.CONF_CHANNEL]["1"] = {
+        dyn_const.CONF_CHANNEL_TYPE: "switch"
+    }
+    # a template preset in the config is no longer hidden
+    config[dyn_const.CONF_AREA]["2"][dyn_const.CONF_PRESET] = {"1": {}}
+    [switch, preset] = mock_gateway.configure_dyn_dev(config, 2)
+    mock_gateway.remove_dev_func.assert_called_once_with([light])
+    assert isinstance(switch, DynaliteChannelSwitchDevice)
+    assert switch.unique_id == light.unique_id
+    assert preset.unique_id == hidden_preset.unique_id and not preset.hidden
+    # the room follows the new preset
+    assert room.get_device(1) is preset
+    await mock_gateway.check_updates([room])
+    await mock_gateway.receive(DynetPacket.select_area_preset_packet(2, 1, 0))
+    await mock_gateway.check_updates([preset, room], True)
+    await mock_gateway.check_notifications([preset_notification(2, 1)])
+    assert room.is_on
+    # and back to hidden
+    mock_gateway.remove_dev_func.reset_mock()
+    del config[dyn_const.CONF_AREA]["2"][dyn_const.CONF_PRESET]
+    mock_gateway.configure_dyn_dev(config, 0)
+    mock_gateway.remove_dev_func.assert_called_once_with([preset])
+    assert room.get_device(1).hidden
+    await mock_gateway.check_updates([room])
+    assert room.is_on
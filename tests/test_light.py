@@ -1,11 +1,11 @@
 """Tests for Dynalite lights."""
+import asyncio
+
 import pytest
 
 import dynalite_devices_lib.const as dyn_const
 from dynalite_devices_lib.dynet import DynetPacket
 
-from .common import packet_notification
-
 
 @pytest.mark.asyncio
 async def test_light(mock_gateway):
@@ -55,31 +55,37 @@ async def test_light(mock_gateway):
     )
     await mock_gateway.check_single_update(device)
     assert device.brightness == 0
+    # The echoes of our own commands from the bus are skipped
+    echoes = [
+        DynetPacket.set_channel_level_packet(1, 1, level, 0.5)
+        for level in [1.0, 0.2, 0]
+    ]
+    for packet_to_send in echoes:
+        await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_updates([])
+    await mock_gateway.check_notifications([])
+    assert mock_gateway.dyn_dev.echo_count == 3
+    assert 0 < mock_gateway.dyn_dev.echo_rtt < dyn_const.ECHO_TIMEOUT
+    assert device.brightness == 0
     # Now send commands
     packet_to_send = DynetPacket.set_channel_level_packet(1, 1, 1.0, 0.5)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert device.brightness == 255
     assert device.is_on
 
     packet_to_send = DynetPacket.set_channel_level_packet(1, 1, 0.2, 0.5)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert device.brightness == 51
     assert device.is_on
 
     packet_to_send = DynetPacket.report_channel_level_packet(1, 1, 0, 0)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert device.brightness == 0
     assert not device.is_on
 
@@ -119,27 +125,21 @@ async def test_light_to_preset(mock_gateway):
     packet_to_send = DynetPacket.fade_area_channel_preset_packet(1, 1, 2, 0.0)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert device.brightness == 51
     assert device.is_on
     # check default preset on
     packet_to_send = DynetPacket.fade_area_channel_preset_packet(1, 1, 1, 0.0)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert device.brightness == 255
     assert device.is_on
     # check default preset off
     packet_to_send = DynetPacket.fade_area_channel_preset_packet(1, 1, 4, 0.0)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg)]
-    )
+    await mock_gateway.check_notifications([])
     assert device.brightness == 0
     assert not device.is_on
 
@@ -172,3 +172,95 @@ async def test_light_init(mock_gateway):
         device.init_level(-1)
     with pytest.raises(ValueError):
         device.init_level(256)
+
+
+@pytest.mark.asyncio
+async def test_light_hysteresis(mock_gateway):
+    """Test that small level steps during a fade are suppressed."""
+    [device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_HYSTERESIS: 0.1,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_CHANNEL: {"1": {}},
+                }
+            },
+        }
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    for actual_level, updated in [(0.5, True), (0.55, False), (0.7, True), (1, True)]:
+        packet_to_send = DynetPacket.report_channel_level_packet(1, 1, 1, actual_level)
+        await mock_gateway.receive(packet_to_send)
+        await mock_gateway.check_updates([device] if updated else [])
+        await mock_gateway.check_notifications([])
+    assert device.brightness == 255
+    assert mock_gateway.dyn_dev.suppressed_updates == 1
+    # same level again is not a change
+    packet_to_send = DynetPacket.report_channel_level_packet(1, 1, 1, 1)
+    await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_updates([])
+    await mock_gateway.check_notifications([])
+    assert mock_gateway.dyn_dev.suppressed_updates == 2
+
+
+@pytest.mark.asyncio
+async def test_light_fade(mock_gateway):
+    """Test the local model of a fade commanded on the network."""
+    [device] = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_CHANNEL: {"1": {}},
+                }
+            },
+        }
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    assert not device.is_fading
+    assert device.fade_eta == 0
+    packet_to_send = DynetPacket.set_channel_level_packet(1, 1, 1.0, 0.4)
+    await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([])
+    assert device.brightness == 255
+    assert device.is_fading
+    # the same command again is not a change
+    await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_updates([])
+    assert device.is_fading
+    await asyncio.sleep(0.18)
+    assert 0.3 < device.extrapolated_level < 0.7
+    assert 0.1 < device.fade_eta < 0.3
+    # a single update when the fade completes
+    await asyncio.sleep(0.2)
+    await mock_gateway.check_single_update(device)
+    assert not device.is_fading
+    assert device.extrapolated_level == 1.0
+    # stopping the fade keeps the level that was reached
+    packet_to_send = DynetPacket.set_channel_level_packet(1, 1, 0, 0.4)
+    await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_single_update(device)
+    await asyncio.sleep(0.18)
+    packet_stop = DynetPacket.stop_channel_fade_packet(1, 1)
+    await mock_gateway.receive(packet_stop)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([])
+    assert not device.is_fading
+    assert 0.3 < device.extrapolated_level < 0.7
+    assert 75 < device.brightness < 180
+    # a reported level ends the modelled fade
+    packet_to_send = DynetPacket.set_channel_level_packet(1, 1, 1.0, 0.4)
+    await mock_gateway.receive(packet_to_send)
+    packet_report = DynetPacket.report_channel_level_packet(1, 1, 1, 1)
+    await mock_gateway.receive(packet_report)
+    await mock_gateway.check_single_update(device)
+    await mock_gateway.check_notifications([])
+    assert not device.is_fading
+    await asyncio.sleep(0.45)
+    await mock_gateway.check_updates([])
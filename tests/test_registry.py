@@ -0,0 +1,71 @@
+"""Tests for the device registry."""
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.registry import DynaliteDeviceRegistry
+
+
+def test_registry_lookups():
+    """Test adding devices and looking them up by key, kind and area."""
+    registry = DynaliteDeviceRegistry()
+    registry.add(dyn_const.CONF_CHANNEL, 1, 1, "chan_1_1")
+    registry.add(dyn_const.CONF_CHANNEL, 1, 2, "chan_1_2")
+    registry.add(dyn_const.CONF_PRESET, 1, 1, "pres_1_1")
+    registry.add(dyn_const.CONF_CHANNEL, 2, 1, "chan_2_1")
+    registry.add(dyn_const.CONF_ROOM, 3, 0, "room_3")
+    assert len(registry) == 5
+    assert (dyn_const.CONF_CHANNEL, 1, 2) in registry
+    assert (dyn_const.CONF_PRESET, 2, 1) not in registry
+    assert registry.get(dyn_const.CONF_ROOM, 3) == "room_3"
+    assert registry.get(dyn_const.CONF_ROOM, 4) is None
+    assert registry.get_many(
+        [(dyn_const.CONF_CHANNEL, 2, 1), (dyn_const.CONF_CHANNEL, 2, 2)]
+    ) == ["chan_2_1", None]
+    assert registry.area_devices(1, dyn_const.CONF_CHANNEL) == {
+        1: "chan_1_1",
+        2: "chan_1_2",
+    }
+    assert registry.area_devices(5, dyn_const.CONF_CHANNEL) == {}
+    assert set(registry.devices(dyn_const.CONF_CHANNEL)) == {
+        "chan_1_1",
+        "chan_1_2",
+        "chan_2_1",
+    }
+    assert set(registry.devices(area=1)) == {"chan_1_1", "chan_1_2", "pres_1_1"}
+    assert list(registry.devices(dyn_const.CONF_PRESET, 1)) == ["pres_1_1"]
+    assert len(list(registry.devices())) == 5
+
+
+def test_registry_remove():
+    """Test removing single devices and whole areas."""
+    registry = DynaliteDeviceRegistry()
+    registry.add(dyn_const.CONF_CHANNEL, 1, 1, "chan_1_1")
+    registry.add(dyn_const.CONF_PRESET, 1, 1, "pres_1_1")
+    registry.add(dyn_const.CONF_CHANNEL, 2, 1, "chan_2_1")
+    registry.add(dyn_const.CONF_ROOM, 2, 0, "room_2")
+    assert registry.remove(dyn_const.CONF_CHANNEL, 1, 1) == "chan_1_1"
+    assert registry.remove(dyn_const.CONF_CHANNEL, 1, 1) is None
+    assert registry.area_devices(1, dyn_const.CONF_CHANNEL) == {}
+    assert list(registry.devices(area=1)) == ["pres_1_1"]
+    assert set(registry.remove_area(2)) == {"chan_2_1", "room_2"}
+    assert registry.remove_area(2) == []
+    assert (dyn_const.CONF_ROOM, 2, 0) not in registry
+    assert len(registry) == 1
+
+
+def test_registry_lazy():
+    """Test the lazy entries of entities without a device."""
+    registry = DynaliteDeviceRegistry()
+    registry.add_lazy(dyn_const.CONF_CHANNEL, 1, 1)
+    registry.add_lazy(dyn_const.CONF_PRESET, 1, 2)
+    registry.add_lazy(dyn_const.CONF_PRESET, 2, 2)
+    assert (dyn_const.CONF_CHANNEL, 1, 1) in registry
+    assert registry.is_lazy(dyn_const.CONF_CHANNEL, 1, 1)
+    assert registry.get(dyn_const.CONF_CHANNEL, 1, 1) is None
+    assert len(registry) == 0 and registry.lazy_count == 3
+    registry.set_lazy_level(dyn_const.CONF_CHANNEL, 1, 1, 0.5)
+    assert registry.pop_lazy(dyn_const.CONF_CHANNEL, 1, 1) == 0.5
+    registry.add(dyn_const.CONF_CHANNEL, 1, 1, "chan_1_1")
+    assert not registry.is_lazy(dyn_const.CONF_CHANNEL, 1, 1)
+    assert registry.remove(dyn_const.CONF_PRESET, 2, 2) is None
+    assert registry.remove_area(1) == ["chan_1_1"]
+    assert registry.lazy_count == 0
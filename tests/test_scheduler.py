@@ -0,0 +1,70 @@
+"""Tests for the deadline scheduler of the bridge."""
+
+import asyncio
+
+import pytest
+
+from dynalite_devices_lib.scheduler import DynaliteScheduler
+
+
+@pytest.mark.asyncio
+async def test_scheduler_order_and_cancel():
+    """Test that calls run in deadline order and cancelled ones are skipped."""
+    scheduler = DynaliteScheduler()
+    calls = []
+    # calls can be added before the scheduler is started
+    scheduler.call_later(0.03, lambda: calls.append(3))
+    scheduler.start(asyncio.get_running_loop())
+    scheduler.call_later(0.01, lambda: calls.append(1))
+    cancelled = scheduler.call_later(0.02, lambda: calls.append(2))
+    scheduler.call_later(0.01, lambda: calls.append(11))
+    assert len(scheduler) == 4
+    cancelled.cancel()
+    assert len(scheduler) == 3
+    await asyncio.sleep(0.05)
+    assert calls == [1, 11, 3]
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_periodic():
+    """Test calls that repeat until they are cancelled."""
+    scheduler = DynaliteScheduler()
+    scheduler.start(asyncio.get_running_loop())
+    ticks = []
+
+    def tick():
+        ticks.append(scheduler.time())
+        if len(ticks) == 3:
+            periodic.cancel()
+
+    periodic = scheduler.call_every(0.01, tick)
+    await asyncio.sleep(0.06)
+    assert len(ticks) == 3
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reschedule_earlier():
+    """Test that an earlier deadline moves the loop timer forward."""
+    scheduler = DynaliteScheduler()
+    scheduler.start(asyncio.get_running_loop())
+    calls = []
+    scheduler.call_later(1, lambda: calls.append("late"))
+    scheduler.call_later(0.01, lambda: calls.append("early"))
+    await asyncio.sleep(0.03)
+    assert calls == ["early"]
+    scheduler.stop()
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_stop_from_callback():
+    """Test that stopping the scheduler from a callback drops the other calls."""
+    scheduler = DynaliteScheduler()
+    scheduler.start(asyncio.get_running_loop())
+    calls = []
+    scheduler.call_later(0.01, scheduler.stop)
+    scheduler.call_later(0.01, lambda: calls.append(1))
+    await asyncio.sleep(0.03)
+    assert calls == []
@@ -0,0 +1,121 @@
+"""Tests for the Dynet bus simulator."""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.dynalite_devices import DynaliteDevices
+from dynalite_devices_lib.dynet import DynetPacket
+
+from .simulator import DynetSimulator, SimulatedChannel
+
+
+def test_simulated_channel_fade():
+    """Test that a channel fades linearly and stops where it is."""
+    channel = SimulatedChannel(0.2)
+    channel.fade_to(10.0, 1.0, 2.0)
+    assert channel.level(10.0) == pytest.approx(0.2)
+    assert channel.level(11.0) == pytest.approx(0.6)
+    assert channel.level(13.0) == 1.0
+    channel.fade_to(20.0, 0.0, 4.0)
+    channel.stop(21.0)
+    assert channel.level(30.0) == pytest.approx(0.75)
+    assert channel.target_level == pytest.approx(0.75)
+
+
+def test_simulator_answers_requests():
+    """Test the answers to the level and preset requests."""
+    simulator = DynetSimulator(areas=2, channels=3)
+    simulator.set_channel_level(2, 3, 0.5)
+    [answer] = simulator.handle_frame(
+        bytes(DynetPacket.request_channel_level_packet(2, 3).msg)
+    )
+    assert answer.msg == DynetPacket.report_channel_level_packet(2, 3, 0.5, 0.5).msg
+    packet = DynetPacket.select_area_preset_packet(1, 2, 0)
+    assert simulator.handle_frame(bytes(packet.msg)) == []
+    assert simulator.current_preset(1) == 2
+    assert simulator.channel_level(1, 1) == 0.75
+    [answer] = simulator.handle_frame(
+        bytes(DynetPacket.request_area_preset_packet(1, 1).msg)
+    )
+    assert answer.msg == DynetPacket.report_area_preset_packet(1, 2).msg
+    # nothing answers in areas and channels that do not exist
+    for packet in [
+        DynetPacket.request_area_preset_packet(3, 1),
+        DynetPacket.request_channel_level_packet(1, 4),
+    ]:
+        assert simulator.handle_frame(bytes(packet.msg)) == []
+
+
+def test_simulator_channel_commands():
+    """Test the commands that fade, stop and set channels to presets."""
+    simulator = DynetSimulator(areas=1, channels=2)
+    for packet in [
+        DynetPacket.set_channel_level_packet(1, 1, 0.4, 0),
+        DynetPacket.fade_area_channel_preset_packet(1, 2, 1, 0),
+    ]:
+        simulator.handle_frame(bytes(packet.msg))
+    assert simulator.channel_level(1, 1) == pytest.approx(0.4, abs=0.01)
+    assert simulator.channel_level(1, 2) == 1.0
+    simulator.handle_frame(bytes(DynetPacket.set_channel_level_packet(1, 2, 0, 5).msg))
+    simulator.handle_frame(bytes(DynetPacket.stop_channel_fade_packet(1, 2).msg))
+    assert 0.9 < simulator.channel_level(1, 2) <= 1.0
+
+
+def test_simulator_split_frames():
+    """Test that damaged frames and stray bytes are skipped."""
+    simulator = DynetSimulator(noise_rate=1.0)
+    frame = bytes(DynetPacket.report_area_preset_packet(1, 1).msg)
+    buffer = bytearray(simulator.damage(frame) + frame + frame[:3])
+    assert simulator.noise_frames == 1
+    assert DynetSimulator.split_frames(buffer) == [frame]
+    assert buffer == bytearray(frame[:3])
+
+
+@pytest.mark.asyncio
+async def test_simulator_sync():
+    """Test that the bridge gets the state of the simulated site."""
+    simulator = DynetSimulator(areas=2, channels=2, frame_time=0.001, reply_delay=0)
+    simulator.set_channel_level(1, 2, 0.5)
+    simulator.select_preset(2, 1, 0)
+    port = await simulator.start()
+    new_device_func = Mock()
+    with patch("dynalite_devices_lib.dynalite.MESSAGE_DELAY", 0):
+        bridge = DynaliteDevices(
+            new_device_func=new_device_func,
+            update_device_func=Mock(),
+            notification_func=Mock(),
+        )
+    bridge.configure(
+        {
+            dyn_const.CONF_HOST: "127.0.0.1",
+            dyn_const.CONF_PORT: port,
+            dyn_const.CONF_ACTIVE: dyn_const.ACTIVE_INIT,
+            dyn_const.CONF_AREA: {
+                str(area): {dyn_const.CONF_CHANNEL: {"1": {}, "2": {}}}
+                for area in [1, 2]
+            },
+        }
+    )
+    devices = {
+        device.unique_id: device for device in new_device_func.mock_calls[0][1][0]
+    }
+    assert await bridge.async_setup()
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if bridge.sync_progress.complete:
+            break
+    assert bridge.sync_progress.complete
+    assert devices["dynalite_area_1_channel_1"].brightness == 0
+    assert devices["dynalite_area_1_channel_2"].brightness == pytest.approx(127, abs=1)
+    assert devices["dynalite_area_2_channel_1"].brightness == 255
+    assert bridge.get_current_preset(1) == 4
+    assert bridge.get_current_preset(2) == 1
+    # the queries and their answers all went through the bus
+    assert simulator.frames_received == simulator.requests_answered == 6
+    assert simulator.frames_sent == 12
+    # the bridge waits for the gateway to close the connection
+    await simulator.stop()
+    await bridge.async_reset()
@@ -0,0 +1,31 @@
+"""Tests for the state snapshot store."""
+
+import time
+
+from dynalite_devices_lib.state import DynaliteStateStore, state_key
+
+
+def test_state_store_persist(tmp_path):
+    """Test the entries, their age, and saving and loading them."""
+    path = str(tmp_path / "state.json")
+    store = DynaliteStateStore(path)
+    store.load()  # missing file
+    key = state_key("channel", 1, 2)
+    assert key == "channel/1/2"
+    assert store.get(key) is None
+    assert not store.is_fresh(key, 3600)
+    store.set(key, 100)
+    assert store.get(key) == 100
+    # never seen on the bus
+    assert not store.is_fresh(key, 3600)
+    store.seen(key, 200)
+    assert store.is_fresh(key, 3600)
+    store.set(key, 50)
+    assert store.get(key) == 50 and store.is_fresh(key, 3600)
+    store.write(store.dump())
+    loaded = DynaliteStateStore(path)
+    loaded.load()
+    assert loaded.get(key) == 50
+    assert loaded.is_fresh(key, 3600)
+    time.sleep(0.01)
+    assert not loaded.is_fresh(key, 0)
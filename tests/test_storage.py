@@ -0,0 +1,95 @@
+"""Tests for the JSON files the bridge keeps."""
+
+import asyncio
+import time
+
+import pytest
+
+from dynalite_devices_lib.storage import DynaliteJsonStore
+
+
+class ListStore(DynaliteJsonStore):
+    """Store of a list of numbers."""
+
+    def __init__(self, path=""):
+        """Initialize the store."""
+        super().__init__(path)
+        self.values = []
+
+    def clear(self):
+        """Forget the numbers."""
+        self.values = []
+
+    def restore(self, data):
+        """Set the numbers from the file."""
+        self.values = [int(value) for value in data]
+
+    def to_json(self):
+        """Return the numbers."""
+        return self.values
+
+
+def test_store_incomplete():
+    """Test that a store has to implement the data methods."""
+
+    class IncompleteStore(DynaliteJsonStore):
+        """Store without a to_json method."""
+
+        def clear(self):
+            """Forget nothing."""
+
+        def restore(self, data):
+            """Restore nothing."""
+
+    with pytest.raises(TypeError):
+        IncompleteStore()
+
+
+def test_store_load(tmp_path):
+    """Test loading a stored file, and that a missing or broken one is ignored."""
+    path = tmp_path / "store.json"
+    store = ListStore(str(path))
+    store.load()  # missing file
+    assert store.values == []
+    store.values = [1, 2]
+    store.write(store.dump())
+    assert [path.name for path in tmp_path.iterdir()] == ["store.json"]
+    loaded = ListStore(str(path))
+    loaded.load()
+    assert loaded.values == [1, 2]
+    for broken in ["not json", '[1, "x"]', "[[1]]"]:
+        path.write_text(broken)
+        loaded.load()
+        assert loaded.values == []
+    # without a path nothing is loaded
+    store = ListStore()
+    store.load()
+    assert store.values == []
+
+
+@pytest.mark.asyncio
+async def test_store_serialized_saves(tmp_path):
+    """Test that only the latest save waits for a write in progress."""
+    path = tmp_path / "store.json"
+    written = []
+
+    class SlowStore(ListStore):
+        """Store with slow writes."""
+
+        def write(self, data):
+            """Write slowly and record the data."""
+            time.sleep(0.05)
+            super().write(data)
+            written.append(data)
+
+    store = SlowStore(str(path))
+    loop = asyncio.get_running_loop()
+    for value in range(3):
+        store.values = [value]
+        store.save(loop, store.dump())
+    await store.async_flush()
+    assert written == ["[0]", "[2]"]
+    assert path.read_text() == "[2]"
+    # without a loop the data is written at once
+    store.save(None, "[3]")
+    assert path.read_text() == "[3]"
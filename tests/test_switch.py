@@ -6,7 +6,7 @@ import pytest
 import dynalite_devices_lib.const as dyn_const
 from dynalite_devices_lib.dynet import DynetPacket
 
-from .common import packet_notification, preset_notification
+from .common import preset_notification
 
 
 @pytest.mark.asyncio
@@ -44,7 +44,7 @@ async def test_preset_switch(mock_gateway):
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 1, 0.5)
     )
-    await mock_gateway.check_updates([device1, device4])
+    await mock_gateway.check_single_update(device1)
     await mock_gateway.check_notifications([preset_notification(1, 1)])
     assert device1.is_on
     assert not device4.is_on
@@ -64,18 +64,14 @@ async def test_preset_switch(mock_gateway):
     assert not device1.is_on
     packet_to_send = DynetPacket.select_area_preset_packet(1, 1, 0.2)
     await mock_gateway.receive(packet_to_send)
-    await mock_gateway.check_updates([device1, device4])
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 1)]
-    )
+    await mock_gateway.check_single_update(device1)
+    await mock_gateway.check_notifications([preset_notification(1, 1)])
     assert not device4.is_on
     assert device1.is_on
     packet_to_send = DynetPacket.report_area_preset_packet(1, 4)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_updates([device1, device4])
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 4)]
-    )
+    await mock_gateway.check_notifications([preset_notification(1, 4)])
     assert device4.is_on
     assert not device1.is_on
     device1.init_level(2)
@@ -158,7 +154,7 @@ async def test_room_switch(mock_gateway):
     assert device.unique_id == "dynalite_area_1_room_switch"
     assert device.available
     await room_device.async_turn_on()
-    await mock_gateway.check_updates([on_device, off_device, room_device])
+    await mock_gateway.check_updates([on_device, room_device])
     await mock_gateway.check_notifications([preset_notification(1, 1)])
     await mock_gateway.check_single_write(
         DynetPacket.select_area_preset_packet(1, 1, 0)
@@ -235,7 +231,41 @@ async def test_trigger_switch(mock_gateway):
     packet_to_send = DynetPacket.report_area_preset_packet(1, 4)
     await mock_gateway.receive(packet_to_send)
     await mock_gateway.check_single_update(trigger_device)
-    await mock_gateway.check_notifications(
-        [packet_notification(packet_to_send.raw_msg), preset_notification(1, 4)]
-    )
+    await mock_gateway.check_notifications([preset_notification(1, 4)])
     assert not trigger_device.is_on
+
+
+@pytest.mark.asyncio
+async def test_current_preset(mock_gateway):
+    """Test that the bridge tracks the selected preset of each area."""
+    devices = mock_gateway.configure_dyn_dev(
+        {
+            dyn_const.CONF_ACTIVE: False,
+            dyn_const.CONF_AREA: {
+                "1": {
+                    dyn_const.CONF_NO_DEFAULT: True,
+                    dyn_const.CONF_PRESET: {str(i): {} for i in range(1, 33)},
+                }
+            },
+        },
+        32,
+    )
+    assert await mock_gateway.async_setup_dyn_dev()
+    await mock_gateway.check_single_update(None)
+    dyn_dev = mock_gateway.dyn_dev
+    assert dyn_dev.get_current_preset(1) is None
+    packet_to_send = DynetPacket.report_area_preset_packet(1, 5)
+    await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_single_update(devices[4])
+    await mock_gateway.check_notifications([preset_notification(1, 5)])
+    assert dyn_dev.get_current_preset(1) == 5
+    packet_to_send = DynetPacket.report_area_preset_packet(1, 20)
+    await mock_gateway.receive(packet_to_send)
+    await mock_gateway.check_updates([devices[4], devices[19]])
+    await mock_gateway.check_notifications([preset_notification(1, 20)])
+    assert dyn_dev.get_current_preset(1) == 20
+    assert [device.is_on for device in devices].count(True) == 1
+    devices[7].init_level(1)
+    assert dyn_dev.get_current_preset(1) == 8
+    assert not devices[19].is_on
+    assert dyn_dev.get_current_preset(2) is None
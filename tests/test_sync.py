@@ -0,0 +1,75 @@
+"""Tests for the planner of the initial sync."""
+
+from unittest.mock import Mock, call
+
+import dynalite_devices_lib.const as dyn_const
+from dynalite_devices_lib.sync import DynaliteSyncPlanner, DynaliteSyncProgress
+
+CHANNEL = dyn_const.CONF_CHANNEL
+PRESET = dyn_const.CONF_PRESET
+
+
+def create_planner(max_in_flight):
+    """Create a planner on a bridge whose time is set by the test."""
+    bridge = Mock()
+    bridge.time.return_value = 100.0
+    progress_func = Mock()
+    planner = DynaliteSyncPlanner(bridge, progress_func)
+    planner.max_in_flight = max_in_flight
+    planner.timeout = 5.0
+    return bridge, planner, progress_func
+
+
+def test_sync_priority_and_limit():
+    """Test that visible areas go first, then visible channels, then hidden ones."""
+    bridge, planner, progress_func = create_planner(2)
+    planner.add(CHANNEL, 1, 4, True)
+    planner.add(PRESET, 1, 0, True)
+    planner.add(CHANNEL, 2, 1, False)
+    planner.add(CHANNEL, 2, 2, False)
+    planner.add(PRESET, 2, 0, False)
+    planner.add(PRESET, 2, 0, False)  # already queued
+    bridge.request_area_preset.assert_not_called()
+    planner.start()
+    bridge.request_area_preset.assert_called_once_with(2, None)
+    bridge.request_channel_level.assert_called_once_with(2, 1)
+    bridge.call_at.assert_called_with(105.0, planner.timer_callback)
+    progress_func.assert_called_once_with(DynaliteSyncProgress(0, 5, None))
+    bridge.reset_mock()
+    # an answer makes room for the next query
+    bridge.time.return_value = 101.0
+    planner.answered(PRESET, 2, 0)
+    bridge.request_channel_level.assert_called_once_with(2, 2)
+    assert progress_func.mock_calls[-1] == call(DynaliteSyncProgress(1, 5, 4.0))
+    # a report of a queued query answers it before it is sent
+    planner.answered(PRESET, 1, 0)
+    planner.answered(CHANNEL, 2, 1)
+    bridge.request_area_preset.assert_not_called()
+    assert bridge.request_channel_level.mock_calls == [call(2, 2), call(1, 4)]
+    # unknown answers are ignored
+    planner.answered(CHANNEL, 3, 1)
+    assert planner.progress == DynaliteSyncProgress(3, 5, 2 / 3)
+
+
+def test_sync_timeout():
+    """Test that unanswered queries count as done after the timeout."""
+    bridge, planner, progress_func = create_planner(1)
+    planner.add(CHANNEL, 1, 1, False)
+    planner.add(CHANNEL, 1, 2, False)
+    planner.start()
+    bridge.request_channel_level.assert_called_once_with(1, 1)
+    bridge.time.return_value = 105.0
+    planner.timer_callback()
+    bridge.request_channel_level.assert_called_with(1, 2)
+    bridge.time.return_value = 110.0
+    planner.timer_callback()
+    assert progress_func.mock_calls[-1] == call(DynaliteSyncProgress(2, 2, 0.0))
+    assert planner.progress.complete
+    # a new sync starts from 0
+    planner.add(CHANNEL, 1, 3, False)
+    assert planner.progress == DynaliteSyncProgress(0, 1, None)
+    planner.cancel()
+    bridge.reset_mock()
+    planner.add(CHANNEL, 1, 3, False)
+    planner.answered(CHANNEL, 1, 3)
+    bridge.request_channel_level.assert_not_called()